@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# ArtNet Async - 基于asyncio的网络管理器和输出循环
+#
+# 用法（嵌入已有的asyncio服务）:
+#     async with AsyncNetworkManager() as network:
+#         network.add_callback(on_packet)
+#         pipeline.add_transport('artnet', ArtNetTransport(network))
+#         async with AsyncOutputLoop(pipeline) as output:
+#             nodes = await network.discover()
+#             frame_number = await output.tick()
+#
+# 发送、接收和帧时钟都在同一个事件循环中完成，不创建线程，也没有轮询超时；
+# 取消任务或退出 async with 时依次停止输出循环并关闭socket。
+
+import asyncio
+import socket
+import time
+
+from artnet_core import ArtNetProtocol
+
+# _ArtNetDatagramProtocol 类
+class _ArtNetDatagramProtocol(asyncio.DatagramProtocol):
+    """把事件循环收到的数据报转交给网络管理器"""
+    
+    def __init__(self, manager):
+        self.manager = manager
+    
+    def datagram_received(self, data, addr):
+        self.manager._on_datagram(data, addr)
+    
+    def error_received(self, exc):
+        print(f"接收数据包失败: {exc}")
+    
+    def connection_lost(self, exc):
+        self.manager._on_connection_lost()
+
+# AsyncNetworkManager 类
+class AsyncNetworkManager:
+    """asyncio网络管理器，接口与 NetworkManager 对应，可直接交给 ArtNetTransport 使用"""
+    
+    def __init__(self, protocol=None, queue_size=256):
+        """
+        初始化asyncio网络管理器
+        
+        Args:
+            protocol (ArtNetProtocol, optional): 协议实例，默认新建
+            queue_size (int, optional): 接收队列长度，队列满时丢弃最旧的数据包
+        """
+        self.protocol = protocol or ArtNetProtocol()
+        self.transport = None
+        self.callbacks = []
+        self.broadcast_ip = "255.255.255.255"
+        self.artnet_port = 6454
+        self.queue_size = queue_size
+        self.queue = None  # 在事件循环中第一次使用时创建（Python 3.9的队列绑定创建时的事件循环）
+        self.packets_dropped = 0  # 接收队列满时丢弃的数据包数
+        self._poll_replies = None  # 节点发现期间收集应答，地址 -> 解析结果
+    
+    def _get_queue(self):
+        """获取接收队列，只在运行中的事件循环内调用"""
+        if self.queue is None:
+            self.queue = asyncio.Queue(self.queue_size)
+        return self.queue
+    
+    async def initialize(self):
+        """
+        创建UDP端点并开始接收
+        
+        Returns:
+            bool: 初始化是否成功
+        """
+        if self.transport:
+            return True
+        self._get_queue()
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("", self.artnet_port))
+            sock.setblocking(False)
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: _ArtNetDatagramProtocol(self), sock=sock)
+            return True
+        except Exception as e:
+            print(f"网络初始化失败: {e}")
+            self.transport = None
+            return False
+    
+    def send_packet(self, packet, target_ip=None, port=None):
+        """
+        发送数据包（不阻塞，数据报交给事件循环排队发送）
+        
+        Args:
+            packet (bytes): 要发送的数据包
+            target_ip (str, optional): 目标IP地址，默认为广播地址
+            port (int, optional): 目标端口，默认为ArtNet默认端口
+            
+        Returns:
+            bool: 发送是否成功（尚未初始化时失败）
+        """
+        if not self.transport:
+            return False
+        try:
+            self.transport.sendto(packet, (target_ip or self.broadcast_ip, port or self.artnet_port))
+            return True
+        except Exception as e:
+            print(f"发送数据包失败: {e}")
+            return False
+    
+    def add_callback(self, callback):
+        """
+        添加接收回调，在事件循环中调用
+        
+        Args:
+            callback (callable): 接收 (data, addr) 的函数
+        """
+        self.callbacks.append(callback)
+    
+    def remove_callback(self, callback):
+        """
+        移除接收回调
+        
+        Args:
+            callback (callable): 之前添加的回调
+        """
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+    
+    def _on_datagram(self, data, addr):
+        """处理收到的数据报：依次调用回调、收集发现应答并放入接收队列"""
+        for callback in self.callbacks:
+            try:
+                callback(data, addr)
+            except Exception as e:
+                print(f"回调函数执行失败: {e}")
+        
+        if self._poll_replies is not None:
+            info = self.protocol.parse_packet(data)
+            if info and info['opcode'] == ArtNetProtocol.OPCODE_POLL_REPLY:
+                self._poll_replies[(addr[0], info['bind_index'])] = info
+        
+        queue = self._get_queue()
+        if queue.full():
+            queue.get_nowait()
+            self.packets_dropped += 1
+        queue.put_nowait((data, addr))
+    
+    def _on_connection_lost(self):
+        self.transport = None
+    
+    async def receive(self):
+        """
+        等待下一个数据包
+        
+        Returns:
+            tuple: (data, addr)
+        """
+        return await self._get_queue().get()
+    
+    async def packets(self):
+        """
+        异步迭代收到的数据包: async for data, addr in network.packets()
+        """
+        queue = self._get_queue()
+        while True:
+            yield await queue.get()
+    
+    async def discover(self, timeout=2.0, target_ip=None):
+        """
+        发送ArtPoll并收集节点应答
+        
+        Args:
+            timeout (float, optional): 等待应答的秒数
+            target_ip (str, optional): 目标地址，默认为广播地址
+            
+        Returns:
+            list: ArtPollReply 解析结果，每个节点（端口组）一项
+        """
+        if not self.transport and not await self.initialize():
+            return []
+        self._poll_replies = {}
+        try:
+            self.send_packet(self.protocol.build_poll_packet(), target_ip)
+            await asyncio.sleep(timeout)
+            return list(self._poll_replies.values())
+        finally:
+            self._poll_replies = None
+    
+    async def close(self):
+        """
+        关闭UDP端点
+        """
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+            # 让事件循环处理 connection_lost
+            await asyncio.sleep(0)
+    
+    def set_broadcast_ip(self, ip):
+        """
+        设置默认广播IP地址
+        
+        Args:
+            ip (str): 广播IP地址
+        """
+        self.broadcast_ip = ip
+    
+    async def __aenter__(self):
+        await self.initialize()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+# AsyncOutputLoop 类
+class AsyncOutputLoop:
+    """在事件循环中按帧率驱动 OutputPipeline，其他协程可等待帧时钟"""
+    
+    def __init__(self, pipeline, frame_rate=None):
+        """
+        初始化asyncio输出循环
+        
+        Args:
+            pipeline (OutputPipeline): 输出流水线（不要同时调用其 start()）
+            frame_rate (float, optional): 输出帧率，默认使用流水线的帧率
+        """
+        self.pipeline = pipeline
+        self.frame_rate = frame_rate or pipeline.frame_rate
+        self.task = None
+        self.late_frames = 0  # 事件循环繁忙导致整帧延误的次数
+        self.packets_sent = 0
+        self._waiters = []
+    
+    def start(self):
+        """
+        在当前事件循环中启动输出任务
+        
+        Returns:
+            asyncio.Task: 输出任务
+        """
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return self.task
+    
+    async def stop(self):
+        """
+        取消输出任务并等待其结束
+        """
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+    
+    async def tick(self):
+        """
+        等待下一帧发送完成
+        
+        Returns:
+            int: 该帧的帧号
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        return await future
+    
+    async def run(self):
+        """
+        输出主循环：固定帧率调度，被取消时唤醒等待者后退出
+        """
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.frame_rate
+        next_time = loop.time()
+        clock_offset = time.time() - next_time
+        try:
+            while True:
+                # 帧时间戳使用调度时刻，与线程输出循环一致；
+                # 一帧出错只跳过这一帧，等待者在下一个成功发送的帧唤醒
+                try:
+                    frame = self.pipeline.build_frame(next_time + clock_offset)
+                    self.packets_sent += self.pipeline.send_frame(frame)
+                except Exception as e:
+                    print(f"输出帧错误: {e}")
+                else:
+                    waiters, self._waiters = self._waiters, []
+                    for future in waiters:
+                        if not future.done():
+                            future.set_result(frame.number)
+                
+                next_time += period
+                delay = next_time - loop.time()
+                if delay < -period:
+                    self.late_frames += 1
+                    next_time = loop.time()
+                    clock_offset = time.time() - next_time
+                    delay = 0
+                await asyncio.sleep(max(delay, 0))
+        finally:
+            waiters, self._waiters = self._waiters, []
+            for future in waiters:
+                future.cancel()
+    
+    async def __aenter__(self):
+        self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
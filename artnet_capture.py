@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# ArtNet Capture - 在输出流水线上逐帧录制实际发送的输出帧
+#
+# 用法:
+#     capture = FrameCapture()
+#     pipeline.add_tap(capture)
+#     capture.start()
+#     ...
+#     capture.stop()
+#     player.load(capture.get_recording(universe=0))
+#
+#     replay = ReplayBuffer(seconds=300, frame_rate=pipeline.frame_rate)
+#     pipeline.add_tap(replay)
+#     replay.start()
+#     replay.export("replay.npz", seconds=30)  # 导出最近30秒，录制继续进行
+#
+# 作为帧监听 (add_tap) 时在每帧发送之后调用，录制的是经过输出曲线和总控之后实际发送的值，
+# 适合分析和离线导出。ReplayBuffer 也可以作为第一个处理阶段 (add_stage，在输出曲线之前)，
+# 录制的是DMX控制器中的值，适合交给 RecordingPlayer 回放——回放写回控制器后还会再经过曲线和总控，
+# 用发送值回放会让曲线和总控作用两次。FrameCapture 只保存帧的引用，只能作为帧监听使用。
+# 两种方式的时间戳都是输出调度器的帧时间。
+# FrameCapture 只保存帧对象的引用（每帧的数据本来就是新分配的快照），内存随录制时长增长；
+# ReplayBuffer 预先分配 帧数 x 宇宙数 x 通道数 的数组，只保留最近的若干分钟，内存固定。
+
+import json
+
+import numpy as np
+
+# FrameCapture 类
+class FrameCapture:
+    """输出帧录制器，作为帧监听使用: pipeline.add_tap(capture)"""
+    
+    def __init__(self):
+        """
+        初始化输出帧录制器
+        """
+        self.frames = []  # 录制的 OutputFrame
+        self.capturing = False
+    
+    def start(self):
+        """
+        清空之前的录制并开始录制
+        """
+        self.frames = []
+        self.capturing = True
+    
+    def stop(self):
+        """
+        停止录制
+        
+        Returns:
+            int: 录制的帧数
+        """
+        self.capturing = False
+        return len(self.frames)
+    
+    def __call__(self, frame):
+        """
+        作为帧监听使用: 保存输出帧的引用
+        """
+        if self.capturing:
+            self.frames.append(frame)
+    
+    def get_duration(self):
+        """
+        获取录制时长
+        
+        Returns:
+            float: 第一帧到最后一帧的秒数
+        """
+        frames = self.frames
+        return frames[-1].timestamp - frames[0].timestamp if frames else 0.0
+    
+    def get_recording(self, universe):
+        """
+        提取一个宇宙的录制数据，格式与 RecordingPlayer.load 一致
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            list: [(帧时间戳, 通道数据bytes), ...]，不包含该宇宙的帧被跳过
+        """
+        recording = []
+        for frame in self.frames:
+            data = frame.get_universe_data(universe)
+            if data is not None:
+                recording.append((frame.timestamp, bytes(data)))
+        return recording
+    
+    def save(self, filename, universe):
+        """
+        把一个宇宙的录制数据保存为JSON录制文件
+        
+        Args:
+            filename (str): 文件路径
+            universe (int): 宇宙号
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        return save_recording(filename, self.get_recording(universe))
+
+def save_recording(filename, recording):
+    """
+    保存录制数据，时间换算为相对第一帧的秒数
+    
+    Args:
+        filename (str): 文件路径
+        recording (list): [(时间戳, 通道数据), ...]
+        
+    Returns:
+        bool: 保存是否成功
+    """
+    if not recording:
+        return False
+    try:
+        start_time = recording[0][0]
+        data_to_save = [{'time': timestamp - start_time, 'channels': list(channels)}
+                        for timestamp, channels in recording]
+        with open(filename, 'w') as f:
+            json.dump(data_to_save, f)
+        return True
+    except Exception as e:
+        print(f"保存录制数据失败: {e}")
+        return False
+
+# ReplayBuffer 类
+class ReplayBuffer:
+    """即时回放环形缓冲区，作为帧监听或处理阶段使用，缓冲区满后覆盖最旧的帧"""
+    
+    def __init__(self, seconds=300.0, frame_rate=50, universes=None, stride=512, store=None):
+        """
+        初始化即时回放缓冲区
+        
+        Args:
+            seconds (float, optional): 保留的时长（秒）
+            frame_rate (float, optional): 输出帧率，与 seconds 一起决定缓冲区帧数
+            universes (iterable, optional): 录制的宇宙号；默认在开始录制后的第一帧时取该帧的全部宇宙
+            stride (int, optional): 每个宇宙的通道数
+            store (UniverseStore, optional): 宇宙缓冲区存储；指定时宇宙号被修改后录制的宇宙随之改名
+        """
+        self.capacity = max(1, int(round(seconds * frame_rate)))
+        self.stride = stride
+        self.store = store
+        self._layout_version = store.layout_version if store is not None else 0
+        self.fixed_universes = universes is not None
+        self.universes = None
+        self.rows = {}  # 宇宙号 -> 数组中的行
+        self.data = None  # 形状为 (帧数, 宇宙数, stride)
+        self.times = np.zeros(self.capacity, dtype=np.float64)
+        self.written = 0  # 开始录制以来写入的帧数
+        self.capturing = False
+        if universes is not None:
+            self._allocate(tuple(universes))
+    
+    def _allocate(self, universes):
+        """按宇宙列表分配缓冲区"""
+        self.universes = universes
+        self.rows = {universe: row for row, universe in enumerate(universes)}
+        self.data = np.zeros((self.capacity, len(universes), self.stride), dtype=np.uint8)
+        self.written = 0
+    
+    def _sync_layout(self):
+        """宇宙号被修改后把录制的宇宙号换算为新的宇宙号，已录制的数据保留"""
+        store = self.store
+        if store is None or store.layout_version == self._layout_version:
+            return
+        if self.universes is not None:
+            self.universes = tuple(store.current_universe(u, self._layout_version) for u in self.universes)
+            self.rows = {universe: row for row, universe in enumerate(self.universes)}
+        self._layout_version = store.layout_version
+    
+    def get_memory_size(self):
+        """
+        获取缓冲区占用的字节数
+        
+        Returns:
+            int: 字节数（尚未分配时为0）
+        """
+        return self.times.nbytes + (self.data.nbytes if self.data is not None else 0)
+    
+    def start(self):
+        """
+        清空缓冲区并开始录制
+        """
+        self.capturing = False
+        if not self.fixed_universes:
+            self.universes = None
+            self.data = None
+        self.written = 0
+        self.capturing = True
+    
+    def stop(self):
+        """
+        停止录制（缓冲区内容保留）
+        
+        Returns:
+            int: 缓冲区中的帧数
+        """
+        self.capturing = False
+        return min(self.written, self.capacity)
+    
+    def __call__(self, frame):
+        """
+        作为帧监听或处理阶段使用: 把输出帧复制到缓冲区的下一个位置（不修改帧）
+        """
+        if not self.capturing:
+            return
+        self._sync_layout()
+        if self.data is None:
+            self._allocate(frame.universes)
+        
+        index = self.written % self.capacity
+        row = self.data[index]
+        size = row.size
+        if frame.universes == self.universes and frame.stride == self.stride and len(frame.data) >= size:
+            # 宇宙列表一致时整帧一次复制
+            row.reshape(-1)[:] = np.frombuffer(frame.data, dtype=np.uint8, count=size)
+        else:
+            row[:] = 0
+            for universe, slot in self.rows.items():
+                data = frame.get_universe_data(universe)
+                if data is not None:
+                    count = min(len(data), self.stride)
+                    row[slot, :count] = np.frombuffer(data, dtype=np.uint8, count=count)
+        self.times[index] = frame.timestamp
+        self.written += 1
+    
+    def get_window(self, seconds=None):
+        """
+        复制缓冲区中最近的一段帧，录制不需要停止
+        
+        Args:
+            seconds (float, optional): 只取最后一帧之前这么多秒内的帧，默认为全部
+            
+        Returns:
+            tuple: (时间戳数组, 通道数据数组)，通道数据形状为 (帧数, 宇宙数, stride)；
+                缓冲区为空时返回 (None, None)
+        """
+        data = self.data
+        written = self.written
+        first = max(0, written - self.capacity)
+        if data is None or written == first:
+            return None, None
+        
+        positions = np.arange(first, written) % self.capacity
+        times = self.times[positions]
+        if seconds is not None:
+            start = int(np.searchsorted(times, times[-1] - seconds))
+            first += start
+            positions = positions[start:]
+        window = data[positions]
+        times = self.times[positions]
+        
+        # 录制中复制时输出线程可能已经覆盖了窗口开头的帧，丢弃这些帧
+        overwritten = self.written - self.capacity + 1 - first
+        if self.capturing and overwritten > 0:
+            window = window[overwritten:]
+            times = times[overwritten:]
+        return times, window
+    
+    def get_recording(self, universe, seconds=None):
+        """
+        提取一个宇宙的录制数据，格式与 RecordingPlayer.load 一致
+        
+        Args:
+            universe (int): 宇宙号
+            seconds (float, optional): 只取最近这么多秒，默认为全部
+            
+        Returns:
+            list: [(帧时间戳, 通道数据bytes), ...]；宇宙未录制时返回空列表
+        """
+        self._sync_layout()
+        slot = self.rows.get(universe)
+        if slot is None:
+            return []
+        times, window = self.get_window(seconds)
+        if times is None:
+            return []
+        return [(timestamp, channels.tobytes()) for timestamp, channels in zip(times.tolist(), window[:, slot])]
+    
+    def export(self, filename, seconds=None):
+        """
+        把缓冲区中最近的一段帧导出为 .npz 文件（不影响继续录制）
+        
+        Args:
+            filename (str): 文件路径
+            seconds (float, optional): 只导出最近这么多秒，默认为全部
+            
+        Returns:
+            bool: 导出是否成功
+        """
+        times, window = self.get_window(seconds)
+        if times is None:
+            return False
+        try:
+            with open(filename, 'wb') as f:
+                np.savez(f, times=times, universes=np.array(self.universes, dtype=np.int32), data=window)
+            return True
+        except Exception as e:
+            print(f"导出回放数据失败: {e}")
+            return False
+
+def load_replay(filename):
+    """
+    读取 ReplayBuffer.export 导出的文件
+    
+    Args:
+        filename (str): 文件路径
+        
+    Returns:
+        tuple: (时间戳数组, 宇宙号列表, 通道数据数组)；失败时返回None
+    """
+    try:
+        with np.load(filename) as archive:
+            return archive['times'], archive['universes'].tolist(), archive['data']
+    except Exception as e:
+        print(f"读取回放数据失败: {e}")
+        return None
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# ArtNet Changes - 按输出帧计算通道变化并分发给订阅者
+#
+# 用法:
+#     tracker = ChangeTracker()
+#     pipeline.add_stage(tracker)  # 在输出曲线之前添加时比较的是DMX控制器的值，之后则是输出值
+#     tracker.subscribe(on_changes, universes=[0, 1])
+#
+# 每帧只做一次向量化比较，结果 ChangeSet 由所有订阅者共享；
+# 回调在输出线程中执行，耗时的处理应转交给其他线程。
+
+import threading
+
+import numpy as np
+
+# ChangeSet 类
+class ChangeSet:
+    """一帧内的通道变化，按宇宙保存变化通道的索引和新值"""
+    
+    def __init__(self, frame_number, timestamp, stride, changes):
+        """
+        初始化通道变化
+        
+        Args:
+            frame_number (int): 帧序号
+            timestamp (float): 帧时间戳
+            stride (int): 每个宇宙的通道数
+            changes (dict): 宇宙号 -> (通道索引数组, 新值数组)
+        """
+        self.frame_number = frame_number
+        self.timestamp = timestamp
+        self.stride = stride
+        self.changes = changes
+        self._bitmaps = {}
+        self._lock = threading.Lock()
+    
+    def get_universes(self):
+        """
+        获取发生变化的宇宙
+        
+        Returns:
+            list: 宇宙号列表
+        """
+        return list(self.changes)
+    
+    def get_changes(self, universe):
+        """
+        获取一个宇宙的变化
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            tuple: (从0开始的通道索引数组, 新值数组)；没有变化时返回None
+        """
+        return self.changes.get(universe)
+    
+    def get_bitmap(self, universe):
+        """
+        获取一个宇宙的变化位图（首次调用时生成，之后共享）
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            bytes: stride/8 字节，通道c对应第 c//8 字节的第 7 - c%8 位；没有变化时返回None
+        """
+        entry = self.changes.get(universe)
+        if entry is None:
+            return None
+        with self._lock:
+            bitmap = self._bitmaps.get(universe)
+            if bitmap is None:
+                mask = np.zeros(self.stride, dtype=bool)
+                mask[entry[0]] = True
+                bitmap = np.packbits(mask).tobytes()
+                self._bitmaps[universe] = bitmap
+        return bitmap
+
+# ChangeTracker 类
+class ChangeTracker:
+    """通道变化跟踪器，作为输出流水线的处理阶段使用"""
+    
+    def __init__(self):
+        """
+        初始化通道变化跟踪器
+        """
+        self.subscriptions = {}  # 订阅编号 -> (回调, 宇宙号集合或None)
+        self.previous = None  # 上一帧的通道数据，形状为 (宇宙数, stride)
+        self.previous_universes = ()
+        self.last_changes = None
+        self._pending = set()  # 尚未收到初始状态的订阅编号
+        self._next_id = 1
+        self._lock = threading.Lock()
+    
+    def subscribe(self, callback, universes=None):
+        """
+        订阅通道变化
+        
+        Args:
+            callback (callable): 接收 ChangeSet 的函数，只在订阅的宇宙有变化的帧调用；
+                订阅后的第一帧只向该订阅者报告所有宇宙的全部通道，作为初始状态
+            universes (iterable, optional): 订阅的宇宙号，默认为全部
+            
+        Returns:
+            int: 订阅编号
+        """
+        with self._lock:
+            subscription_id = self._next_id
+            self._next_id += 1
+            self.subscriptions[subscription_id] = (callback, None if universes is None else set(universes))
+            self._pending.add(subscription_id)
+        return subscription_id
+    
+    def unsubscribe(self, subscription_id):
+        """
+        取消订阅
+        
+        Args:
+            subscription_id (int): 订阅编号
+            
+        Returns:
+            bool: 订阅是否存在
+        """
+        with self._lock:
+            self._pending.discard(subscription_id)
+            return self.subscriptions.pop(subscription_id, None) is not None
+    
+    def reset(self):
+        """
+        清除上一帧的数据，下一帧把所有宇宙的全部通道报告为变化（在输出线程中调用）
+        """
+        self.previous = None
+        self.previous_universes = ()
+    
+    def compare(self, frame):
+        """
+        比较输出帧与上一帧，生成通道变化
+        
+        新出现的宇宙（包括第一帧）报告全部通道，订阅者据此得到完整初始状态。
+        
+        Args:
+            frame (OutputFrame): 输出帧
+            
+        Returns:
+            ChangeSet: 通道变化
+        """
+        stride = frame.stride
+        count = len(frame.universes)
+        current = np.frombuffer(frame.data, dtype=np.uint8, count=count * stride).reshape(count, stride)
+        
+        if self.previous is not None and frame.universes == self.previous_universes:
+            previous = self.previous
+            new_rows = None
+        else:
+            # 宇宙列表变化时按宇宙号对齐上一帧
+            previous = np.zeros((count, stride), dtype=np.uint8)
+            new_rows = np.ones(count, dtype=bool)
+            old_rows = {universe: row for row, universe in enumerate(self.previous_universes)}
+            for row, universe in enumerate(frame.universes):
+                old_row = old_rows.get(universe)
+                if old_row is not None:
+                    previous[row] = self.previous[old_row]
+                    new_rows[row] = False
+        
+        changed = current != previous
+        if new_rows is not None:
+            changed[new_rows] = True
+        
+        changes = {}
+        for row in np.flatnonzero(changed.any(axis=1)).tolist():
+            indices = np.flatnonzero(changed[row])
+            changes[frame.universes[row]] = (indices, current[row, indices])
+        
+        # 后续处理阶段会原地修改帧数据，保存副本
+        self.previous = current.copy()
+        self.previous_universes = frame.universes
+        return ChangeSet(frame.number, frame.timestamp, stride, changes)
+    
+    def __call__(self, frame):
+        """
+        作为处理阶段使用: 比较帧数据并通知订阅者（不修改帧）
+        """
+        if not self.subscriptions:
+            # 没有订阅者时不比较，新订阅者从完整状态开始
+            self.reset()
+            return
+        
+        changes = self.compare(frame)
+        self.last_changes = changes
+        
+        with self._lock:
+            subscriptions = list(self.subscriptions.items())
+            pending, self._pending = self._pending, set()
+        full_state = None
+        for subscription_id, (callback, universes) in subscriptions:
+            change_set = changes
+            if subscription_id in pending:
+                # 新订阅者收到完整的初始状态，其他订阅者不受影响
+                if full_state is None:
+                    full_state = self._full_state(frame)
+                change_set = full_state
+            if not change_set.changes:
+                continue
+            if universes is not None and universes.isdisjoint(change_set.changes):
+                continue
+            try:
+                callback(change_set)
+            except Exception as e:
+                print(f"通道变化回调执行失败: {e}")
+    
+    def _full_state(self, frame):
+        """把刚比较过的一帧的所有通道作为变化（self.previous 已是该帧数据）"""
+        indices = np.arange(frame.stride)
+        changes = {universe: (indices, self.previous[row])
+                   for row, universe in enumerate(self.previous_universes)}
+        return ChangeSet(frame.number, frame.timestamp, frame.stride, changes)
@@ -6,6 +6,7 @@ import threading
 import time
 import json
 import os
+import random
 
 # ArtNetProtocol 类
 class ArtNetProtocol:
@@ -13,7 +14,17 @@ class ArtNetProtocol:
     
     # ArtNet数据包常量
     ARTNET_HEADER = b'Art-Net\x00'
+    OPCODE_POLL = 0x2000  # 节点发现请求操作码
+    OPCODE_POLL_REPLY = 0x2100  # 节点发现应答操作码
     OPCODE_DMX = 0x5000  # DMX数据数据包操作码
+    OPCODE_SYNC = 0x5200  # 同步数据包操作码
+    OPCODE_TIMECODE = 0x9700  # 时间码数据包操作码
+    
+    # ArtTimeCode 类型 -> 帧率
+    TIMECODE_FILM = 0  # 24fps
+    TIMECODE_EBU = 1  # 25fps
+    TIMECODE_DF = 2  # 29.97fps 丢帧
+    TIMECODE_SMPTE = 3  # 30fps
     
     def __init__(self):
         """初始化ArtNet协议实例"""
@@ -34,7 +45,32 @@ class ArtNetProtocol:
         # 端口地址格式: [7位Net][4位Sub-Net][4位Universe]
         return ((net & 0x7F) << 8) | ((subnet & 0x0F) << 4) | (universe & 0x0F)
     
-    def build_dmx_packet(self, net, subnet, universe, dmx_data):
+    def split_port_address(self, port_address):
+        """
+        将端口地址拆分为Net、Subnet、Universe
+        
+        Args:
+            port_address (int): 15位端口地址
+            
+        Returns:
+            tuple: (net, subnet, universe)
+        """
+        return (port_address >> 8) & 0x7F, (port_address >> 4) & 0x0F, port_address & 0x0F
+    
+    def normalize_length(self, length):
+        """
+        将通道数规整为ArtDmx允许的长度（2-512之间的偶数）
+        
+        Args:
+            length (int): 通道数
+            
+        Returns:
+            int: 规整后的长度
+        """
+        length = max(2, min(length, 512))
+        return length + (length & 1)
+    
+    def build_dmx_packet(self, net, subnet, universe, dmx_data, length=None, sequence=0):
         """
         构建DMX数据数据包
         
@@ -42,60 +78,147 @@ class ArtNetProtocol:
             net (int): 网络号 (0-127)
             subnet (int): 子网号 (0-15)
             universe (int): 宇宙号 (0-15)
-            dmx_data (list): DMX通道数据列表，长度为512，每个元素为0-255
-            
+            dmx_data (list|bytes): DMX通道数据，每个元素为0-255
+            length (int, optional): 数据长度，默认为dmx_data的长度；
+                会规整为2-512之间的偶数，不足部分补0
+                
         Returns:
             bytes: 完整的ArtNet DMX数据包
         """
-        # 确保dmx_data长度为512
-        dmx_data_512 = [0] * 512
-        for i in range(min(len(dmx_data), 512)):
-            dmx_data_512[i] = dmx_data[i] & 0xFF
+        length = self.normalize_length(len(dmx_data) if length is None else length)
+        
+        # 字节类数据直接切片复制，列表逐个截断到0-255
+        if isinstance(dmx_data, (bytes, bytearray, memoryview)):
+            data = bytes(dmx_data[:length])
+        else:
+            data = bytes(value & 0xFF for value in dmx_data[:length])
+        if len(data) < length:
+            data += bytes(length - len(data))
         
         # 计算端口地址
         port_address = self.get_port_address(net, subnet, universe)
         
-        # 构建数据包
-        packet = bytearray()
-        
-        # 添加ArtNet头部
-        packet.extend(self.ARTNET_HEADER)
-        
-        # 添加操作码 (小端序)
-        packet.extend(self.OPCODE_DMX.to_bytes(2, byteorder='little'))
-        
-        # 添加协议版本 (14)
-        packet.extend((14).to_bytes(2, byteorder='big'))
-        
-        # 添加序列号 (0)
-        packet.append(0)
+        # 头部: 标识 + 操作码(小端) + 协议版本14(大端) + 序列号 + 物理端口 + 端口地址(小端) + 数据长度(大端)
+        header = (
+            self.ARTNET_HEADER
+            + self.OPCODE_DMX.to_bytes(2, byteorder='little')
+            + (14).to_bytes(2, byteorder='big')
+            + bytes((sequence & 0xFF, 0))
+            + port_address.to_bytes(2, byteorder='little')
+            + length.to_bytes(2, byteorder='big')
+        )
         
-        # 添加物理端口 (0)
-        packet.append(0)
+        return header + data
+    
+    def build_poll_packet(self, flags=0x02):
+        """
+        构建节点发现请求数据包
         
-        # 添加端口地址 (小端序)
-        packet.extend(port_address.to_bytes(2, byteorder='little'))
+        Args:
+            flags (int, optional): 标志位，默认为0x02（节点状态变化时主动发送应答）
+            
+        Returns:
+            bytes: 完整的ArtPoll数据包
+        """
+        # 头部: 标识 + 操作码(小端) + 协议版本14(大端) + 标志 + 诊断优先级
+        return (
+            self.ARTNET_HEADER
+            + self.OPCODE_POLL.to_bytes(2, byteorder='little')
+            + (14).to_bytes(2, byteorder='big')
+            + bytes((flags & 0xFF, 0))
+        )
+    
+    def build_poll_reply_packet(self, ip, short_name, long_name="", net=0, subnet=0,
+                                output_universes=(), bind_index=1, mac=bytes(6)):
+        """
+        构建节点发现应答数据包（用于模拟节点）
         
-        # 添加数据长度 (512, 大端序)
-        packet.extend((512).to_bytes(2, byteorder='big'))
+        Args:
+            ip (str): 节点IP地址
+            short_name (str): 短名称，最长17字节
+            long_name (str, optional): 长名称，最长63字节
+            net (int, optional): 网络号 (0-127)
+            subnet (int, optional): 子网号 (0-15)
+            output_universes (iterable, optional): 输出端口的宇宙号 (0-15)，最多4个
+            bind_index (int, optional): 端口组编号，多端口组节点每组一个应答
+            mac (bytes, optional): 6字节MAC地址
+            
+        Returns:
+            bytes: 完整的ArtPollReply数据包
+        """
+        outputs = list(output_universes)[:4]
+        packet = bytearray(239)
+        packet[0:8] = self.ARTNET_HEADER
+        packet[8:10] = self.OPCODE_POLL_REPLY.to_bytes(2, byteorder='little')
+        packet[10:14] = bytes(int(part) for part in ip.split('.'))
+        packet[14:16] = (6454).to_bytes(2, byteorder='little')
+        packet[18] = net & 0x7F
+        packet[19] = subnet & 0x0F
+        short = short_name.encode('utf-8')[:17]
+        packet[26:26 + len(short)] = short
+        long = long_name.encode('utf-8')[:63]
+        packet[44:44 + len(long)] = long
+        packet[172:174] = len(outputs).to_bytes(2, byteorder='big')
+        for port, universe in enumerate(outputs):
+            packet[174 + port] = 0x80  # 端口类型: 可输出DMX
+            packet[182 + port] = 0x80  # 输出状态: 正在输出数据
+            packet[190 + port] = universe & 0x0F
+        packet[201:207] = mac[:6]
+        packet[211] = bind_index & 0xFF
+        return bytes(packet)
+    
+    def build_sync_packet(self):
+        """
+        构建同步数据包，通知节点同时输出之前收到的ArtDmx数据
         
-        # 添加DMX数据
-        for value in dmx_data_512:
-            packet.append(value)
+        Returns:
+            bytes: 完整的ArtSync数据包
+        """
+        # 头部: 标识 + 操作码(小端) + 协议版本14(大端) + 2字节保留
+        return (
+            self.ARTNET_HEADER
+            + self.OPCODE_SYNC.to_bytes(2, byteorder='little')
+            + (14).to_bytes(2, byteorder='big')
+            + bytes(2)
+        )
+    
+    def build_timecode_packet(self, hours, minutes, seconds, frames, timecode_type=TIMECODE_EBU, stream_id=0):
+        """
+        构建时间码数据包
         
-        return bytes(packet)
+        Args:
+            hours (int): 时 (0-23)
+            minutes (int): 分 (0-59)
+            seconds (int): 秒 (0-59)
+            frames (int): 帧 (0-29)
+            timecode_type (int, optional): 时间码类型 (0-3)，默认为EBU 25fps
+            stream_id (int, optional): 时间码流编号，默认为0（主时间码）
+            
+        Returns:
+            bytes: 完整的ArtTimeCode数据包
+        """
+        # 头部: 标识 + 操作码(小端) + 协议版本14(大端) + 保留 + 流编号，随后是帧、秒、分、时、类型
+        return (
+            self.ARTNET_HEADER
+            + self.OPCODE_TIMECODE.to_bytes(2, byteorder='little')
+            + (14).to_bytes(2, byteorder='big')
+            + bytes((0, stream_id & 0xFF, frames & 0xFF, seconds & 0xFF, minutes & 0xFF,
+                     hours & 0xFF, timecode_type & 0x03))
+        )
     
     def parse_packet(self, data):
         """
-        解析ArtNet数据包
+        解析ArtNet数据包，按操作码分别解析
         
         Args:
             data (bytes): 接收到的数据包
             
         Returns:
-            dict: 解析后的数据包信息，包括操作码、端口地址、DMX数据等
+            dict: 解析后的数据包信息，均包含操作码和协议版本；
+                ArtDmx 另含端口地址、DMX数据等，ArtTimeCode 另含时、分、秒、帧和类型，
+                其他操作码只包含这两项。无效数据包返回None
         """
-        if len(data) < 18:
+        if len(data) < 12:
             return None
         
         # 检查头部
@@ -108,6 +231,24 @@ class ArtNetProtocol:
         # 解析协议版本
         version = int.from_bytes(data[10:12], byteorder='big')
         
+        if opcode == self.OPCODE_DMX:
+            return self._parse_dmx(data, opcode, version)
+        if opcode == self.OPCODE_TIMECODE:
+            return self._parse_timecode(data, opcode, version)
+        if opcode == self.OPCODE_POLL_REPLY:
+            return self._parse_poll_reply(data, opcode)
+        return {
+            'opcode': opcode,
+            'version': version
+        }
+    
+    def _parse_dmx(self, data, opcode, version):
+        """
+        解析ArtDmx数据包
+        """
+        if len(data) < 18:
+            return None
+        
         # 解析序列号
         sequence = data[12]
         
@@ -141,6 +282,53 @@ class ArtNetProtocol:
             'dmx_data': dmx_data
         }
     
+    def _parse_timecode(self, data, opcode, version):
+        """
+        解析ArtTimeCode数据包
+        """
+        if len(data) < 19:
+            return None
+        
+        return {
+            'opcode': opcode,
+            'version': version,
+            'stream_id': data[13],
+            'frames': data[14],
+            'seconds': data[15],
+            'minutes': data[16],
+            'hours': data[17],
+            'type': data[18] & 0x03
+        }
+    
+    def _parse_poll_reply(self, data, opcode):
+        """
+        解析ArtPollReply数据包（应答中没有协议版本字段，version为节点固件版本）
+        """
+        if len(data) < 207:
+            return None
+        
+        num_ports = min(int.from_bytes(data[172:174], byteorder='big'), 4)
+        net_switch = data[18] & 0x7F
+        sub_switch = data[19] & 0x0F
+        return {
+            'opcode': opcode,
+            'version': int.from_bytes(data[16:18], byteorder='big'),
+            'ip': '.'.join(str(b) for b in data[10:14]),
+            'port': int.from_bytes(data[14:16], byteorder='little'),
+            'net': net_switch,
+            'subnet': sub_switch,
+            'short_name': data[26:44].split(b'\x00', 1)[0].decode('utf-8', 'replace'),
+            'long_name': data[44:108].split(b'\x00', 1)[0].decode('utf-8', 'replace'),
+            'num_ports': num_ports,
+            'port_types': list(data[174:174 + num_ports]),
+            'input_universes': [(net_switch << 8) | (sub_switch << 4) | (b & 0x0F)
+                                for b in data[186:186 + num_ports]],
+            'output_universes': [(net_switch << 8) | (sub_switch << 4) | (b & 0x0F)
+                                 for b in data[190:190 + num_ports]],
+            'mac': ':'.join(f"{b:02x}" for b in data[201:207]),
+            'bind_index': data[211] if len(data) > 211 else 0  # 多端口组节点每组一个应答
+        }
+    
     def validate_address(self, net, subnet, universe):
         """
         验证地址参数是否有效
@@ -183,6 +371,9 @@ class NetworkManager:
         self.callback = None
         self.broadcast_ip = "255.255.255.255"
         self.artnet_port = 6454
+        self.send_buffer_size = 1 << 20  # 请求的发送/接收缓冲区，避免一帧内大量数据包溢出默认缓冲区
+        self.receive_buffer_size = 1 << 20
+        self.tracer = None  # 追踪器，设置后记录接收回调的耗时
     
     def initialize(self):
         """
@@ -196,6 +387,8 @@ class NetworkManager:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
             # 绑定到本地端口，以便接收数据包
             self.socket.bind(("", self.artnet_port))
             self.socket.settimeout(0.1)  # 设置超时，避免阻塞
@@ -263,11 +456,15 @@ class NetworkManager:
             try:
                 data, addr = self.socket.recvfrom(1024)  # 接收数据包
                 if self.callback:
+                    tracer = self.tracer
+                    start = tracer.now() if tracer else 0
                     try:
                         self.callback(data, addr)
                     except Exception as callback_e:
                         if self.running:
                             print(f"回调函数执行失败: {callback_e}")
+                    if tracer:
+                        tracer.record('receive', start, 'input', {'bytes': len(data)})
             except socket.timeout:
                 continue
             except Exception as e:
@@ -305,6 +502,24 @@ class NetworkManager:
         """
         self.artnet_port = port
     
+    def get_local_ip(self):
+        """
+        获取本机用于对外通信的IP地址（不实际发送数据）
+        
+        Returns:
+            str: 本机IP地址；获取失败时返回None
+        """
+        probe = None
+        try:
+            probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            probe.connect((self.broadcast_ip, self.artnet_port))
+            return probe.getsockname()[0]
+        except Exception:
+            return None
+        finally:
+            if probe:
+                probe.close()
+    
     def is_connected(self):
         """
         检查网络连接状态
@@ -314,47 +529,289 @@ class NetworkManager:
         """
         return self.socket is not None
 
+# UniverseStore 类
+class UniverseStore:
+    """宇宙缓冲区存储类，所有宇宙的通道数据连续存放在同一块内存中"""
+    
+    def __init__(self, channels_per_universe=512, capacity=4):
+        """
+        初始化宇宙存储
+        
+        Args:
+            channels_per_universe (int, optional): 每个宇宙的通道数，默认为512
+            capacity (int, optional): 初始可容纳的宇宙数量，不足时自动扩容
+        """
+        self.stride = channels_per_universe
+        self.capacity = max(1, capacity)
+        self.buffer = bytearray(self.capacity * self.stride)
+        self.slots = {}  # 宇宙号 -> 槽位
+        self.universes = []  # 槽位 -> 宇宙号
+        # 每次重新分配缓冲区或修改宇宙号时递增，缓存了缓冲区视图或宇宙号的使用者据此失效重建
+        self.layout_version = 0
+        self.renames = []  # (修改后的布局版本, 原宇宙号, 新宇宙号)
+    
+    def has_universe(self, universe):
+        """
+        检查宇宙是否已存在
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            
+        Returns:
+            bool: 宇宙是否已存在
+        """
+        return universe in self.slots
+    
+    def add_universe(self, universe):
+        """
+        添加宇宙，已存在时直接返回其槽位
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            
+        Returns:
+            int: 宇宙所在的槽位
+        """
+        slot = self.slots.get(universe)
+        if slot is not None:
+            return slot
+        
+        slot = len(self.universes)
+        if slot >= self.capacity:
+            self._grow(self.capacity * 2)
+        self.slots[universe] = slot
+        self.universes.append(universe)
+        return slot
+    
+    def rename_universe(self, universe, new_universe):
+        """
+        修改宇宙号，通道数据保留在原槽位中
+        
+        Args:
+            universe (int): 原宇宙号
+            new_universe (int): 新宇宙号
+            
+        Returns:
+            bool: 是否修改成功（原宇宙不存在或新宇宙号已被使用时失败）
+        """
+        slot = self.slots.get(universe)
+        if slot is None or new_universe in self.slots:
+            return False
+        self.slots[new_universe] = slot
+        self.universes[slot] = new_universe
+        del self.slots[universe]
+        # 按宇宙号缓存了槽位的使用者需要重建
+        self.layout_version += 1
+        self.renames.append((self.layout_version, universe, new_universe))
+        return True
+    
+    def current_universe(self, universe, since_version):
+        """
+        按布局版本 since_version 之后的改名记录换算宇宙号
+        
+        Args:
+            universe (int): 布局版本为 since_version 时的宇宙号
+            since_version (int): 记录宇宙号时的布局版本
+            
+        Returns:
+            int: 现在的宇宙号
+        """
+        for version, old, new in self.renames:
+            if version > since_version and universe == old:
+                universe = new
+        return universe
+    
+    def get_slot(self, universe):
+        """
+        获取宇宙所在的槽位，不存在时自动创建
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            int: 槽位
+        """
+        slot = self.slots.get(universe)
+        if slot is None:
+            slot = self.add_universe(universe)
+        return slot
+    
+    def get_view(self, universe):
+        """
+        获取宇宙通道数据的内存视图（直接读写底层缓冲区）
+        
+        注意：缓冲区扩容后旧视图不再反映最新数据，不要长期保存视图。
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            memoryview: 长度为每宇宙通道数的视图
+        """
+        offset = self.get_slot(universe) * self.stride
+        return memoryview(self.buffer)[offset:offset + self.stride]
+    
+    def get_universe_ids(self):
+        """
+        获取按槽位排序的所有宇宙号
+        
+        Returns:
+            list: 宇宙号列表
+        """
+        return list(self.universes)
+    
+    def get_used_size(self):
+        """
+        获取已使用槽位占用的字节数
+        
+        Returns:
+            int: 字节数
+        """
+        return len(self.universes) * self.stride
+    
+    def snapshot(self, universes=None):
+        """
+        复制宇宙通道数据
+        
+        Args:
+            universes (list, optional): 要复制的宇宙号，默认为全部已使用的槽位
+            
+        Returns:
+            bytearray: 按给定顺序连续存放的通道数据副本
+        """
+        if universes is None:
+            # 所有宇宙连续存放，一次切片即可复制整帧
+            return bytearray(memoryview(self.buffer)[:self.get_used_size()])
+        return bytearray(b''.join(self.get_view(universe) for universe in universes))
+    
+    def clear(self):
+        """
+        将所有宇宙的通道清零（原地清零，不重新分配缓冲区）
+        """
+        self.buffer[:] = bytes(len(self.buffer))
+    
+    def _grow(self, capacity):
+        """
+        扩容缓冲区
+        
+        Args:
+            capacity (int): 新的宇宙容量
+        """
+        new_buffer = bytearray(capacity * self.stride)
+        new_buffer[:len(self.buffer)] = self.buffer
+        self.buffer = new_buffer
+        self.capacity = capacity
+        self.layout_version += 1
+
 # DMXController 类
 class DMXController:
     """DMX控制器类，管理DMX通道数据"""
     
-    def __init__(self, num_channels=512):
+    def __init__(self, num_channels=512, store=None):
         """
         初始化DMX控制器
         
         Args:
-            num_channels (int, optional): DMX通道数量，默认为512
+            num_channels (int, optional): 每个宇宙的DMX通道数量，默认为512
+            store (UniverseStore, optional): 宇宙缓冲区存储，默认新建
         """
         self.num_channels = num_channels
-        self.channels = [0] * num_channels  # 初始化所有通道为0
+        self.store = store or UniverseStore(num_channels)
+        self.default_universe = 0
+        self.store.add_universe(self.default_universe)
         self.last_update_time = 0
+        self.active_lengths = {}  # 宇宙号 -> 手动配置的有效通道数
+        self.auto_lengths = {}  # 宇宙号 -> 自动检测到的最高非零通道（只增不减）
+    
+    @property
+    def channels(self):
+        """默认宇宙的通道数据视图"""
+        return self.store.get_view(self.default_universe)
+    
+    def _resolve_universe(self, universe):
+        """
+        解析宇宙参数，None表示默认宇宙
+        """
+        return self.default_universe if universe is None else universe
+    
+    def set_default_universe(self, universe):
+        """
+        设置默认宇宙，未指定宇宙的通道操作都作用于默认宇宙
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+        """
+        self.store.add_universe(universe)
+        self.default_universe = universe
+    
+    def move_default_universe(self, universe):
+        """
+        把默认宇宙连同通道数据移动到新的宇宙号（修改输出地址时使用）
+        
+        新宇宙号已存在时只切换默认宇宙，两个宇宙的数据都保持不变。
+        
+        Args:
+            universe (int): 新宇宙号（15位端口地址）
+        """
+        old = self.default_universe
+        if universe == old:
+            return
+        if self.store.rename_universe(old, universe):
+            for lengths in (self.active_lengths, self.auto_lengths):
+                if old in lengths:
+                    lengths[universe] = lengths.pop(old)
+        else:
+            self.store.add_universe(universe)
+        self.default_universe = universe
+    
+    def add_universe(self, universe):
+        """
+        添加宇宙
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+        """
+        self.store.add_universe(universe)
     
-    def set_channel(self, channel, value):
+    def get_universe_ids(self):
+        """
+        获取所有宇宙号
+        
+        Returns:
+            list: 按存储顺序排列的宇宙号列表
+        """
+        return self.store.get_universe_ids()
+    
+    def set_channel(self, channel, value, universe=None):
         """
         设置单个DMX通道的值
         
         Args:
             channel (int): 通道号 (1-512)
             value (int): 通道值 (0-255)
+            universe (int, optional): 宇宙号，默认为默认宇宙
             
         Returns:
             bool: 设置是否成功
         """
         if 1 <= channel <= self.num_channels:
+            buffer = self.store.get_view(self._resolve_universe(universe))
             index = channel - 1
-            if self.channels[index] != value:
-                self.channels[index] = value & 0xFF  # 确保值在0-255范围内
+            value = value & 0xFF  # 确保值在0-255范围内
+            if buffer[index] != value:
+                buffer[index] = value
                 self.last_update_time = self._get_current_time()
             return True
         return False
     
-    def set_channels(self, channels, values):
+    def set_channels(self, channels, values, universe=None):
         """
         设置多个DMX通道的值
         
         Args:
             channels (list): 通道号列表
             values (list): 通道值列表
+            universe (int, optional): 宇宙号，默认为默认宇宙
             
         Returns:
             bool: 设置是否成功
@@ -364,12 +821,12 @@ class DMXController:
         
         updated = False
         for channel, value in zip(channels, values):
-            if self.set_channel(channel, value):
+            if self.set_channel(channel, value, universe):
                 updated = True
         
         return updated
     
-    def set_channel_range(self, start_channel, end_channel, value):
+    def set_channel_range(self, start_channel, end_channel, value, universe=None):
         """
         设置一个范围内的DMX通道值
         
@@ -377,46 +834,83 @@ class DMXController:
             start_channel (int): 起始通道号
             end_channel (int): 结束通道号
             value (int): 通道值
+            universe (int, optional): 宇宙号，默认为默认宇宙
             
         Returns:
             bool: 设置是否成功
         """
         if 1 <= start_channel <= end_channel <= self.num_channels:
-            updated = False
-            for channel in range(start_channel, end_channel + 1):
-                if self.set_channel(channel, value):
-                    updated = True
-            return updated
+            buffer = self.store.get_view(self._resolve_universe(universe))
+            count = end_channel - start_channel + 1
+            buffer[start_channel - 1:end_channel] = bytes((value & 0xFF,)) * count
+            self.last_update_time = self._get_current_time()
+            return True
         return False
     
-    def get_channel(self, channel):
+    def get_channel(self, channel, universe=None):
         """
         获取单个DMX通道的值
         
         Args:
             channel (int): 通道号 (1-512)
+            universe (int, optional): 宇宙号，默认为默认宇宙
             
         Returns:
             int: 通道值，范围0-255；如果通道号无效，返回-1
         """
         if 1 <= channel <= self.num_channels:
-            return self.channels[channel - 1]
+            return self.store.get_view(self._resolve_universe(universe))[channel - 1]
         return -1
     
-    def get_all_channels(self):
+    def get_all_channels(self, universe=None):
         """
         获取所有DMX通道的值
         
+        Args:
+            universe (int, optional): 宇宙号，默认为默认宇宙
+            
         Returns:
             list: 所有通道值的列表
         """
-        return self.channels.copy()
+        return list(self.store.get_view(self._resolve_universe(universe)))
+    
+    def get_universe_data(self, universe=None):
+        """
+        获取一个宇宙全部通道数据的快照
+        
+        Args:
+            universe (int, optional): 宇宙号，默认为默认宇宙
+            
+        Returns:
+            bytes: 通道数据
+        """
+        return bytes(self.store.get_view(self._resolve_universe(universe)))
+    
+    def set_universe_data(self, universe, data, offset=0):
+        """
+        批量写入一个宇宙的通道数据（一次切片赋值）
+        
+        Args:
+            universe (int): 宇宙号，None表示默认宇宙
+            data (bytes): 通道数据，超出宇宙范围的部分被忽略
+            offset (int, optional): 起始通道的索引（从0开始）
+            
+        Returns:
+            bool: 写入是否成功
+        """
+        if not 0 <= offset < self.num_channels:
+            return False
+        buffer = self.store.get_view(self._resolve_universe(universe))
+        count = min(len(data), self.num_channels - offset)
+        buffer[offset:offset + count] = data[:count]
+        self.last_update_time = self._get_current_time()
+        return True
     
     def reset_all_channels(self):
         """
-        重置所有DMX通道为0
+        重置所有宇宙的DMX通道为0
         """
-        self.channels = [0] * self.num_channels
+        self.store.clear()
         self.last_update_time = self._get_current_time()
     
     def get_channel_count(self):
@@ -428,6 +922,12 @@ class DMXController:
         """
         return self.num_channels
     
+    def mark_updated(self):
+        """
+        标记通道数据已更新（供直接写入缓冲区的批量操作调用）
+        """
+        self.last_update_time = self._get_current_time()
+    
     def get_last_update_time(self):
         """
         获取最后更新时间
@@ -446,12 +946,13 @@ class DMXController:
         """
         return time.time()
     
-    def apply_preset(self, preset):
+    def apply_preset(self, preset, universe=None):
         """
         应用通道预设
         
         Args:
             preset (dict): 预设字典，格式为 {"通道号": 值} 或 {"通道范围": 值}
+            universe (int, optional): 宇宙号，默认为默认宇宙
             
         Returns:
             bool: 应用是否成功
@@ -463,26 +964,93 @@ class DMXController:
                 # 处理通道范围
                 try:
                     start, end = map(int, key.split('-'))
-                    if self.set_channel_range(start, end, value):
+                    if self.set_channel_range(start, end, value, universe):
                         updated = True
                 except ValueError:
                     pass
             elif isinstance(key, int):
                 # 处理单个通道
-                if self.set_channel(key, value):
+                if self.set_channel(key, value, universe):
                     updated = True
         
         return updated
     
-    def get_channel_data_for_artnet(self):
+    def set_active_length(self, length, universe=None):
+        """
+        配置宇宙的有效通道数，输出时只发送这部分通道
+        
+        Args:
+            length (int): 有效通道数；None表示自动检测
+            universe (int, optional): 宇宙号，默认为默认宇宙
+        """
+        universe = self._resolve_universe(universe)
+        if length is None:
+            self.active_lengths.pop(universe, None)
+        else:
+            self.active_lengths[universe] = max(0, min(length, self.num_channels))
+    
+    def update_auto_length(self, universe, data):
+        """
+        根据一帧的通道数据更新自动检测的有效通道数
+        
+        自动长度取出现过的最高非零通道，只增不减：通道回到0后仍需继续发送0，
+        否则节点会保持最后收到的值。
+        
+        Args:
+            universe (int): 宇宙号
+            data (bytes): 该宇宙的通道数据
+        """
+        current = self.auto_lengths.get(universe, 0)
+        if current >= len(data):
+            return
+        used = len(bytes(data).rstrip(b'\x00'))
+        if used > current:
+            self.auto_lengths[universe] = used
+    
+    def is_universe_live(self, universe):
+        """
+        检查宇宙是否需要发送：默认宇宙、配置了有效通道数或出现过非零通道的宇宙
+        
+        只被创建而从未写入过的宇宙不发送，避免持续广播全零的数据包。
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            bool: 是否需要发送
+        """
+        return (universe == self.default_universe or universe in self.active_lengths
+                or self.auto_lengths.get(universe, 0) > 0)
+    
+    def get_active_length(self, universe=None):
+        """
+        获取宇宙的有效通道数（配置值优先，否则为自动检测值）
+        
+        Args:
+            universe (int, optional): 宇宙号，默认为默认宇宙
+            
+        Returns:
+            int: 有效通道数，向上取偶数且至少为2（ArtDmx的长度要求）
+        """
+        universe = self._resolve_universe(universe)
+        length = self.active_lengths.get(universe)
+        if length is None:
+            length = self.auto_lengths.get(universe, 0)
+        length = max(2, length + (length & 1))
+        return min(length, self.num_channels)
+    
+    def get_channel_data_for_artnet(self, universe=None):
         """
         获取用于ArtNet数据包的DMX通道数据
         
+        Args:
+            universe (int, optional): 宇宙号，默认为默认宇宙
+            
         Returns:
             list: DMX通道数据列表，长度为512
         """
         # 创建通道数据的副本，避免线程冲突
-        channels_copy = self.channels.copy()
+        channels_copy = self.get_all_channels(universe)
         
         # 确保返回的数据长度为512
         if len(channels_copy) < 512:
@@ -491,157 +1059,680 @@ class DMXController:
             return channels_copy[:512]
         return channels_copy
 
-# EffectEngine 类
-class EffectEngine:
-    """效果引擎类，实现各种灯光效果"""
+# SequenceFilter 类
+class SequenceFilter:
+    """接收端序列号过滤器，在数据进入DMXController之前丢弃过期或乱序的帧"""
     
-    def __init__(self, dmx_controller):
+    def __init__(self, window=20, timeout=1.0):
         """
-        初始化效果引擎
+        初始化序列号过滤器
         
         Args:
-            dmx_controller (DMXController): DMX控制器实例
-        """
-        self.dmx_controller = dmx_controller
-        self.running = False
-        self.effect_thread = None
+            window (int, optional): 落后于最新序列号多少以内视为过期帧，默认为20
+            timeout (float, optional): 同一来源超过此时间（秒）无数据后重新同步，
+                避免发送端重启后被一直丢弃
+        """
+        self.window = window
+        self.timeout = timeout
+        self.last = {}  # (来源地址, 端口地址) -> (序列号, 接收时间)
+        self.accepted = 0
+        self.dropped = 0
+        self.dropped_by_universe = {}  # 端口地址 -> 丢弃数量
     
-    def run_chase_effect(self, speed, direction="forward", pattern="linear", 
-                        start_channel=1, end_channel=512, intensity=255):
+    def accept(self, source, universe, sequence, now=None):
         """
-        运行跑灯效果
+        判断一帧是否应被接受
         
         Args:
-            speed (int): 速度 (1-100)
-            direction (str): 方向 (forward, backward, bounce)
-            pattern (str): 模式 (linear, random, alternate)
-            start_channel (int): 起始通道
-            end_channel (int): 结束通道
-            intensity (int): 强度 (0-255)
+            source: 来源标识，通常为发送端IP
+            universe (int): 端口地址
+            sequence (int): 数据包中的序列号，0表示发送端未启用
+            now (float, optional): 接收时间，默认为当前单调时间
+            
+        Returns:
+            bool: True表示接受；False表示已丢弃并计数
         """
-        self.stop_effect()
-        self.running = True
+        if sequence == 0:
+            self.accepted += 1
+            return True
         
-        # 使用局部变量存储通道范围
-        local_start = start_channel
-        local_end = end_channel
+        now = time.monotonic() if now is None else now
+        key = (source, universe)
+        previous = self.last.get(key)
+        if previous is not None and now - previous[1] < self.timeout:
+            # 序列号在1-255之间循环，落后于上一帧不超过窗口（含重复帧）的视为过期
+            if (previous[0] - sequence) % 255 < self.window:
+                self.dropped += 1
+                self.dropped_by_universe[universe] = self.dropped_by_universe.get(universe, 0) + 1
+                return False
         
-        self.effect_thread = threading.Thread(
-            target=self._run_chase,
-            args=(speed, direction, pattern, local_start, local_end, intensity),
-            daemon=True
-        )
-        self.effect_thread.start()
+        self.last[key] = (sequence, now)
+        self.accepted += 1
+        return True
     
-    def _run_chase(self, speed, direction, pattern, start_channel, end_channel, intensity):
+    def reset(self):
         """
-        运行跑灯效果的线程函数
+        清除所有来源的状态和计数
         """
-        channels = list(range(start_channel, end_channel + 1))
-        delay = (100 - speed) / 100.0  # 速度转换为延迟
+        self.last.clear()
+        self.accepted = 0
+        self.dropped = 0
+        self.dropped_by_universe.clear()
+
+# SystemClock 类
+class SystemClock:
+    """系统时钟：引擎默认使用的时钟，时间与输出流水线的帧时间戳一致"""
+    
+    def time(self):
+        """
+        获取当前时间
         
-        while self.running:
-            if pattern == "linear":
-                if direction == "forward":
-                    for ch in channels:
-                        if not self.running:
-                            break
-                        self.dmx_controller.set_channel(ch, intensity)
-                        time.sleep(delay)
-                        self.dmx_controller.set_channel(ch, 0)
-                elif direction == "backward":
-                    for ch in reversed(channels):
-                        if not self.running:
-                            break
-                        self.dmx_controller.set_channel(ch, intensity)
-                        time.sleep(delay)
-                        self.dmx_controller.set_channel(ch, 0)
-                elif direction == "bounce":
-                    for ch in channels:
-                        if not self.running:
-                            break
-                        self.dmx_controller.set_channel(ch, intensity)
-                        time.sleep(delay)
-                        self.dmx_controller.set_channel(ch, 0)
-                    for ch in reversed(channels[1:-1]):
-                        if not self.running:
-                            break
-                        self.dmx_controller.set_channel(ch, intensity)
-                        time.sleep(delay)
-                        self.dmx_controller.set_channel(ch, 0)
-            elif pattern == "random":
-                import random
-                random.shuffle(channels)
-                for ch in channels:
-                    if not self.running:
-                        break
-                    self.dmx_controller.set_channel(ch, intensity)
-                    time.sleep(delay)
-                    self.dmx_controller.set_channel(ch, 0)
-            elif pattern == "alternate":
-                even_channels = [ch for ch in channels if ch % 2 == 0]
-                odd_channels = [ch for ch in channels if ch % 2 != 0]
-                
-                for ch in even_channels:
-                    if not self.running:
-                        break
-                    self.dmx_controller.set_channel(ch, intensity)
-                time.sleep(delay)
-                for ch in even_channels:
-                    if not self.running:
-                        break
-                    self.dmx_controller.set_channel(ch, 0)
-                
-                for ch in odd_channels:
-                    if not self.running:
-                        break
-                    self.dmx_controller.set_channel(ch, intensity)
-                time.sleep(delay)
-                for ch in odd_channels:
-                    if not self.running:
-                        break
-                    self.dmx_controller.set_channel(ch, 0)
+        Returns:
+            float: time.time() 时间
+        """
+        return time.time()
     
-    def run_pulse_effect(self, speed, intensity=255, start_channel=1, end_channel=512):
+    def sleep(self, seconds):
         """
-        运行脉冲效果
+        等待指定秒数
         
         Args:
-            speed (int): 速度 (1-100)
-            intensity (int): 强度 (0-255)
-            start_channel (int): 起始通道
-            end_channel (int): 结束通道
+            seconds (float): 秒数
         """
-        self.stop_effect()
-        self.running = True
+        if seconds > 0:
+            time.sleep(seconds)
+
+# VirtualClock 类
+class VirtualClock:
+    """虚拟时钟：时间只在调用 set()/advance()/sleep() 时前进，用于离线渲染和确定性测试"""
+    
+    def __init__(self, start=0.0):
+        """
+        初始化虚拟时钟
+        
+        Args:
+            start (float, optional): 起始时间
+        """
+        self.now = start
+    
+    def time(self):
+        """
+        获取当前时间
+        
+        Returns:
+            float: 虚拟时间
+        """
+        return self.now
+    
+    def set(self, now):
+        """
+        设置当前时间
+        
+        Args:
+            now (float): 虚拟时间
+        """
+        self.now = now
+    
+    def advance(self, seconds):
+        """
+        前进指定秒数
+        
+        Args:
+            seconds (float): 秒数
+        """
+        self.now += seconds
+    
+    def sleep(self, seconds):
+        """
+        不等待，直接把时间前进指定秒数
+        
+        Args:
+            seconds (float): 秒数
+        """
+        if seconds > 0:
+            self.now += seconds
+
+# OutputFrame 类
+class OutputFrame:
+    """输出帧，保存一帧内所有宇宙通道数据的快照"""
+    
+    def __init__(self, number, timestamp, universes, data, stride):
+        """
+        初始化输出帧
+        
+        Args:
+            number (int): 帧序号
+            timestamp (float): 帧时间戳
+            universes (tuple): 按槽位排列的宇宙号
+            data (bytearray): 所有宇宙连续存放的通道数据副本
+            stride (int): 每个宇宙的通道数
+        """
+        self.number = number
+        self.timestamp = timestamp
+        self.universes = universes
+        self.data = data
+        self.stride = stride
+        self.slots = {universe: slot for slot, universe in enumerate(universes)}
+        self.lengths = {}  # 宇宙号 -> 发送的通道数，由流水线在处理阶段之后填写
+    
+    def get_universe_data(self, universe):
+        """
+        获取帧中一个宇宙的通道数据
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            memoryview: 通道数据视图；宇宙不存在时返回None
+        """
+        slot = self.slots.get(universe)
+        if slot is None:
+            return None
+        offset = slot * self.stride
+        return memoryview(self.data)[offset:offset + self.stride]
+    
+    def get_output_data(self, universe):
+        """
+        获取帧中一个宇宙实际发送的通道数据（截取到有效通道数）
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            memoryview: 通道数据视图；宇宙不存在时返回None
+        """
+        data = self.get_universe_data(universe)
+        if data is None:
+            return None
+        return data[:self.lengths.get(universe, self.stride)]
+
+# ArtNetTransport 类
+class ArtNetTransport:
+    """Art-Net输出后端，通过NetworkManager发送ArtDmx数据包"""
+    
+    def __init__(self, network_manager, protocol=None, target_ip=None, sync=False):
+        """
+        初始化Art-Net输出后端
         
-        self.effect_thread = threading.Thread(
-            target=self._run_pulse,
-            args=(speed, intensity, start_channel, end_channel),
-            daemon=True
+        Args:
+            network_manager (NetworkManager): 网络管理器实例
+            protocol (ArtNetProtocol, optional): 协议实例，默认新建
+            target_ip (str, optional): 目标IP地址，默认为网络管理器的广播地址
+            sync (bool, optional): 每帧发送完后是否发送ArtSync，使节点同时输出
+        """
+        self.network_manager = network_manager
+        self.protocol = protocol or ArtNetProtocol()
+        self.target_ip = target_ip
+        self.sync = sync
+        self.sequences = {}  # 宇宙号 -> 上一个序列号
+        self.sync_packet = self.protocol.build_sync_packet()
+        self.tracer = None  # 追踪器，由输出流水线设置
+    
+    def next_sequence(self, universe):
+        """
+        获取宇宙的下一个序列号，在1-255之间循环（0表示不启用，跳过）
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            int: 序列号
+        """
+        sequence = self.sequences.get(universe, 0) % 255 + 1
+        self.sequences[universe] = sequence
+        return sequence
+    
+    def send_universe(self, universe, data):
+        """
+        发送一个宇宙的数据
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            data (bytes): 通道数据
+            
+        Returns:
+            bool: 发送是否成功
+        """
+        tracer = self.tracer
+        start = tracer.now() if tracer else 0
+        net, subnet, sub_universe = self.protocol.split_port_address(universe)
+        packet = self.protocol.build_dmx_packet(net, subnet, sub_universe, data,
+                                                sequence=self.next_sequence(universe))
+        if tracer:
+            built = tracer.now()
+            tracer.record('build', start, 'artnet', None, built)
+        sent = self.network_manager.send_packet(packet, self.target_ip)
+        if tracer:
+            tracer.record('sendto', built, 'artnet', {'universe': universe})
+        return sent
+    
+    def end_frame(self):
+        """
+        一帧发送完毕，启用同步时发送ArtSync
+        """
+        if self.sync:
+            self.network_manager.send_packet(self.sync_packet, self.target_ip)
+    
+    def close(self):
+        """
+        关闭输出后端（网络管理器由调用方负责关闭）
+        """
+        pass
+
+# OutputPipeline 类
+class OutputPipeline:
+    """输出帧流水线：每帧对DMX缓冲区做快照，经处理阶段后按路由交给各传输后端发送"""
+    
+    def __init__(self, dmx_controller, frame_rate=50, clock=None):
+        """
+        初始化输出流水线
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            frame_rate (float, optional): 输出帧率，默认为50Hz
+            clock (SystemClock|VirtualClock, optional): 未指定帧时间戳时使用的时钟，默认为系统时钟
+        """
+        self.dmx_controller = dmx_controller
+        self.frame_rate = frame_rate
+        self.clock = clock or SystemClock()
+        self.transports = {}  # 名称 -> 传输后端
+        self.routes = {}  # 宇宙号 -> 传输后端名称元组
+        self.default_route = ('artnet',)
+        self.frame_hooks = []  # 帧钩子，每帧快照之前调用，可向DMX控制器写入数据
+        self.stages = []  # 处理阶段，按顺序对输出帧原地修改
+        self.taps = []  # 帧监听，每帧发送之后以实际发送的输出帧调用
+        self.frame_number = 0
+        self.late_frames = 0  # 处理和发送超出帧间隔的次数
+        self.tracer = None  # 追踪器，见 set_tracer
+        self.running = False
+        self.output_thread = None
+    
+    def add_transport(self, name, transport):
+        """
+        添加传输后端
+        
+        Args:
+            name (str): 后端名称，例如 'artnet'、'sacn'
+            transport: 实现 send_universe(universe, data) 和 close() 的对象；
+                可选实现 end_frame()，在每帧所有宇宙发送完后调用
+        """
+        self.transports[name] = transport
+        if hasattr(transport, 'tracer'):
+            transport.tracer = self.tracer
+    
+    def remove_transport(self, name):
+        """
+        移除传输后端
+        
+        Args:
+            name (str): 后端名称
+            
+        Returns:
+            被移除的传输后端；不存在时返回None
+        """
+        return self.transports.pop(name, None)
+    
+    def set_default_route(self, transport_names):
+        """
+        设置未单独配置路由的宇宙使用的传输后端
+        
+        Args:
+            transport_names (iterable): 后端名称列表
+        """
+        self.default_route = tuple(transport_names)
+    
+    def set_route(self, universe, transport_names):
+        """
+        设置一个宇宙使用的传输后端，例如 ('artnet', 'sacn') 表示同时发送
+        
+        Args:
+            universe (int): 宇宙号
+            transport_names (iterable): 后端名称列表；None表示恢复默认路由
+        """
+        if transport_names is None:
+            self.routes.pop(universe, None)
+        else:
+            self.routes[universe] = tuple(transport_names)
+    
+    def get_route(self, universe):
+        """
+        获取一个宇宙使用的传输后端名称
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            tuple: 后端名称元组
+        """
+        return self.routes.get(universe, self.default_route)
+    
+    def set_tracer(self, tracer):
+        """
+        设置追踪器，记录帧钩子、快照、处理阶段和各传输后端的耗时
+        
+        Args:
+            tracer (Tracer): 追踪器，None表示关闭追踪
+        """
+        self.tracer = tracer
+        for transport in self.transports.values():
+            if hasattr(transport, 'tracer'):
+                transport.tracer = tracer
+    
+    def add_frame_hook(self, hook):
+        """
+        添加帧钩子
+        
+        Args:
+            hook (callable): 接收帧时间戳的函数，在每帧快照DMX缓冲区之前调用
+        """
+        self.frame_hooks.append(hook)
+    
+    def remove_frame_hook(self, hook):
+        """
+        移除帧钩子
+        
+        Args:
+            hook (callable): 之前添加的帧钩子
+        """
+        if hook in self.frame_hooks:
+            self.frame_hooks.remove(hook)
+    
+    def add_stage(self, stage):
+        """
+        添加处理阶段
+        
+        Args:
+            stage (callable): 接收 OutputFrame 并原地修改其数据的函数
+        """
+        self.stages.append(stage)
+    
+    def remove_stage(self, stage):
+        """
+        移除处理阶段
+        
+        Args:
+            stage (callable): 之前添加的处理阶段
+        """
+        if stage in self.stages:
+            self.stages.remove(stage)
+    
+    def add_tap(self, tap):
+        """
+        添加帧监听
+        
+        Args:
+            tap (callable): 接收 OutputFrame 的函数，在每帧发送之后于输出线程中调用；
+                帧数据每帧新分配，监听可以直接保留帧对象，但不应修改它
+        """
+        self.taps.append(tap)
+    
+    def remove_tap(self, tap):
+        """
+        移除帧监听
+        
+        Args:
+            tap (callable): 之前添加的帧监听
+        """
+        if tap in self.taps:
+            self.taps.remove(tap)
+    
+    def build_frame(self, timestamp=None, universes=None):
+        """
+        对DMX缓冲区做快照并依次应用处理阶段
+        
+        Args:
+            timestamp (float, optional): 帧时间戳，默认为当前时间
+            universes (list, optional): 只处理这些宇宙，默认为全部
+            
+        Returns:
+            OutputFrame: 输出帧
+        """
+        timestamp = self.clock.time() if timestamp is None else timestamp
+        tracer = self.tracer
+        for hook in self.frame_hooks:
+            start = tracer.now() if tracer else 0
+            hook(timestamp)
+            if tracer:
+                tracer.record(tracer.name_of(hook), start, 'hook')
+        
+        start = tracer.now() if tracer else 0
+        store = self.dmx_controller.store
+        universes = tuple(store.universes if universes is None else universes)
+        frame = OutputFrame(
+            self.frame_number,
+            timestamp,
+            universes,
+            store.snapshot(None if universes == tuple(store.universes) else universes),
+            store.stride
         )
-        self.effect_thread.start()
+        self.frame_number += 1
+        if tracer:
+            tracer.record('snapshot', start, 'frame', {'universes': len(universes)})
+        
+        for stage in self.stages:
+            start = tracer.now() if tracer else 0
+            stage(frame)
+            if tracer:
+                tracer.record(tracer.name_of(stage), start, 'stage')
+        
+        # 处理阶段可能改变通道值，因此在其之后确定每个宇宙的发送长度；
+        # 从未写入过的宇宙没有发送长度，不会被发送
+        controller = self.dmx_controller
+        for universe in frame.universes:
+            if universe not in controller.active_lengths:
+                controller.update_auto_length(universe, frame.get_universe_data(universe))
+            if controller.is_universe_live(universe):
+                frame.lengths[universe] = controller.get_active_length(universe)
+        return frame
     
-    def _run_pulse(self, speed, intensity, start_channel, end_channel):
+    def send_frame(self, frame):
         """
-        运行脉冲效果的线程函数
+        按路由发送输出帧中的所有宇宙
+        
+        Args:
+            frame (OutputFrame): 输出帧
+            
+        Returns:
+            int: 成功发送的数据包数量
+        """
+        sent = 0
+        for universe in frame.universes:
+            if universe not in frame.lengths:
+                continue
+            data = frame.get_output_data(universe)
+            for name in self.get_route(universe):
+                transport = self.transports.get(name)
+                if transport and transport.send_universe(universe, data):
+                    sent += 1
+        for transport in self.transports.values():
+            end_frame = getattr(transport, 'end_frame', None)
+            if end_frame:
+                end_frame()
+        for tap in self.taps:
+            try:
+                tap(frame)
+            except Exception as e:
+                print(f"帧监听执行失败: {e}")
+        return sent
+    
+    def run_frame(self, timestamp=None, universes=None):
         """
-        delay = (100 - speed) / 1000.0  # 速度转换为延迟
+        生成并发送一帧
         
+        Args:
+            timestamp (float, optional): 帧时间戳，默认为当前时间
+            universes (list, optional): 只处理这些宇宙，默认为全部
+            
+        Returns:
+            int: 成功发送的数据包数量
+        """
+        tracer = self.tracer
+        start = tracer.now() if tracer else 0
+        frame = self.build_frame(timestamp, universes)
+        built = tracer.now() if tracer else 0
+        sent = self.send_frame(frame)
+        if tracer:
+            tracer.record('send', built, 'frame', {'packets': sent})
+            tracer.record('frame', start, 'frame', {'frame': frame.number})
+        return sent
+    
+    def start(self):
+        """
+        开始按帧率持续输出
+        """
+        if self.running:
+            return
+        self.running = True
+        self.output_thread = threading.Thread(target=self._run, daemon=True)
+        self.output_thread.start()
+    
+    def stop(self):
+        """
+        停止输出
+        """
+        self.running = False
+        if self.output_thread:
+            self.output_thread.join(timeout=1.0)
+            self.output_thread = None
+    
+    def close(self):
+        """
+        停止输出并关闭所有传输后端
+        """
+        self.stop()
+        for transport in self.transports.values():
+            transport.close()
+    
+    def _run(self):
+        """
+        输出线程的主函数，按固定帧间隔调度，避免误差累积
+        
+        帧时间戳使用调度时刻（换算为 time.time() 时间），而不是线程实际醒来的时刻，
+        因此帧钩子和帧监听看到的是均匀的帧时钟。
+        """
+        period = 1.0 / self.frame_rate
+        next_time = time.monotonic()
+        clock_offset = time.time() - next_time
         while self.running:
-            # 渐亮
-            for i in range(0, intensity + 1, 5):
-                if not self.running:
-                    break
-                self.dmx_controller.set_channel_range(start_channel, end_channel, i)
-                time.sleep(delay)
+            try:
+                self.run_frame(next_time + clock_offset)
+            except Exception as e:
+                print(f"输出帧错误: {e}")
             
-            # 渐暗
-            for i in range(intensity, -1, -5):
-                if not self.running:
-                    break
-                self.dmx_controller.set_channel_range(start_channel, end_channel, i)
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
                 time.sleep(delay)
+            else:
+                self.late_frames += 1
+                if self.tracer:
+                    self.tracer.instant('late_frame', 'frame', {'late_ms': -delay * 1000})
+                if delay < -period:
+                    # 落后超过一帧时不再追赶，从当前时间重新计时
+                    next_time = time.monotonic()
+                    clock_offset = time.time() - next_time
+
+# EffectEngine 类
+class EffectEngine:
+    """效果引擎类，实现各种灯光效果
+    
+    效果的输出只由开始以来经过的时间决定：可以在自己的线程中按时钟运行，
+    也可以作为帧钩子按帧时间计算（threaded=False），配合虚拟时钟即可离线渲染。
+    """
+    
+    MIN_STEP = 0.001  # 最短步进时间（秒），速度为100时使用
+    CUSTOM_STEP = 0.02  # 自定义效果在线程中运行时的更新间隔（秒）
+    MIN_FADE_PERIOD = 0.02  # 用渐变引擎运行脉冲时半周期的下限（秒），更短的渐变无法逐帧显示
+    
+    def __init__(self, dmx_controller, fade_engine=None, clock=None, threaded=True):
+        """
+        初始化效果引擎
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            fade_engine (FadeEngine, optional): 渐变引擎；提供时脉冲效果按输出帧平滑渐变
+            clock (SystemClock|VirtualClock, optional): 时钟，默认为系统时钟
+            threaded (bool, optional): True时效果在后台线程中运行；
+                False时由帧钩子驱动: pipeline.add_frame_hook(effect_engine)
+        """
+        self.dmx_controller = dmx_controller
+        self.fade_engine = fade_engine
+        self.clock = clock or SystemClock()
+        self.threaded = threaded
+        self.running = False
+        self.effect_thread = None
+        self.effect = None  # (效果名称, 参数字典)
+        self.effect_start = 0.0
+        self._lit = ()  # 跑灯效果当前点亮的通道
+        self._value = None  # 脉冲/频闪效果当前的通道值
+        self._fade_id = None
+        self._next_fade = 0.0
+        self._fade_target = 0
+    
+    def _start(self, name, params):
+        """停止当前效果并从现在开始新效果"""
+        self.stop_effect()
+        self.effect = (name, params)
+        self.effect_start = self.clock.time()
+        self._lit = ()
+        self._value = None
+        self._fade_id = None
+        self._next_fade = self.effect_start
+        self._fade_target = params.get('intensity', 0)
+        self.running = True
+        if self.threaded:
+            self.effect_thread = threading.Thread(target=self._run_effect, daemon=True)
+            self.effect_thread.start()
+    
+    def run_chase_effect(self, speed, direction="forward", pattern="linear", 
+                        start_channel=1, end_channel=512, intensity=255):
+        """
+        运行跑灯效果
+        
+        Args:
+            speed (int): 速度 (1-100)
+            direction (str): 方向 (forward, backward, bounce)
+            pattern (str): 模式 (linear, random, alternate)
+            start_channel (int): 起始通道
+            end_channel (int): 结束通道
+            intensity (int): 强度 (0-255)
+        """
+        channels = list(range(start_channel, end_channel + 1))
+        if pattern == "alternate":
+            sequence = [tuple(ch for ch in channels if ch % 2 == 0), tuple(ch for ch in channels if ch % 2 != 0)]
+        elif direction == "backward":
+            sequence = [(ch,) for ch in reversed(channels)]
+        elif direction == "bounce" and pattern == "linear":
+            sequence = [(ch,) for ch in channels + channels[-2:0:-1]]
+        else:
+            sequence = [(ch,) for ch in channels]
+        self._start('chase', {
+            'step': max((100 - speed) / 100.0, self.MIN_STEP),  # 速度转换为每步时间
+            'channels': channels,
+            'sequence': sequence,
+            'random': pattern == "random",
+            'intensity': intensity
+        })
+    
+    def run_pulse_effect(self, speed, intensity=255, start_channel=1, end_channel=512):
+        """
+        运行脉冲效果
+        
+        Args:
+            speed (int): 速度 (1-100)
+            intensity (int): 强度 (0-255)
+            start_channel (int): 起始通道
+            end_channel (int): 结束通道
+        """
+        step = max((100 - speed) / 1000.0, self.MIN_STEP)  # 速度转换为每步时间
+        self._start('pulse', {
+            'step': step,
+            'half_period': step * (intensity // 5 + 1),
+            'values': list(range(0, intensity + 1, 5)) + list(range(intensity, -1, -5)),
+            'start_channel': start_channel,
+            'end_channel': end_channel,
+            'intensity': intensity
+        })
     
     def run_strobe_effect(self, speed, intensity=255, start_channel=1, end_channel=512):
         """
@@ -653,27 +1744,119 @@ class EffectEngine:
             start_channel (int): 起始通道
             end_channel (int): 结束通道
         """
-        self.stop_effect()
-        self.running = True
+        step = max((100 - speed) / 1000.0, self.MIN_STEP)  # 速度转换为亮、灭各自的时间
+        self._start('strobe', {
+            'step': step,
+            'values': [intensity, 0],
+            'start_channel': start_channel,
+            'end_channel': end_channel,
+            'intensity': intensity
+        })
+    
+    def run_custom_effect(self, render, step=None):
+        """
+        运行自定义效果，例如 artnet_expression.ExpressionEffect
         
-        self.effect_thread = threading.Thread(
-            target=self._run_strobe,
-            args=(speed, intensity, start_channel, end_channel),
-            daemon=True
-        )
-        self.effect_thread.start()
+        Args:
+            render (callable): 接收效果开始以来秒数并写入输出的函数
+            step (float, optional): 在线程中运行时的更新间隔，默认为 CUSTOM_STEP；
+                作为帧钩子运行时每帧更新
+        """
+        self._start('custom', {'render': render, 'step': step or self.CUSTOM_STEP})
     
-    def _run_strobe(self, speed, intensity, start_channel, end_channel):
+    def update(self, now):
         """
-        运行频闪效果的线程函数
+        按时间计算并写入当前效果的输出
+        
+        Args:
+            now (float): 当前时间（时钟时间或帧时间戳）
+            
+        Returns:
+            float: 输出下一次变化的时间；没有运行中的效果时返回None
         """
-        delay = (100 - speed) / 1000.0  # 速度转换为延迟
+        if not self.running or self.effect is None:
+            return None
+        name, params = self.effect
+        if name == 'custom':
+            params['render'](max(0.0, now - self.effect_start))
+            return now + params['step']
+        if name == 'pulse' and self.fade_engine is not None:
+            return self._update_pulse_fades(now, params)
         
+        step = params['step']
+        index = int(max(0.0, now - self.effect_start) / step)
+        next_change = self.effect_start + (index + 1) * step
+        controller = self.dmx_controller
+        if name == 'chase':
+            sequence = params['sequence']
+            if not sequence:
+                return None
+            if params['random']:
+                # 每一轮按轮次打乱通道顺序，同一时间总是得到同样的结果
+                cycle, position = divmod(index, len(sequence))
+                order = list(params['channels'])
+                random.Random(cycle).shuffle(order)
+                lit = (order[position],)
+            else:
+                lit = sequence[index % len(sequence)]
+            if lit != self._lit:
+                for ch in self._lit:
+                    controller.set_channel(ch, 0)
+                for ch in lit:
+                    controller.set_channel(ch, params['intensity'])
+                self._lit = lit
+        else:
+            values = params['values']
+            value = values[index % len(values)]
+            if value != self._value:
+                controller.set_channel_range(params['start_channel'], params['end_channel'], value)
+                self._value = value
+        return next_change
+    
+    def _update_pulse_fades(self, now, params):
+        """用渐变引擎运行脉冲效果：按时间安排渐亮、渐暗，数值由每个输出帧计算"""
+        half_period = max(params['half_period'], self.MIN_FADE_PERIOD)
+        if self._next_fade + half_period <= now:
+            # 落后一个半周期以上（例如线程被挂起）时跳到当前时间，不补建错过的渐变
+            self._next_fade = now
+        while self._next_fade <= now:
+            self._fade_id = self.fade_engine.fade_channels(
+                None, params['start_channel'], params['end_channel'], self._fade_target, half_period, 'sine',
+                start_time=self._next_fade)
+            self._next_fade += half_period
+            self._fade_target = 0 if self._fade_target else params['intensity']
+        return self._next_fade
+    
+    def _run_effect(self):
+        """
+        效果线程的主函数：按时钟更新输出，在下一次变化时再醒来
+        """
         while self.running:
-            self.dmx_controller.set_channel_range(start_channel, end_channel, intensity)
-            time.sleep(delay)
-            self.dmx_controller.set_channel_range(start_channel, end_channel, 0)
-            time.sleep(delay)
+            try:
+                next_change = self.update(self.clock.time())
+            except Exception as e:
+                self._abort_effect(e)
+                break
+            if next_change is None:
+                break
+            # 最多等待50毫秒，保证停止效果时能及时退出
+            self.clock.sleep(min(0.05, max(0.0, next_change - self.clock.time())))
+    
+    def __call__(self, timestamp):
+        """
+        作为帧钩子使用（threaded=False时）: pipeline.add_frame_hook(effect_engine)
+        """
+        if self.running and not self.threaded:
+            try:
+                self.update(timestamp)
+            except Exception as e:
+                self._abort_effect(e)
+    
+    def _abort_effect(self, error):
+        """效果计算出错时停止效果（在效果线程或帧钩子中调用，不等待效果线程）"""
+        print(f"效果运行失败: {error}")
+        self.running = False
+        self._clear_output()
     
     def stop_effect(self):
         """
@@ -683,3 +1866,13 @@ class EffectEngine:
         if self.effect_thread:
             self.effect_thread.join(timeout=1.0)
             self.effect_thread = None
+        self._clear_output()
+    
+    def _clear_output(self):
+        """熄灭效果点亮的通道并取消效果的渐变"""
+        for ch in self._lit:
+            self.dmx_controller.set_channel(ch, 0)
+        self._lit = ()
+        if self._fade_id is not None and self.fade_engine is not None:
+            self.fade_engine.cancel(self._fade_id)
+            self._fade_id = None
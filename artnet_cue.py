@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+# ArtNet Cue - 场景列表：预先解码的场景、精确的GO时间和按需从磁盘加载
+
+import bisect
+import json
+import re
+import threading
+import queue
+
+import numpy as np
+
+from artnet_vector import StoreArray
+
+# Cue 类
+class Cue:
+    """场景：一组宇宙的目标通道值和渐变时间"""
+    
+    def __init__(self, number, universes, fade=0.0, delay=0.0, follow=None, name="", timecode=None):
+        """
+        初始化场景
+        
+        Args:
+            number (float): 场景编号
+            universes (dict): 宇宙号 -> 目标值；目标值为预设格式的字典
+                {"通道号": 值, "起始-结束": 值}，或整宇宙的 bytes
+            fade (float, optional): 渐变时间（秒）
+            delay (float, optional): GO之后延迟多久开始渐变（秒）
+            follow (float, optional): GO之后多久自动GO下一个场景（秒），None表示手动
+            name (str, optional): 场景名称
+            timecode (float, optional): 追踪时间码时触发该场景的时间码位置（秒）
+        """
+        self.number = number
+        self.universes = universes
+        self.fade = fade
+        self.delay = delay
+        self.follow = follow
+        self.name = name
+        self.timecode = timecode
+    
+    def to_dict(self):
+        """
+        转换为可保存为JSON的字典
+        
+        Returns:
+            dict: 场景数据，"number" 始终是第一个键
+        """
+        universes = {}
+        for universe, target in self.universes.items():
+            if isinstance(target, (bytes, bytearray)):
+                universes[str(universe)] = bytes(target).hex()
+            else:
+                universes[str(universe)] = {str(key): value for key, value in target.items()}
+        return {
+            'number': self.number,
+            'name': self.name,
+            'fade': self.fade,
+            'delay': self.delay,
+            'follow': self.follow,
+            'timecode': self.timecode,
+            'universes': universes
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        从字典创建场景
+        
+        Args:
+            data (dict): to_dict 生成的数据
+            
+        Returns:
+            Cue: 场景
+        """
+        universes = {}
+        for universe, target in data.get('universes', {}).items():
+            if isinstance(target, str):
+                universes[int(universe)] = bytes.fromhex(target)
+            else:
+                universes[int(universe)] = target
+        return cls(data['number'], universes, data.get('fade', 0.0), data.get('delay', 0.0),
+                   data.get('follow'), data.get('name', ""), data.get('timecode'))
+
+# CueFile 类
+class CueFile:
+    """按需加载的场景文件（JSON Lines，每行一个场景），打开时只建立行偏移索引"""
+    
+    NUMBER_PATTERN = re.compile(rb'"number"\s*:\s*(-?[0-9.]+)')
+    TIMECODE_PATTERN = re.compile(rb'"timecode"\s*:\s*(-?[0-9.]+)')
+    
+    def __init__(self, filename):
+        """
+        打开场景文件并建立索引
+        
+        Args:
+            filename (str): 文件路径
+        """
+        self.filename = filename
+        self.offsets = []  # 每个场景所在行的起始偏移
+        self.numbers = []  # 每个场景的编号
+        self.timecodes = []  # 每个场景的时间码位置，没有时为None
+        with open(filename, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    match = self.NUMBER_PATTERN.search(line)
+                    self.offsets.append(offset)
+                    self.numbers.append(float(match.group(1)) if match else float(len(self.numbers) + 1))
+                    match = self.TIMECODE_PATTERN.search(line)
+                    self.timecodes.append(float(match.group(1)) if match else None)
+                offset += len(line)
+        self._file = None
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.offsets)
+    
+    def get_cue(self, position):
+        """
+        读取并解析一个场景
+        
+        Args:
+            position (int): 场景在列表中的位置（从0开始）
+            
+        Returns:
+            Cue: 场景
+        """
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.filename, 'rb')
+            self._file.seek(self.offsets[position])
+            line = self._file.readline()
+        return Cue.from_dict(json.loads(line))
+    
+    def close(self):
+        """
+        关闭文件
+        """
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+    
+    @staticmethod
+    def save(filename, cues):
+        """
+        把场景保存为场景文件
+        
+        Args:
+            filename (str): 文件路径
+            cues (iterable): 场景列表
+        """
+        with open(filename, 'w') as f:
+            for cue in cues:
+                f.write(json.dumps(cue.to_dict()) + '\n')
+
+# CueList 类
+class CueList:
+    """场景列表，可以是内存中的场景，也可以是按需加载的场景文件"""
+    
+    def __init__(self, cues=None, cue_file=None):
+        """
+        初始化场景列表
+        
+        Args:
+            cues (list, optional): 内存中的场景
+            cue_file (CueFile, optional): 场景文件，指定时优先使用
+        """
+        self.cues = list(cues or [])
+        self.cue_file = cue_file
+        self.universe_map = {}  # 场景文件中的宇宙号 -> 现在的宇宙号，宇宙号被修改后使用
+    
+    @classmethod
+    def load(cls, filename):
+        """
+        打开场景文件
+        
+        Args:
+            filename (str): 文件路径
+            
+        Returns:
+            CueList: 场景列表；打开失败时返回空列表
+        """
+        try:
+            return cls(cue_file=CueFile(filename))
+        except Exception as e:
+            print(f"加载场景文件失败: {e}")
+            return cls()
+    
+    def __len__(self):
+        return len(self.cue_file) if self.cue_file else len(self.cues)
+    
+    def get_cue(self, position):
+        """
+        获取场景
+        
+        Args:
+            position (int): 位置（从0开始）
+            
+        Returns:
+            Cue: 场景
+        """
+        if self.cue_file:
+            cue = self.cue_file.get_cue(position)
+            if self.universe_map:
+                cue.universes = {self.universe_map.get(u, u): target for u, target in cue.universes.items()}
+            return cue
+        return self.cues[position]
+    
+    def rename_universe(self, universe, new_universe):
+        """
+        修改所有场景中的宇宙号（场景文件中的场景在读取时换算）
+        
+        Args:
+            universe (int): 原宇宙号
+            new_universe (int): 新宇宙号
+        """
+        for cue in self.cues:
+            if universe in cue.universes:
+                # 整体替换字典，解码线程正在读取的旧字典不受影响
+                cue.universes = {new_universe if u == universe else u: target
+                                 for u, target in cue.universes.items()}
+        if self.cue_file:
+            for original, current in self.universe_map.items():
+                if current == universe:
+                    self.universe_map[original] = new_universe
+            self.universe_map.setdefault(universe, new_universe)
+    
+    def find(self, number):
+        """
+        按编号查找场景位置
+        
+        Args:
+            number (float): 场景编号
+            
+        Returns:
+            int: 位置；不存在时返回-1
+        """
+        numbers = self.cue_file.numbers if self.cue_file else [cue.number for cue in self.cues]
+        for position, value in enumerate(numbers):
+            if value == number:
+                return position
+        return -1
+    
+    def get_timecodes(self):
+        """
+        获取设置了时间码的场景
+        
+        Returns:
+            list: 按时间码排序的 (时间码位置, 场景位置)
+        """
+        timecodes = self.cue_file.timecodes if self.cue_file else [cue.timecode for cue in self.cues]
+        return sorted((timecode, position) for position, timecode in enumerate(timecodes)
+                      if timecode is not None)
+    
+    def append(self, cue):
+        """
+        追加场景（场景文件会先全部读入内存）
+        
+        Args:
+            cue (Cue): 场景
+        """
+        if self.cue_file:
+            self.cues = [self.get_cue(i) for i in range(len(self.cue_file))]
+            self.cue_file.close()
+            self.cue_file = None
+            self.universe_map = {}
+        self.cues.append(cue)
+    
+    def save(self, filename):
+        """
+        保存为场景文件
+        
+        Args:
+            filename (str): 文件路径
+        """
+        CueFile.save(filename, (self.get_cue(i) for i in range(len(self))))
+
+# CueEngine 类
+class CueEngine:
+    """场景回放引擎：GO只在帧时钟上安排一次渐变，场景在后台线程中提前解码"""
+    
+    def __init__(self, dmx_controller, fade_engine, cue_list=None, preload=3):
+        """
+        初始化场景回放引擎
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            fade_engine (FadeEngine): 渐变引擎（需已作为帧钩子加入输出流水线）
+            cue_list (CueList, optional): 场景列表
+            preload (int, optional): 当前场景之后提前解码的场景数量（当前和前一个场景也会保留）
+        """
+        self.dmx_controller = dmx_controller
+        self.fade_engine = fade_engine
+        self.store_array = StoreArray(dmx_controller.store)
+        self.cue_list = cue_list or CueList()
+        self.preload = preload
+        self.current = -1  # 当前场景位置，-1表示尚未GO
+        self.follow_time = None  # 自动GO下一个场景的时间
+        self.decoded = {}  # 位置 -> (场景, 索引数组, 数值数组)
+        self.decode_misses = 0  # GO时场景尚未解码、需要等待后台线程解码的次数
+        self._pending = None  # (场景位置, GO时间)，等待解码完成后由帧钩子触发
+        self.timecode = None  # 时间码追踪器，设置后按时间码触发场景
+        self._timecode_cues = None  # (时间码位置列表, 场景位置列表)，按需生成
+        self._cue_count = 0
+        self._queue = queue.Queue()
+        self._loader_thread = None
+        self._lock = threading.Lock()
+        self._layout_version = dmx_controller.store.layout_version
+        if len(self.cue_list):
+            self._request_preload(-1)
+    
+    def _sync_layout(self):
+        """宇宙号被修改后（例如移动默认宇宙）换算场景中的宇宙号，并丢弃按旧宇宙号解码的场景"""
+        store = self.dmx_controller.store
+        with self._lock:
+            if store.layout_version == self._layout_version:
+                return
+            renames = [(old, new) for version, old, new in store.renames if version > self._layout_version]
+            for old, new in renames:
+                self.cue_list.rename_universe(old, new)
+            if renames:
+                self.decoded = {}
+            self._layout_version = store.layout_version
+    
+    def set_cue_list(self, cue_list):
+        """
+        更换场景列表
+        
+        Args:
+            cue_list (CueList): 场景列表
+        """
+        with self._lock:
+            self.cue_list = cue_list
+            self.current = -1
+            self.follow_time = None
+            self.decoded = {}
+            self._pending = None
+            self._timecode_cues = None
+            self._layout_version = self.dmx_controller.store.layout_version
+        self._request_preload(-1)
+    
+    def set_timecode(self, chaser):
+        """
+        追踪时间码：时间码走动时按场景的时间码位置触发场景，
+        跳转时直接触发跳转位置所在的场景，渐变从应有的进度继续；
+        追踪期间自动GO不生效
+        
+        Args:
+            chaser (TimecodeChaser): 时间码追踪器，None表示停止追踪
+        """
+        self.timecode = chaser
+        self._timecode_cues = None
+    
+    def decode(self, cue):
+        """
+        把场景解码为宇宙缓冲区一维视图中的索引和目标值
+        
+        Args:
+            cue (Cue): 场景
+            
+        Returns:
+            tuple: (索引数组, 数值数组)
+        """
+        universes = []
+        channels = []
+        values = []
+        channel_count = self.dmx_controller.get_channel_count()
+        for universe, target in cue.universes.items():
+            if isinstance(target, (bytes, bytearray)):
+                count = min(len(target), channel_count)
+                universes.extend([universe] * count)
+                channels.extend(range(count))
+                values.extend(target[:count])
+                continue
+            for key, value in target.items():
+                if isinstance(key, str) and '-' in key:
+                    start, end = map(int, key.split('-'))
+                else:
+                    start = end = int(key)
+                start, end = max(start, 1), min(end, channel_count)
+                universes.extend([universe] * (end - start + 1))
+                channels.extend(range(start - 1, end))
+                values.extend([value & 0xFF] * (end - start + 1))
+        return self.store_array.flat_indices(universes, channels), np.asarray(values, dtype=np.uint8)
+    
+    def _get_decoded(self, position):
+        """获取解码后的场景，尚未解码时返回None"""
+        with self._lock:
+            return self.decoded.get(position)
+    
+    def _request_preload(self, position):
+        """请求后台线程解码position前后的场景（前一个、当前和之后的若干个）"""
+        if self._loader_thread is None:
+            self._loader_thread = threading.Thread(target=self._loader, daemon=True)
+            self._loader_thread.start()
+        self._queue.put(position)
+    
+    def _loader(self):
+        """后台解码线程"""
+        while True:
+            position = self._queue.get()
+            if position is None:
+                break
+            try:
+                self._sync_layout()
+                first = max(position - 1, 0)
+                last = min(position + 1 + self.preload, len(self.cue_list))
+                for index in range(first, last):
+                    with self._lock:
+                        done = index in self.decoded
+                    if not done:
+                        cue = self.cue_list.get_cue(index)
+                        entry = (cue,) + self.decode(cue)
+                        with self._lock:
+                            self.decoded[index] = entry
+                with self._lock:
+                    # 只保留当前窗口附近的场景
+                    for index in [i for i in self.decoded if i < first or i >= last]:
+                        del self.decoded[index]
+            except Exception as e:
+                print(f"预加载场景失败: {e}")
+    
+    def fire(self, position, go_time=None):
+        """
+        触发指定位置的场景
+        
+        场景不在这里解码：尚未解码时交给后台线程，解码完成后由帧钩子按原定的GO时间触发，
+        渐变从应有的进度开始，输出线程不会因为解析场景而卡顿。
+        
+        Args:
+            position (int): 场景位置
+            go_time (float, optional): GO时间，默认为现在；自动GO使用计划时间以保证精确
+            
+        Returns:
+            bool: 触发是否成功（位置无效时失败）
+        """
+        if not 0 <= position < len(self.cue_list):
+            return False
+        go_time = self.fade_engine._now() if go_time is None else go_time
+        
+        self._sync_layout()
+        self.current = position
+        self.follow_time = None
+        entry = self._get_decoded(position)
+        if entry is None:
+            self.decode_misses += 1
+            self._pending = (position, go_time)
+            self._request_preload(position)
+            return True
+        self._pending = None
+        self._start(entry, position, go_time)
+        return True
+    
+    def _start(self, entry, position, go_time):
+        """为解码后的场景安排渐变和自动GO，并预加载附近的场景"""
+        cue, indices, values = entry
+        self.fade_engine.fade_to(indices, values, cue.fade, start_time=go_time + cue.delay)
+        self.follow_time = None if cue.follow is None else go_time + cue.follow
+        self._request_preload(position)
+    
+    def go(self, go_time=None):
+        """
+        触发下一个场景
+        
+        Returns:
+            bool: 触发是否成功（已是最后一个场景时失败）
+        """
+        return self.fire(self.current + 1, go_time)
+    
+    def back(self):
+        """
+        回到上一个场景
+        
+        Returns:
+            bool: 触发是否成功
+        """
+        return self.fire(self.current - 1)
+    
+    def go_to(self, number):
+        """
+        按编号触发场景
+        
+        Args:
+            number (float): 场景编号
+            
+        Returns:
+            bool: 触发是否成功
+        """
+        return self.fire(self.cue_list.find(number))
+    
+    def get_current_cue(self):
+        """
+        获取当前场景
+        
+        Returns:
+            Cue: 当前场景；尚未GO时返回None
+        """
+        if self.current < 0:
+            return None
+        self._sync_layout()
+        entry = self._get_decoded(self.current)
+        return self.cue_list.get_cue(self.current) if entry is None else entry[0]
+    
+    def __call__(self, timestamp):
+        """
+        作为帧钩子使用: pipeline.add_frame_hook(cue_engine)，处理自动GO和等待解码的场景
+        """
+        pending = self._pending
+        if pending is not None:
+            entry = self._get_decoded(pending[0])
+            if entry is not None and self._pending is pending:
+                self._pending = None
+                self._start(entry, *pending)
+        
+        if self.timecode is not None:
+            position = self.timecode.get_position(timestamp)
+            if position is not None:
+                self._chase(position, timestamp)
+                return
+        
+        follow_time = self.follow_time
+        if follow_time is not None and timestamp >= follow_time:
+            self.follow_time = None
+            self.go(follow_time)
+    
+    def _chase(self, position, timestamp):
+        """按时间码位置触发场景"""
+        if self._timecode_cues is None or len(self.cue_list) != self._cue_count:
+            entries = self.cue_list.get_timecodes()
+            self._timecode_cues = ([entry[0] for entry in entries], [entry[1] for entry in entries])
+            self._cue_count = len(self.cue_list)
+        times, positions = self._timecode_cues
+        index = bisect.bisect_right(times, position) - 1
+        if index < 0 or positions[index] == self.current:
+            return
+        # GO时间取场景时间码对应的本地时间，跳转到渐变中途时渐变从相应进度继续
+        self.fire(positions[index], timestamp - (position - times[index]))
+        self.follow_time = None
+    
+    def close(self):
+        """
+        停止后台解码线程
+        """
+        if self._loader_thread:
+            self._queue.put(None)
+            self._loader_thread.join(timeout=1.0)
+            self._loader_thread = None
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# ArtNet Curves - 输出阶段的调光曲线查找表和总控
+
+import functools
+import math
+
+import numpy as np
+
+from artnet_vector import frame_index
+
+# 内置曲线，输入和输出都是0.0-1.0之间的比例
+CURVE_FUNCTIONS = {
+    'linear': lambda x: x,
+    'square': lambda x: x * x,
+    'inverse_square': lambda x: math.sqrt(x),
+    's_curve': lambda x: 0.5 - 0.5 * math.cos(math.pi * x),
+    'gamma': lambda x, gamma=2.2: x ** gamma,
+    # LED灯具: 伽马校正，并把非零值抬高到最低可见亮度
+    'led': lambda x, gamma=2.2, minimum=0.0: 0.0 if x <= 0 else minimum + (1.0 - minimum) * x ** gamma,
+}
+
+# 直通曲线：不做任何转换，也不受总控影响（用于摇头、颜色轮等非亮度通道）
+RAW = 'raw'
+
+# 受总控影响的属性，Patch中其余属性默认使用直通曲线
+INTENSITY_ATTRIBUTES = ('dimmer', 'intensity', 'red', 'green', 'blue', 'white', 'amber', 'uv')
+
+@functools.lru_cache(maxsize=64)
+def build_curve(curve_type, params=()):
+    """
+    生成256项的8位曲线（按曲线类型和参数缓存）
+    
+    Args:
+        curve_type (str): 曲线类型，见 CURVE_FUNCTIONS，或 'raw'
+        params (tuple, optional): 曲线参数，例如 gamma 的 (2.2,)
+        
+    Returns:
+        numpy.ndarray: 只读的uint8数组，长度256
+    """
+    if curve_type == RAW:
+        curve = np.arange(256, dtype=np.uint8)
+    else:
+        function = CURVE_FUNCTIONS[curve_type]
+        curve = np.array([round(function(i / 255.0, *params) * 255) for i in range(256)], dtype=np.float64)
+        curve = np.clip(curve, 0, 255).astype(np.uint8)
+    curve.flags.writeable = False
+    return curve
+
+@functools.lru_cache(maxsize=16)
+def build_curve16(curve_type, params=()):
+    """
+    生成65536项的16位曲线（按曲线类型和参数缓存）
+    
+    Args:
+        curve_type (str): 曲线类型
+        params (tuple, optional): 曲线参数
+        
+    Returns:
+        numpy.ndarray: 只读的float64数组，值为0.0-1.0之间的比例
+    """
+    x = np.arange(65536, dtype=np.float64) / 65535.0
+    if curve_type == RAW:
+        curve = x
+    else:
+        curve = np.clip(np.vectorize(CURVE_FUNCTIONS[curve_type], otypes=[np.float64])(x, *params), 0.0, 1.0)
+    curve.flags.writeable = False
+    return curve
+
+# OutputCurves 类
+class OutputCurves:
+    """输出曲线处理阶段：对整帧一次查表完成调光曲线和总控"""
+    
+    def __init__(self, store, default_curve='linear'):
+        """
+        初始化输出曲线
+        
+        Args:
+            store (UniverseStore): 宇宙缓冲区存储（曲线按存储中的通道位置分配）
+            default_curve (str, optional): 未单独设置的通道使用的曲线，默认为线性
+        """
+        self.store = store
+        self.master = 1.0
+        # 曲线键: (曲线类型, 参数, 是否受总控影响)；编号0为默认曲线
+        self.curve_keys = [(default_curve, (), default_curve != RAW)]
+        self.channel_curves = np.zeros(0, dtype=np.intp)  # 存储一维位置 -> 曲线编号
+        self.pairs16 = []  # (高字节索引, 低字节索引, 曲线键)
+        self.table = None  # (曲线数, 256) 的查找表，已乘入总控
+        self._identity = True
+        self._frame_layout = None  # (帧的宇宙列表, 布局版本, 帧数据 -> 存储一维位置, 已不存在的宇宙的掩码)
+    
+    def _frame_positions(self, frame):
+        """
+        获取帧数据中每个通道在存储一维视图中的位置，按帧的宇宙列表和存储布局版本缓存；
+        宇宙号在建帧后被修改时，帧中旧宇宙号的通道位置记为0并由掩码标出
+        """
+        store = self.store
+        layout = self._frame_layout
+        if layout is None or layout[0] != frame.universes or layout[1] != store.layout_version:
+            stride = store.stride
+            slots = np.fromiter((store.slots.get(u, -1) for u in frame.universes), dtype=np.int64,
+                                count=len(frame.universes))
+            positions = (np.maximum(slots, 0)[:, None] * stride + np.arange(stride)).reshape(-1)
+            missing = np.repeat(slots < 0, stride)
+            layout = (frame.universes, store.layout_version, positions, missing if missing.any() else None)
+            self._frame_layout = layout
+        return layout[2], layout[3]
+    
+    def _curve_id(self, curve_type, params, mastered):
+        """获取曲线键的编号，新曲线会被追加"""
+        if curve_type == RAW:
+            mastered = False
+        key = (curve_type, tuple(params), mastered)
+        if key not in self.curve_keys:
+            self.curve_keys.append(key)
+            self.table = None
+        return self.curve_keys.index(key)
+    
+    def _ensure_size(self, size):
+        """按存储容量扩展通道曲线数组，新位置使用默认曲线"""
+        if len(self.channel_curves) < size:
+            grown = np.zeros(size, dtype=np.intp)
+            grown[:len(self.channel_curves)] = self.channel_curves
+            self.channel_curves = grown
+    
+    def set_curve(self, flat_indices, curve_type, params=(), mastered=True):
+        """
+        为一组通道设置曲线
+        
+        Args:
+            flat_indices (numpy.ndarray): 宇宙缓冲区一维视图中的索引，
+                可由 StoreArray.flat_indices 或 Patch 的属性地址表得到
+            curve_type (str): 曲线类型
+            params (tuple, optional): 曲线参数
+            mastered (bool, optional): 是否受总控影响
+        """
+        flat_indices = np.asarray(flat_indices, dtype=np.int64)
+        curve_id = self._curve_id(curve_type, params, mastered)
+        if len(flat_indices):
+            self._ensure_size(int(flat_indices.max()) + 1)
+            self.channel_curves[flat_indices] = curve_id
+        self._identity = False
+    
+    def set_universe_curve(self, universe, curve_type, params=(), mastered=True):
+        """
+        为一个宇宙的所有通道设置曲线
+        
+        Args:
+            universe (int): 宇宙号
+            curve_type (str): 曲线类型
+            params (tuple, optional): 曲线参数
+            mastered (bool, optional): 是否受总控影响
+        """
+        start = self.store.add_universe(universe) * self.store.stride
+        self.set_curve(np.arange(start, start + self.store.stride), curve_type, params, mastered)
+    
+    def set_curve_16bit(self, coarse_indices, fine_indices, curve_type, params=(), mastered=True):
+        """
+        为一组16位通道对设置曲线，高低字节合并后查表
+        
+        Args:
+            coarse_indices (numpy.ndarray): 高字节在一维视图中的索引
+            fine_indices (numpy.ndarray): 低字节在一维视图中的索引
+            curve_type (str): 曲线类型
+            params (tuple, optional): 曲线参数
+            mastered (bool, optional): 是否受总控影响
+        """
+        coarse_indices = np.asarray(coarse_indices, dtype=np.int64)
+        fine_indices = np.asarray(fine_indices, dtype=np.int64)
+        # 8位查表阶段对这两个字节直通，由16位阶段统一处理
+        self.set_curve(np.concatenate([coarse_indices, fine_indices]), RAW)
+        if curve_type == RAW:
+            mastered = False
+        self.pairs16.append((coarse_indices, fine_indices, (curve_type, tuple(params), mastered)))
+    
+    def apply_patch(self, patch, attribute_curves=None):
+        """
+        按灯具配接设置曲线：亮度类属性使用指定曲线并受总控影响，其余属性直通
+        
+        Args:
+            patch (Patch): 灯具配接
+            attribute_curves (dict, optional): 属性名 -> (曲线类型, 参数)，
+                未列出的亮度类属性使用默认曲线
+        """
+        attribute_curves = attribute_curves or {}
+        default_type, default_params, _ = self.curve_keys[0]
+        if patch.tables is None:
+            patch.compile()
+        
+        for name, table in patch.tables.items():
+            intensity = name in INTENSITY_ATTRIBUTES
+            curve_type, params = attribute_curves.get(name, (default_type, default_params) if intensity else (RAW, ()))
+            has_fine = table.fine >= 0
+            if has_fine.any():
+                self.set_curve_16bit(table.coarse[has_fine], table.fine[has_fine], curve_type, params, intensity)
+            self.set_curve(table.coarse[~has_fine], curve_type, params, intensity)
+    
+    def set_master(self, level):
+        """
+        设置总控
+        
+        Args:
+            level (float): 0.0-1.0 之间的比例
+        """
+        level = max(0.0, min(level, 1.0))
+        if level != self.master:
+            self.master = level
+            self.table = None
+    
+    def _build_table(self):
+        """
+        由缓存的曲线和当前总控生成查找表（仅在曲线或总控变化后调用）
+        
+        Returns:
+            numpy.ndarray: 查找表；界面线程可能随时把 self.table 置为None，调用方应使用返回值
+        """
+        master = self.master
+        rows = []
+        for curve_type, params, mastered in self.curve_keys:
+            curve = build_curve(curve_type, params)
+            if mastered and master < 1.0:
+                curve = np.round(curve * master).astype(np.uint8)
+            rows.append(curve)
+        table = np.stack(rows)
+        curve_type, _, mastered = self.curve_keys[0]
+        self._identity = (len(self.curve_keys) == 1 and curve_type in ('linear', RAW)
+                          and (not mastered or master == 1.0) and not self.pairs16)
+        self.table = table
+        return table
+    
+    def __call__(self, frame):
+        """
+        作为输出流水线的处理阶段: pipeline.add_stage(curves)
+        """
+        # 每帧只读取一次 self.table，界面线程调整总控时置为None不影响本帧
+        table = self.table
+        if table is None:
+            table = self._build_table()
+        if self._identity or not frame.data:
+            return
+        
+        data = np.frombuffer(frame.data, dtype=np.uint8)
+        stride = self.store.stride
+        self._ensure_size(len(self.store.universes) * stride)
+        full_frame = frame.universes == tuple(self.store.universes)
+        
+        # 8位曲线：一次二维花式索引完成所有通道
+        if len(self.curve_keys) == 1:
+            data[:] = table[0][data]
+        else:
+            if full_frame:
+                curve_ids = self.channel_curves[:len(data)]
+            else:
+                positions, missing = self._frame_positions(frame)
+                curve_ids = self.channel_curves[positions]
+                if missing is not None:
+                    curve_ids[missing] = 0
+            data[:] = table[curve_ids, data]
+        
+        # 16位曲线：合并高低字节后查表
+        for coarse, fine, (curve_type, params, mastered) in self.pairs16:
+            if not full_frame:
+                coarse, valid = frame_index(self.store, frame, coarse)
+                fine = frame_index(self.store, frame, fine)[0]
+                coarse, fine = coarse[valid], fine[valid]
+            curve = build_curve16(curve_type, params)
+            values = curve[(data[coarse].astype(np.int64) << 8) | data[fine]]
+            if mastered:
+                values = values * self.master
+            values = np.round(values * 65535).astype(np.int64)
+            data[coarse] = values >> 8
+            data[fine] = values & 0xFF
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# ArtNet Expression - 用户自定义的表达式效果，安全编译为NumPy向量化函数
+#
+# 用法:
+#     effect = ExpressionEffect(controller, "sin(t*speed + i*phase)*intensity", 1, 48, width=3,
+#                               params={'speed': 2.0, 'phase': 0.5, 'intensity': 255})
+#     effect_engine.run_custom_effect(effect)
+#
+# 表达式中可用的变量:
+#   t   效果开始以来的秒数
+#   i   灯具序号 (0 到 n-1)      c   灯具内的通道序号 (0 到 width-1)
+#   n   灯具数量                 x   灯具位置 (0.0-1.0，默认为 i/(n-1)，也可以指定)
+#   以及 params 中的参数；常量 pi、tau
+# 结果按DMX值 (0-255，配接属性为属性的取值范围) 写入，超出范围的部分被截断。
+#
+# 表达式只允许数字、变量、四则运算/乘方/取模、单个比较和白名单中的函数，
+# 不能访问属性、下标或内置函数；编译结果按表达式文本缓存，整组通道每次只计算一次。
+
+import ast
+import functools
+
+import numpy as np
+
+from artnet_vector import StoreArray
+
+# 表达式中可以调用的函数，参数和结果都是NumPy数组
+FUNCTIONS = {
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'asin': np.arcsin,
+    'acos': np.arccos,
+    'atan': np.arctan,
+    'atan2': np.arctan2,
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'floor': np.floor,
+    'ceil': np.ceil,
+    'round': np.round,
+    'min': np.minimum,
+    'max': np.maximum,
+    'clip': np.clip,
+    'where': np.where,
+    'saw': lambda p: np.mod(p, 1.0),  # 锯齿波，周期为1
+    'tri': lambda p: 1.0 - np.abs(2.0 * np.mod(p, 1.0) - 1.0),  # 三角波，周期为1
+    'square': lambda p: (np.mod(p, 1.0) < 0.5) * 1.0,  # 方波，周期为1
+    'rand': lambda p: np.mod(np.abs(np.sin(p * 12.9898) * 43758.5453), 1.0),  # 由参数决定的伪随机数
+}
+
+CONSTANTS = {'pi': np.pi, 'tau': 2.0 * np.pi}
+
+# 效果提供的内置变量，其余名称必须在 params 中给出
+VARIABLES = ('t', 'i', 'c', 'n', 'x')
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+_COMPARE_OPERATORS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+# _Validator 类
+class _Validator(ast.NodeTransformer):
+    """检查表达式只使用允许的语法，收集变量名，并把整数常量换成浮点数（避免大整数乘方）"""
+    
+    def __init__(self):
+        self.names = set()
+    
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+    
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError(f"不支持的常量: {node.value!r}")
+        return ast.copy_location(ast.Constant(float(node.value)), node)
+    
+    def visit_Name(self, node):
+        if node.id in FUNCTIONS:
+            raise ValueError(f"函数 {node.id} 必须调用")
+        if node.id.startswith('_'):
+            raise ValueError(f"无效的名称: {node.id}")
+        if node.id not in CONSTANTS:
+            self.names.add(node.id)
+        return node
+    
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BINARY_OPERATORS):
+            raise ValueError(f"不支持的运算: {type(node.op).__name__}")
+        return self.generic_visit(node)
+    
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPERATORS):
+            raise ValueError(f"不支持的运算: {type(node.op).__name__}")
+        return self.generic_visit(node)
+    
+    def visit_Compare(self, node):
+        # 连续比较 (a < b < c) 在数组上没有意义
+        if len(node.ops) != 1 or not isinstance(node.ops[0], _COMPARE_OPERATORS):
+            raise ValueError("只支持单个比较，例如 where(x < 0.5, a, b)")
+        return self.generic_visit(node)
+    
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ValueError(f"不支持的函数: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise ValueError(f"函数 {node.func.id} 不支持关键字参数")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+    
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Compare, ast.operator, ast.unaryop, ast.cmpop,
+                                 ast.Load)):
+            raise ValueError(f"不支持的语法: {type(node).__name__}")
+        return super().generic_visit(node)
+
+# ExpressionKernel 类
+class ExpressionKernel:
+    """编译后的表达式，以数组为参数一次计算所有通道"""
+    
+    def __init__(self, text, function, names):
+        """
+        初始化编译后的表达式
+        
+        Args:
+            text (str): 表达式文本
+            function (callable): 按 names 顺序接收参数的向量化函数
+            names (tuple): 表达式用到的变量名
+        """
+        self.text = text
+        self.function = function
+        self.names = names
+    
+    def evaluate(self, variables, shape=None):
+        """
+        计算表达式
+        
+        Args:
+            variables (dict): 变量名 -> 数值或数组
+            shape (tuple, optional): 结果广播到的形状
+            
+        Returns:
+            numpy.ndarray: float64结果，无效值 (nan/inf) 已换成有限值
+        """
+        try:
+            # 标量也转换为NumPy数值，除零和溢出得到inf/nan而不是异常
+            args = [np.asarray(variables[name], dtype=np.float64) for name in self.names]
+        except KeyError as e:
+            raise ValueError(f"表达式 {self.text} 缺少变量: {e.args[0]}")
+        with np.errstate(all='ignore'):
+            try:
+                result = np.asarray(self.function(*args), dtype=np.float64)
+            except ArithmeticError:
+                # 只含常量的部分仍按Python浮点数计算
+                result = np.zeros(())
+        result = np.nan_to_num(result, nan=0.0, posinf=0.0, neginf=0.0)
+        return result if shape is None else np.broadcast_to(result, shape)
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(text):
+    """
+    编译表达式（结果按表达式文本缓存）
+    
+    Args:
+        text (str): 表达式，例如 "sin(t*speed + i*phase)*intensity"
+        
+    Returns:
+        ExpressionKernel: 编译后的表达式
+        
+    Raises:
+        ValueError: 表达式有语法错误或使用了不允许的语法
+    """
+    try:
+        tree = ast.parse(text.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"表达式语法错误: {e.msg}")
+    validator = _Validator()
+    tree = validator.visit(tree)
+    
+    names = tuple(sorted(validator.names))
+    arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=name) for name in names],
+                              kwonlyargs=[], kw_defaults=[], defaults=[])
+    lambda_tree = ast.Expression(ast.Lambda(args=arguments, body=tree.body))
+    ast.fix_missing_locations(lambda_tree)
+    namespace = {'__builtins__': {}}
+    namespace.update(FUNCTIONS)
+    namespace.update(CONSTANTS)
+    function = eval(compile(lambda_tree, '<expression>', 'eval'), namespace)
+    return ExpressionKernel(text, function, names)
+
+# ExpressionEffect 类
+class ExpressionEffect:
+    """表达式效果，交给效果引擎运行: effect_engine.run_custom_effect(effect)"""
+    
+    def __init__(self, dmx_controller, expression, start_channel=1, end_channel=512, universe=None,
+                 params=None, width=1, positions=None):
+        """
+        初始化表达式效果（作用于一个宇宙中连续的通道）
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            expression (str): 表达式
+            start_channel (int, optional): 起始通道
+            end_channel (int, optional): 结束通道
+            universe (int, optional): 宇宙号，默认为默认宇宙
+            params (dict, optional): 表达式参数，可在运行中修改
+            width (int, optional): 每个灯具占用的通道数，例如RGB灯具为3
+            positions (iterable, optional): 每个灯具的位置，默认在0.0-1.0之间均匀分布
+            
+        Raises:
+            ValueError: 表达式无效，或使用了既不是内置变量也不在 params 中的名称
+        """
+        self.dmx_controller = dmx_controller
+        self.kernel = compile_expression(expression)
+        self.params = dict(params or {})
+        unknown = set(self.kernel.names) - set(VARIABLES) - set(self.params)
+        if unknown:
+            raise ValueError(f"表达式 {expression} 使用了未定义的名称: {', '.join(sorted(unknown))}")
+        self.patch = None
+        self.attribute = None
+        self.group = None
+        
+        universe = dmx_controller.default_universe if universe is None else universe
+        start_channel = max(start_channel, 1)
+        end_channel = min(end_channel, dmx_controller.get_channel_count())
+        channels = np.arange(start_channel - 1, max(end_channel, start_channel - 1), dtype=np.int64)
+        self.store_array = StoreArray(dmx_controller.store)
+        self.indices = self.store_array.flat_indices(np.full(len(channels), universe), channels)
+        width = max(int(width), 1)
+        offsets = np.arange(len(channels))
+        self._set_variables(offsets // width, offsets % width, positions)
+    
+    @classmethod
+    def for_attribute(cls, patch, attribute, expression, group=None, params=None, positions=None):
+        """
+        创建作用于配接属性的表达式效果，每个灯具计算一个值
+        
+        Args:
+            patch (Patch): 配接表
+            attribute (str): 属性名，例如 'dimmer'
+            expression (str): 表达式
+            group (str, optional): 编组名称，默认为所有灯具
+            params (dict, optional): 表达式参数
+            positions (iterable, optional): 每个灯具的位置
+            
+        Returns:
+            ExpressionEffect: 表达式效果；属性不存在时返回None
+        """
+        table, coarse, _ = patch._select(attribute, group)
+        if table is None:
+            return None
+        effect = cls(patch.dmx_controller, expression, 1, 0, params=params)
+        effect.patch = patch
+        effect.attribute = attribute
+        effect.group = group
+        effect._set_variables(np.arange(len(coarse)), np.zeros(len(coarse), dtype=np.int64), positions)
+        return effect
+    
+    def _set_variables(self, fixtures, channels, positions):
+        """生成与时间无关的变量数组"""
+        count = int(fixtures.max()) + 1 if len(fixtures) else 0
+        if positions is None:
+            positions = fixtures / (count - 1) if count > 1 else np.zeros(len(fixtures))
+        else:
+            positions = np.asarray(list(positions), dtype=np.float64)[fixtures]
+        self.shape = fixtures.shape
+        self.variables = {
+            'i': fixtures.astype(np.float64),
+            'c': channels.astype(np.float64),
+            'n': float(count),
+            'x': positions
+        }
+    
+    def evaluate(self, elapsed):
+        """
+        计算效果在某一时刻的输出
+        
+        Args:
+            elapsed (float): 效果开始以来的秒数
+            
+        Returns:
+            numpy.ndarray: 每个通道（配接属性时为每个灯具）的值
+        """
+        variables = dict(self.params)
+        variables.update(self.variables)
+        variables['t'] = elapsed
+        return self.kernel.evaluate(variables, self.shape)
+    
+    def __call__(self, elapsed):
+        """
+        由效果引擎调用: 计算并写入输出
+        """
+        values = np.rint(self.evaluate(elapsed))
+        if self.patch is not None:
+            self.patch.set_attribute(self.attribute, values, self.group)
+            return
+        self.store_array.flat()[self.indices] = np.clip(values, 0, 255)
+        self.dmx_controller.mark_updated()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# ArtNet Fade - 按输出帧计算的定时渐变引擎
+
+import itertools
+import threading
+
+import numpy as np
+
+from artnet_core import SystemClock
+from artnet_vector import StoreArray
+
+# 缓动曲线，输入为0.0-1.0之间的进度数组
+EASING_FUNCTIONS = {
+    'linear': lambda p: p,
+    'ease_in': lambda p: p * p,
+    'ease_out': lambda p: p * (2.0 - p),
+    'ease_in_out': lambda p: p * p * (3.0 - 2.0 * p),
+    'sine': lambda p: 0.5 - 0.5 * np.cos(np.pi * p),
+    'snap': lambda p: np.where(p < 1.0, 0.0, 1.0),  # 到时间后一次跳变
+}
+
+# Fade 类
+class Fade:
+    """一次渐变：一组通道在指定时长内从起始值变化到目标值"""
+    
+    def __init__(self, fade_id, indices, target, start_time, duration, easing, source=None):
+        """
+        初始化渐变
+        
+        Args:
+            fade_id (int): 渐变编号
+            indices (numpy.ndarray): 宇宙缓冲区一维视图中的索引
+            target (numpy.ndarray): 目标值
+            start_time (float): 开始时间
+            duration (float): 时长（秒）
+            easing (str): 缓动曲线名称
+            source (numpy.ndarray, optional): 起始值，默认在开始时刻读取当前值
+        """
+        self.fade_id = fade_id
+        self.indices = indices
+        self.target = target.astype(np.float64)
+        self.source = None if source is None else source.astype(np.float64)
+        self.start_time = start_time
+        self.duration = max(0.0, duration)
+        self.easing = easing
+        self.started = False  # 到达开始时间后才接管重叠的通道
+    
+    def remove_indices(self, indices):
+        """
+        移除由更新的渐变接管的通道
+        
+        Returns:
+            bool: 是否还有剩余通道
+        """
+        keep = ~np.isin(self.indices, indices)
+        if not keep.all():
+            self.indices = self.indices[keep]
+            self.target = self.target[keep]
+            if self.source is not None:
+                self.source = self.source[keep]
+        return len(self.indices) > 0
+
+# FadeEngine 类
+class FadeEngine:
+    """渐变引擎：作为输出流水线的帧钩子，每帧向量化计算所有进行中的渐变"""
+    
+    def __init__(self, dmx_controller, clock=None):
+        """
+        初始化渐变引擎
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            clock (SystemClock|VirtualClock, optional): 未指定开始时间时使用的时钟，默认为系统时钟
+        """
+        self.dmx_controller = dmx_controller
+        self.clock = clock or SystemClock()
+        self.store_array = StoreArray(dmx_controller.store)
+        self.fades = []  # 按创建顺序排列
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()  # UI线程添加渐变，输出线程计算渐变
+    
+    def _now(self):
+        """获取当前时间，与输出流水线的帧时间戳一致"""
+        return self.clock.time()
+    
+    def fade_to(self, flat_indices, target_values, duration, easing='linear', start_time=None, source_values=None):
+        """
+        开始一次渐变；到达开始时间时，与进行中的渐变重叠的通道由新渐变接管，
+        延时期间原有渐变照常进行
+        
+        Args:
+            flat_indices (numpy.ndarray): 宇宙缓冲区一维视图中的索引
+            target_values (numpy.ndarray|int): 目标值，每个通道一个或统一的值
+            duration (float): 时长（秒），0表示在下一帧直接跳到目标值
+            easing (str, optional): 缓动曲线名称，默认为线性
+            start_time (float, optional): 开始时间，默认为现在；可以是将来的时间（延时）
+            source_values (numpy.ndarray, optional): 起始值，默认为开始时刻的当前值
+            
+        Returns:
+            int: 渐变编号；缓动曲线无效时返回-1
+        """
+        if easing not in EASING_FUNCTIONS:
+            return -1
+        indices = np.asarray(flat_indices, dtype=np.int64)
+        target = np.broadcast_to(np.asarray(target_values), indices.shape)
+        source = None if source_values is None else np.broadcast_to(np.asarray(source_values), indices.shape)
+        
+        fade = Fade(next(self._ids), indices, target,
+                    self._now() if start_time is None else start_time,
+                    duration, easing, source)
+        with self.lock:
+            self.fades.append(fade)
+        return fade.fade_id
+    
+    def _take_over(self, now):
+        """让到达开始时间的渐变接管已在进行的渐变中重叠的通道（同一帧开始的渐变后来者优先）"""
+        starting = [fade for fade in self.fades if not fade.started and now >= fade.start_time]
+        if not starting:
+            return
+        for new in starting:
+            for old in self.fades:
+                if old is not new and old.started and len(old.indices):
+                    old.remove_indices(new.indices)
+            new.started = True
+        self.fades = [fade for fade in self.fades if not fade.started or len(fade.indices)]
+    
+    def fade_channels(self, universe, start_channel, end_channel, value, duration, easing='linear', start_time=None):
+        """
+        让一个宇宙内的通道范围渐变到同一个值
+        
+        Args:
+            universe (int): 宇宙号，None表示默认宇宙
+            start_channel (int): 起始通道号
+            end_channel (int): 结束通道号
+            value (int): 目标值 (0-255)
+            duration (float): 时长（秒）
+            easing (str, optional): 缓动曲线名称
+            start_time (float, optional): 开始时间
+            
+        Returns:
+            int: 渐变编号；参数无效时返回-1
+        """
+        if not 1 <= start_channel <= end_channel <= self.dmx_controller.get_channel_count():
+            return -1
+        universe = self.dmx_controller.default_universe if universe is None else universe
+        channels = range(start_channel - 1, end_channel)
+        indices = self.store_array.flat_indices([universe] * len(channels), channels)
+        return self.fade_to(indices, value & 0xFF, duration, easing, start_time)
+    
+    def fade_universe(self, universe, data, duration, easing='linear', start_time=None):
+        """
+        让整个宇宙渐变到目标数据
+        
+        Args:
+            universe (int): 宇宙号
+            data (bytes): 目标通道数据
+            duration (float): 时长（秒）
+            easing (str, optional): 缓动曲线名称
+            start_time (float, optional): 开始时间
+            
+        Returns:
+            int: 渐变编号
+        """
+        target = np.frombuffer(bytes(data[:self.dmx_controller.get_channel_count()]), dtype=np.uint8)
+        indices = self.store_array.flat_indices([universe] * len(target), range(len(target)))
+        return self.fade_to(indices, target, duration, easing, start_time)
+    
+    def cancel(self, fade_id):
+        """
+        取消渐变，通道保持当前值
+        
+        Args:
+            fade_id (int): 渐变编号
+        """
+        with self.lock:
+            self.fades = [fade for fade in self.fades if fade.fade_id != fade_id]
+    
+    def cancel_all(self):
+        """
+        取消所有渐变
+        """
+        with self.lock:
+            self.fades = []
+    
+    def is_active(self, fade_id=None):
+        """
+        检查是否有渐变在进行
+        
+        Args:
+            fade_id (int, optional): 渐变编号，默认检查任意渐变
+            
+        Returns:
+            bool: 是否在进行
+        """
+        if fade_id is None:
+            return bool(self.fades)
+        return any(fade.fade_id == fade_id for fade in self.fades)
+    
+    def update(self, now=None):
+        """
+        按给定时间计算所有渐变并写入宇宙缓冲区，完成的渐变在写入最终值后移除
+        
+        Args:
+            now (float, optional): 当前时间，默认为现在
+            
+        Returns:
+            int: 进行中的渐变数量
+        """
+        if not self.fades:
+            return 0
+        now = self._now() if now is None else now
+        with self.lock:
+            self._take_over(now)
+            flat = self.store_array.flat()
+            remaining = []
+            
+            for fade in self.fades:
+                if now < fade.start_time:
+                    remaining.append(fade)
+                    continue
+                if fade.source is None:
+                    fade.source = flat[fade.indices].astype(np.float64)
+                
+                if fade.duration > 0:
+                    progress = min((now - fade.start_time) / fade.duration, 1.0)
+                else:
+                    progress = 1.0
+                eased = EASING_FUNCTIONS[fade.easing](np.float64(progress))
+                values = fade.source + (fade.target - fade.source) * eased
+                flat[fade.indices] = np.rint(values).astype(np.uint8)
+                
+                if progress < 1.0:
+                    remaining.append(fade)
+            
+            self.fades = remaining
+        self.dmx_controller.mark_updated()
+        return len(remaining)
+    
+    def __call__(self, timestamp):
+        """
+        作为帧钩子使用: pipeline.add_frame_hook(fade_engine)
+        """
+        self.update(timestamp)
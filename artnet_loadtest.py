@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# ArtNet LoadTest - 本机回环压力测试：模拟Art-Net节点，逐步增加宇宙数找出帧预算的极限
+#
+# 用法:
+#     python artnet_loadtest.py --nodes 4 --max-universes 1024 --rate 44 --duration 2 --sync
+#
+# 每个模拟节点绑定一个回环地址 (127.0.0.2, 127.0.0.3, ...，Linux下整个127/8都是回环地址)，
+# 应答ArtPoll，接收ArtDmx/ArtSync并记录到达时间。被测的是真实的 NetworkManager 和
+# OutputPipeline：帧钩子把帧号写进每个宇宙的前4个通道，节点据此计算每个宇宙的延迟、
+# 帧率、丢包和乱序。帧率低于目标的95%、丢包超过1%或有超时帧时，视为超出帧预算。
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from artnet_core import ArtNetProtocol, NetworkManager, DMXController, OutputPipeline, ArtNetTransport
+
+FRAME_COUNTER = struct.Struct('>I')
+
+# VirtualNode 类
+class VirtualNode:
+    """模拟的Art-Net节点，记录收到的每个ArtDmx数据包"""
+    
+    def __init__(self, ip, index=0, port=6454):
+        """
+        初始化模拟节点
+        
+        Args:
+            ip (str): 绑定的回环地址
+            index (int, optional): 节点编号，用于名称和MAC地址
+            port (int, optional): Art-Net端口
+        """
+        self.ip = ip
+        self.index = index
+        self.port = port
+        self.protocol = ArtNetProtocol()
+        self.socket = None
+        self.thread = None
+        self.running = False
+        self.polls_answered = 0
+        self.syncs_received = 0
+        self.arrivals = []  # (宇宙号, 序列号, 帧号, 到达时间)
+    
+    def start(self):
+        """
+        绑定地址并开始接收
+        
+        Returns:
+            bool: 启动是否成功
+        """
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+            self.socket.bind((self.ip, self.port))
+            self.socket.settimeout(0.1)
+        except Exception as e:
+            print(f"模拟节点 {self.ip} 启动失败: {e}")
+            self.socket = None
+            return False
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+    
+    def stop(self):
+        """
+        停止接收并关闭socket
+        """
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+    
+    def reset(self):
+        """
+        清除统计数据
+        """
+        self.arrivals = []
+        self.syncs_received = 0
+    
+    def _run(self):
+        """
+        接收线程的主函数；只做最少的解析，避免节点本身成为瓶颈
+        """
+        header = ArtNetProtocol.ARTNET_HEADER
+        while self.running:
+            try:
+                data, addr = self.socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except Exception:
+                break
+            now = time.perf_counter()
+            if data[:8] != header or len(data) < 10:
+                continue
+            opcode = int.from_bytes(data[8:10], byteorder='little')
+            if opcode == ArtNetProtocol.OPCODE_DMX and len(data) >= 22:
+                universe = int.from_bytes(data[14:16], byteorder='little')
+                self.arrivals.append((universe, data[12], FRAME_COUNTER.unpack_from(data, 18)[0], now))
+            elif opcode == ArtNetProtocol.OPCODE_SYNC:
+                self.syncs_received += 1
+            elif opcode == ArtNetProtocol.OPCODE_POLL:
+                reply = self.protocol.build_poll_reply_packet(
+                    self.ip, f"Virtual {self.index}", f"Load test node {self.index}",
+                    mac=bytes((0x02, 0, 0, 0, 0, self.index & 0xFF)))
+                self.socket.sendto(reply, addr)
+                self.polls_answered += 1
+
+# LoadTest 类
+class LoadTest:
+    """驱动真实的输出流水线向模拟节点发送，并统计结果"""
+    
+    def __init__(self, nodes=4, frame_rate=44, duration=2.0, sync=False, base_ip="127.0.0.", first_host=2):
+        """
+        初始化压力测试
+        
+        Args:
+            nodes (int, optional): 模拟节点数量，宇宙按编号轮流分配给各节点
+            frame_rate (float, optional): 目标帧率
+            duration (float, optional): 每一档宇宙数的测试时长（秒）
+            sync (bool, optional): 是否每帧发送ArtSync
+            base_ip (str, optional): 节点地址前缀
+            first_host (int, optional): 第一个节点的主机号
+        """
+        self.frame_rate = frame_rate
+        self.duration = duration
+        self.sync = sync
+        self.nodes = [VirtualNode(f"{base_ip}{first_host + i}", i) for i in range(nodes)]
+        self.network_manager = NetworkManager()
+        self.frame_times = {}  # 帧号 -> 发送开始时间 (perf_counter)
+    
+    def start_nodes(self):
+        """
+        启动所有模拟节点，并用ArtPoll确认它们在线
+        
+        Returns:
+            int: 应答ArtPoll的节点数量
+        """
+        for node in self.nodes:
+            if not node.start():
+                return 0
+        if not self.network_manager.initialize():
+            return 0
+        poll = ArtNetProtocol().build_poll_packet()
+        for node in self.nodes:
+            self.network_manager.send_packet(poll, node.ip)
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline and any(node.polls_answered == 0 for node in self.nodes):
+            time.sleep(0.01)
+        return sum(1 for node in self.nodes if node.polls_answered)
+    
+    def stop_nodes(self):
+        """
+        停止所有模拟节点并关闭网络
+        """
+        for node in self.nodes:
+            node.stop()
+        self.network_manager.close()
+    
+    def _stamp_frame(self, controller):
+        """生成帧钩子：把帧号写入每个宇宙的前4个通道并记录发送时间"""
+        counter = [0]
+        store = controller.store
+        
+        def hook(timestamp):
+            frame_number = counter[0]
+            counter[0] += 1
+            stamp = FRAME_COUNTER.pack(frame_number)
+            for universe in store.universes:
+                store.get_view(universe)[0:4] = stamp
+            self.frame_times[frame_number] = time.perf_counter()
+        return hook
+    
+    def run_step(self, universe_count):
+        """
+        以给定宇宙数运行一档测试
+        
+        Args:
+            universe_count (int): 宇宙数量
+            
+        Returns:
+            dict: 统计结果
+        """
+        controller = DMXController()
+        for universe in range(universe_count):
+            controller.add_universe(universe)
+            controller.set_active_length(512, universe)
+        pipeline = OutputPipeline(controller, self.frame_rate)
+        for index, node in enumerate(self.nodes):
+            pipeline.add_transport(f"node{index}", ArtNetTransport(self.network_manager, target_ip=node.ip,
+                                                                   sync=self.sync))
+        for universe in range(universe_count):
+            pipeline.set_route(universe, (f"node{universe % len(self.nodes)}",))
+        pipeline.add_frame_hook(self._stamp_frame(controller))
+        
+        for node in self.nodes:
+            node.reset()
+        self.frame_times = {}
+        pipeline.start()
+        time.sleep(self.duration)
+        pipeline.stop()
+        time.sleep(0.1)  # 等待最后的数据包到达
+        return self._collect(universe_count, pipeline)
+    
+    def _collect(self, universe_count, pipeline):
+        """汇总节点记录的到达数据"""
+        frames_sent = pipeline.frame_number
+        latencies = []
+        received = 0
+        reordered = 0
+        last_frame = {}
+        for node in self.nodes:
+            for universe, _, frame_number, arrival in node.arrivals:
+                sent_at = self.frame_times.get(frame_number)
+                if sent_at is None:
+                    continue
+                received += 1
+                latencies.append(arrival - sent_at)
+                if frame_number < last_frame.get(universe, -1):
+                    reordered += 1
+                last_frame[universe] = max(frame_number, last_frame.get(universe, -1))
+        
+        expected = frames_sent * universe_count
+        loss = 1.0 - received / expected if expected else 0.0
+        achieved_rate = frames_sent / self.duration
+        latencies.sort()
+        result = {
+            'universes': universe_count,
+            'frames': frames_sent,
+            'frame_rate': achieved_rate,
+            'universe_rate': received / universe_count / self.duration if universe_count else 0.0,
+            'loss': max(loss, 0.0),
+            'reordered': reordered,
+            'late_frames': pipeline.late_frames,
+            'syncs': sum(node.syncs_received for node in self.nodes),
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p99': latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+        }
+        result['ok'] = (achieved_rate >= self.frame_rate * 0.95 and result['loss'] <= 0.01
+                        and pipeline.late_frames == 0)
+        return result
+    
+    def run(self, max_universes=1024, steps=None):
+        """
+        从1个宇宙开始逐档加倍，直到超出帧预算或达到上限
+        
+        Args:
+            max_universes (int, optional): 宇宙数上限
+            steps (list, optional): 指定每一档的宇宙数，默认为 1, 2, 4, ... max_universes
+            
+        Returns:
+            list: 每一档的统计结果
+        """
+        if steps is None:
+            steps = []
+            count = 1
+            while count < max_universes:
+                steps.append(count)
+                count *= 2
+            steps.append(max_universes)
+        
+        results = []
+        for count in steps:
+            result = self.run_step(count)
+            results.append(result)
+            print(format_result(result))
+            if not result['ok']:
+                break
+        return results
+
+def format_result(result):
+    """
+    格式化一档测试结果
+    
+    Args:
+        result (dict): LoadTest.run_step 的结果
+        
+    Returns:
+        str: 一行文本
+    """
+    return (f"{result['universes']:5d} 宇宙  帧率 {result['frame_rate']:6.1f}  "
+            f"每宇宙 {result['universe_rate']:6.1f}/s  丢包 {result['loss'] * 100:5.2f}%  "
+            f"乱序 {result['reordered']:4d}  超时帧 {result['late_frames']:4d}  "
+            f"延迟 {result['latency_avg'] * 1000:6.2f}ms (p99 {result['latency_p99'] * 1000:6.2f}ms)  "
+            f"{'通过' if result['ok'] else '超出帧预算'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Art-Net 本机回环压力测试")
+    parser.add_argument('--nodes', type=int, default=4, help="模拟节点数量")
+    parser.add_argument('--max-universes', type=int, default=1024, help="宇宙数上限")
+    parser.add_argument('--rate', type=float, default=44, help="目标帧率")
+    parser.add_argument('--duration', type=float, default=2.0, help="每一档的测试时长（秒）")
+    parser.add_argument('--sync', action='store_true', help="每帧发送ArtSync")
+    args = parser.parse_args()
+    
+    test = LoadTest(args.nodes, args.rate, args.duration, args.sync)
+    online = test.start_nodes()
+    if online < len(test.nodes):
+        print(f"只有 {online}/{len(test.nodes)} 个模拟节点应答ArtPoll")
+        test.stop_nodes()
+        return
+    print(f"{online} 个模拟节点已上线，目标帧率 {args.rate:g}Hz")
+    try:
+        results = test.run(args.max_universes)
+    finally:
+        test.stop_nodes()
+    
+    passed = [result['universes'] for result in results if result['ok']]
+    if passed and results[-1]['ok']:
+        print(f"最多测试了 {passed[-1]} 个宇宙，均在帧预算之内")
+    elif passed:
+        print(f"帧预算在 {passed[-1]} 到 {results[-1]['universes']} 个宇宙之间被突破")
+    else:
+        print("1个宇宙即超出帧预算")
+
+if __name__ == '__main__':
+    main()
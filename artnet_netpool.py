@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# ArtNet NetPool - 多网卡输出：每个网络接口（源IP）一个socket，按宇宙分配路由
+#
+# 用法:
+#     pool = SocketPool()
+#     pool.add_interface('wired', '192.168.1.10')
+#     pool.add_interface('wifi', '10.0.0.5', '10.0.0.255')
+#     pool.add_to_pipeline(pipeline, sync=True)  # 每个接口一个名称相同的 ArtNetTransport
+#     pool.distribute(pipeline, range(64))        # 宇宙轮流分配到各接口，也可以 pipeline.set_route(u, ('wifi',))
+#     print(pool.get_stats())
+#
+# 每个socket绑定到自己的源IP，发送缓冲区加大到数MB，并使用非阻塞发送：
+# 缓冲区满时立即丢弃并计数，不会让输出线程阻塞在某一块网卡上。
+# 这些socket只发送，绑定临时端口而不是6454：绑定 (源IP, 6454) 会让系统把发往该IP的
+# 单播Art-Net（ArtPollReply、ArtDmx输入）交给这个没人读取的socket，NetworkManager 的监听收不到。
+# 绑定源IP的socket发往 255.255.255.255 时仍按默认路由出网，因此每个接口使用自己网段的定向广播地址。
+
+import errno
+import socket
+
+from artnet_core import ArtNetTransport
+
+DEFAULT_SEND_BUFFER = 4 << 20  # 4MB，约可容纳数千个ArtDmx数据包
+
+# InterfaceSocket 类
+class InterfaceSocket:
+    """一个网络接口上的发送socket，接口与 NetworkManager.send_packet 相同，可交给 ArtNetTransport 使用"""
+    
+    def __init__(self, name, source_ip, broadcast_ip=None, port=6454, send_buffer=DEFAULT_SEND_BUFFER):
+        """
+        初始化接口socket
+        
+        Args:
+            name (str): 接口名称，同时用作传输后端名称
+            source_ip (str): 该接口的本机IP地址
+            broadcast_ip (str, optional): 广播地址，默认按/24网段计算，例如 192.168.1.255
+            port (int, optional): 目标Art-Net端口
+            send_buffer (int, optional): 请求的发送缓冲区字节数
+        """
+        self.name = name
+        self.source_ip = source_ip
+        self.broadcast_ip = broadcast_ip or source_ip.rsplit('.', 1)[0] + '.255'
+        self.artnet_port = port
+        self.requested_send_buffer = send_buffer
+        self.send_buffer = 0  # 系统实际分配的缓冲区（可能受系统上限限制）
+        self.socket = None
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.packets_dropped = 0  # 发送缓冲区满而丢弃的数据包
+        self.send_errors = 0  # 其他发送错误（例如网卡断开）
+    
+    def initialize(self):
+        """
+        创建socket并绑定到源IP的临时端口（只用于发送）
+        
+        Returns:
+            bool: 初始化是否成功
+        """
+        if self.socket:
+            return True
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.requested_send_buffer)
+            sock.bind((self.source_ip, 0))
+            sock.setblocking(False)
+        except Exception as e:
+            print(f"接口 {self.name} ({self.source_ip}) 初始化失败: {e}")
+            return False
+        self.send_buffer = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        self.socket = sock
+        return True
+    
+    def send_packet(self, packet, target_ip=None, port=None):
+        """
+        发送数据包（非阻塞，缓冲区满时丢弃）
+        
+        Args:
+            packet (bytes): 要发送的数据包
+            target_ip (str, optional): 目标IP地址，默认为该接口的广播地址
+            port (int, optional): 目标端口，默认为ArtNet默认端口
+            
+        Returns:
+            bool: 数据包是否交给了系统发送
+        """
+        if not self.socket and not self.initialize():
+            return False
+        try:
+            self.socket.sendto(packet, (target_ip or self.broadcast_ip, port or self.artnet_port))
+        except (BlockingIOError, InterruptedError):
+            self.packets_dropped += 1
+            return False
+        except OSError as e:
+            if e.errno == errno.ENOBUFS:
+                self.packets_dropped += 1
+            else:
+                self.send_errors += 1
+                print(f"接口 {self.name} 发送数据包失败: {e}")
+            return False
+        self.packets_sent += 1
+        self.bytes_sent += len(packet)
+        return True
+    
+    def get_stats(self):
+        """
+        获取发送统计
+        
+        Returns:
+            dict: 源IP、缓冲区大小和发送、丢弃、错误计数
+        """
+        return {
+            'source_ip': self.source_ip,
+            'broadcast_ip': self.broadcast_ip,
+            'send_buffer': self.send_buffer,
+            'packets_sent': self.packets_sent,
+            'bytes_sent': self.bytes_sent,
+            'packets_dropped': self.packets_dropped,
+            'send_errors': self.send_errors
+        }
+    
+    def set_broadcast_ip(self, ip):
+        """
+        设置该接口的广播IP地址
+        
+        Args:
+            ip (str): 广播IP地址
+        """
+        self.broadcast_ip = ip
+    
+    def close(self):
+        """
+        关闭socket
+        """
+        if self.socket:
+            try:
+                self.socket.close()
+            except Exception as e:
+                print(f"关闭socket失败: {e}")
+            self.socket = None
+
+# SocketPool 类
+class SocketPool:
+    """接口socket池，每个配置的网络接口一个socket"""
+    
+    def __init__(self, port=6454, send_buffer=DEFAULT_SEND_BUFFER):
+        """
+        初始化socket池
+        
+        Args:
+            port (int, optional): 目标Art-Net端口
+            send_buffer (int, optional): 每个socket请求的发送缓冲区字节数
+        """
+        self.port = port
+        self.send_buffer = send_buffer
+        self.interfaces = {}  # 名称 -> InterfaceSocket
+    
+    def add_interface(self, name, source_ip, broadcast_ip=None):
+        """
+        添加网络接口并创建socket
+        
+        Args:
+            name (str): 接口名称，例如 'wired'、'wifi'
+            source_ip (str): 该接口的本机IP地址
+            broadcast_ip (str, optional): 广播地址，默认按/24网段计算
+            
+        Returns:
+            InterfaceSocket: 接口socket；创建失败时返回None
+        """
+        interface = InterfaceSocket(name, source_ip, broadcast_ip, self.port, self.send_buffer)
+        if not interface.initialize():
+            return None
+        self.remove_interface(name)
+        self.interfaces[name] = interface
+        return interface
+    
+    def remove_interface(self, name):
+        """
+        移除并关闭网络接口
+        
+        Args:
+            name (str): 接口名称
+            
+        Returns:
+            bool: 接口是否存在
+        """
+        interface = self.interfaces.pop(name, None)
+        if interface is None:
+            return False
+        interface.close()
+        return True
+    
+    def get_interface(self, name):
+        """
+        获取网络接口
+        
+        Args:
+            name (str): 接口名称
+            
+        Returns:
+            InterfaceSocket: 接口socket；不存在时返回None
+        """
+        return self.interfaces.get(name)
+    
+    def add_to_pipeline(self, pipeline, protocol=None, sync=False):
+        """
+        为每个接口向输出流水线添加一个同名的 Art-Net 传输后端
+        
+        Args:
+            pipeline (OutputPipeline): 输出流水线
+            protocol (ArtNetProtocol, optional): 协议实例
+            sync (bool, optional): 每帧发送完后是否在各接口发送ArtSync
+            
+        Returns:
+            list: 添加的传输后端名称
+        """
+        for name, interface in self.interfaces.items():
+            pipeline.add_transport(name, ArtNetTransport(interface, protocol, sync=sync))
+        return list(self.interfaces)
+    
+    def distribute(self, pipeline, universes, names=None):
+        """
+        把宇宙轮流分配到各接口，使输出带宽随网卡数量增加
+        
+        Args:
+            pipeline (OutputPipeline): 输出流水线
+            universes (iterable): 宇宙号
+            names (list, optional): 参与分配的接口名称，默认为全部
+        """
+        names = list(self.interfaces) if names is None else list(names)
+        if not names:
+            return
+        for index, universe in enumerate(universes):
+            pipeline.set_route(universe, (names[index % len(names)],))
+    
+    def get_stats(self):
+        """
+        获取所有接口的发送统计
+        
+        Returns:
+            dict: 接口名称 -> 统计
+        """
+        return {name: interface.get_stats() for name, interface in self.interfaces.items()}
+    
+    def get_dropped(self):
+        """
+        获取所有接口丢弃的数据包总数
+        
+        Returns:
+            int: 数据包数
+        """
+        return sum(interface.packets_dropped for interface in self.interfaces.values())
+    
+    def close(self):
+        """
+        关闭所有socket
+        """
+        for interface in self.interfaces.values():
+            interface.close()
+        self.interfaces = {}
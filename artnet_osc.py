@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# ArtNet OSC - OSC (UDP) 远程控制输入，同一帧内的通道写入合并为一次批量写入
+#
+# 支持的地址（值可以是0-255的整数，也可以是0.0-1.0的浮点数）:
+#   /dmx/<通道> 值                   默认宇宙的单个通道
+#   /dmx/<宇宙>/<通道> 值            指定宇宙的单个通道
+#   /dmx/range 起始 结束 值 [宇宙]   通道范围
+#   /dmx/universe/<宇宙> blob        整宇宙数据
+#   /preset/<名称> [宇宙]            应用预设
+#   /cue/go  /cue/back  /cue/goto 编号
+#   /effect/<chase|pulse|strobe> [速度 强度 起始 结束]  /effect/stop
+#
+# 监听线程只负责解析并记录操作，作为输出流水线的帧钩子在每帧开始时统一执行；
+# 相邻的通道写入合并成一个写入块，整块用一次向量化写入完成。
+# 没有在输出时（一段时间内没有帧），监听线程自己执行积累的操作。
+# /dmx 和 /preset 只能写入已经存在的宇宙，OSC消息不会创建新的宇宙。
+
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from artnet_vector import StoreArray
+
+def _read_string(data, offset):
+    """读取以0结尾并按4字节对齐的OSC字符串"""
+    end = data.index(b'\x00', offset)
+    return data[offset:end].decode('utf-8', 'replace'), (end + 4) & ~3
+
+def parse_osc(data):
+    """
+    解析OSC数据包，展开其中的所有消息
+    
+    Args:
+        data (bytes): OSC消息或bundle
+        
+    Returns:
+        list: [(地址, 参数列表), ...]
+    """
+    if data.startswith(b'#bundle\x00'):
+        messages = []
+        offset = 16  # 标识 + 8字节时间标签
+        while offset + 4 <= len(data):
+            size = struct.unpack_from('>i', data, offset)[0]
+            offset += 4
+            messages.extend(parse_osc(data[offset:offset + size]))
+            offset += size
+        return messages
+    
+    address, offset = _read_string(data, 0)
+    if offset >= len(data):
+        return [(address, [])]
+    tags, offset = _read_string(data, offset)
+    args = []
+    for tag in tags[1:]:
+        if tag == 'i':
+            args.append(struct.unpack_from('>i', data, offset)[0])
+            offset += 4
+        elif tag == 'f':
+            args.append(struct.unpack_from('>f', data, offset)[0])
+            offset += 4
+        elif tag == 's':
+            value, offset = _read_string(data, offset)
+            args.append(value)
+        elif tag == 'b':
+            size = struct.unpack_from('>i', data, offset)[0]
+            args.append(data[offset + 4:offset + 4 + size])
+            offset += (4 + size + 3) & ~3
+        elif tag == 'T':
+            args.append(True)
+        elif tag == 'F':
+            args.append(False)
+        elif tag == 'N':
+            args.append(None)
+        else:
+            raise ValueError(f"不支持的OSC类型: {tag}")
+    return [(address, args)]
+
+def _to_dmx(value):
+    """把OSC参数换算为0-255的通道值，浮点数按0.0-1.0比例换算"""
+    if isinstance(value, float):
+        return int(round(max(0.0, min(value, 1.0)) * 255))
+    return max(0, min(int(value), 255))
+
+# OSCServer 类
+class OSCServer:
+    """OSC远程控制服务器，作为帧钩子使用: pipeline.add_frame_hook(osc_server)"""
+    
+    IDLE_FLUSH = 0.1  # 超过这么多秒没有帧时由监听线程执行积累的操作
+    
+    def __init__(self, dmx_controller, port=8000, cue_engine=None, effect_engine=None, presets=None):
+        """
+        初始化OSC服务器
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            port (int, optional): 监听端口，默认为8000
+            cue_engine (CueEngine, optional): 场景回放引擎，用于 /cue 地址
+            effect_engine (EffectEngine, optional): 效果引擎，用于 /effect 地址
+            presets (dict, optional): 预设名称 -> 预设字典，用于 /preset 地址
+        """
+        self.dmx_controller = dmx_controller
+        self.store_array = StoreArray(dmx_controller.store)
+        self.port = port
+        self.cue_engine = cue_engine
+        self.effect_engine = effect_engine
+        self.presets = presets or {}
+        self.socket = None
+        self.listener_thread = None
+        self.running = False
+        self.messages_received = 0
+        self.writes_applied = 0  # 实际执行的批量写入次数
+        self._operations = []  # 待执行的操作；写入块为 {(宇宙, 通道索引): 值}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 帧钩子和监听线程不会同时执行操作
+        self._last_flush = time.monotonic()
+    
+    def start(self):
+        """
+        开始监听
+        
+        Returns:
+            bool: 启动是否成功
+        """
+        if self.running:
+            return True
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            # 推子类控制器会在瞬间发出大量消息，加大接收缓冲区避免丢包
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            self.socket.bind(("", self.port))
+            self.socket.settimeout(0.1)
+        except Exception as e:
+            print(f"OSC服务器启动失败: {e}")
+            self.socket = None
+            return False
+        
+        self.running = True
+        self.listener_thread = threading.Thread(target=self._listen, daemon=True)
+        self.listener_thread.start()
+        return True
+    
+    def stop(self):
+        """
+        停止监听并关闭socket
+        """
+        self.running = False
+        if self.listener_thread:
+            self.listener_thread.join(timeout=1.0)
+            self.listener_thread = None
+        if self.socket:
+            try:
+                self.socket.close()
+            except Exception as e:
+                print(f"关闭socket失败: {e}")
+            self.socket = None
+    
+    def _listen(self):
+        """
+        监听线程的主函数
+        """
+        while self.running:
+            if self._operations and time.monotonic() - self._last_flush > self.IDLE_FLUSH:
+                # 输出没有运行，帧钩子不会被调用
+                self.flush()
+            try:
+                data, _ = self.socket.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except Exception as e:
+                if self.running:
+                    print(f"接收OSC数据包失败: {e}")
+                break
+            try:
+                for address, args in parse_osc(data):
+                    self.handle_message(address, args)
+            except Exception as e:
+                print(f"解析OSC数据包错误: {e}")
+    
+    def _write_block(self):
+        """获取可以继续追加通道写入的写入块（调用方持有锁）"""
+        if not self._operations or not isinstance(self._operations[-1], dict):
+            self._operations.append({})
+        return self._operations[-1]
+    
+    def _queue_channels(self, universe, start, end, value):
+        """记录通道写入，start/end为通道号 (1-based)；宇宙不存在时返回False"""
+        if universe is None:
+            universe = self.dmx_controller.default_universe
+        elif not self.dmx_controller.store.has_universe(universe):
+            return False
+        start = max(start, 1)
+        end = min(end, self.dmx_controller.get_channel_count())
+        with self._lock:
+            block = self._write_block()
+            for channel in range(start - 1, end):
+                block[(universe, channel)] = value
+        return True
+    
+    def _queue_call(self, function, *args):
+        """记录在帧钩子中执行的调用"""
+        with self._lock:
+            self._operations.append((function, args))
+    
+    def handle_message(self, address, args):
+        """
+        处理一条OSC消息（可在任意线程调用，操作在下一帧执行）
+        
+        Args:
+            address (str): OSC地址
+            args (list): 参数
+            
+        Returns:
+            bool: 地址是否被识别
+        """
+        self.messages_received += 1
+        parts = address.strip('/').split('/')
+        try:
+            if parts[0] == 'dmx':
+                return self._handle_dmx(parts[1:], args)
+            if parts[0] == 'preset' and len(parts) == 2:
+                preset = self.presets.get(parts[1])
+                if preset is None:
+                    return False
+                universe = int(args[0]) if args else None
+                if universe is not None and not self.dmx_controller.store.has_universe(universe):
+                    return False
+                for key, value in preset.items():
+                    key = str(key)
+                    start, _, end = key.partition('-')
+                    self._queue_channels(universe, int(start), int(end or start), _to_dmx(value))
+                return True
+            if parts[0] == 'cue' and self.cue_engine is not None:
+                if parts[1:] == ['go']:
+                    self._queue_call(self.cue_engine.go)
+                elif parts[1:] == ['back']:
+                    self._queue_call(self.cue_engine.back)
+                elif parts[1:] == ['goto'] and args:
+                    self._queue_call(self.cue_engine.go_to, float(args[0]))
+                else:
+                    return False
+                return True
+            if parts[0] == 'effect' and self.effect_engine is not None and len(parts) == 2:
+                return self._handle_effect(parts[1], args)
+        except (ValueError, IndexError) as e:
+            print(f"OSC消息 {address} 参数错误: {e}")
+        return False
+    
+    def _handle_dmx(self, parts, args):
+        """处理 /dmx 地址"""
+        if parts == ['range'] and len(args) >= 3:
+            universe = int(args[3]) if len(args) > 3 else None
+            return self._queue_channels(universe, int(args[0]), int(args[1]), _to_dmx(args[2]))
+        if len(parts) == 2 and parts[0] == 'universe' and args:
+            data = args[0]
+            if not isinstance(data, (bytes, bytearray)):
+                return False
+            universe = int(parts[1])
+            if not self.dmx_controller.store.has_universe(universe):
+                return False
+            count = min(len(data), self.dmx_controller.get_channel_count())
+            with self._lock:
+                block = self._write_block()
+                for channel in range(count):
+                    block[(universe, channel)] = data[channel]
+            return True
+        if len(parts) == 1 and args:
+            channel = int(parts[0])
+            return self._queue_channels(None, channel, channel, _to_dmx(args[0]))
+        if len(parts) == 2 and args:
+            channel = int(parts[1])
+            return self._queue_channels(int(parts[0]), channel, channel, _to_dmx(args[0]))
+        return False
+    
+    def _handle_effect(self, name, args):
+        """处理 /effect 地址"""
+        engine = self.effect_engine
+        if name == 'stop':
+            self._queue_call(engine.stop_effect)
+            return True
+        effects = {
+            'chase': engine.run_chase_effect,
+            'pulse': engine.run_pulse_effect,
+            'strobe': engine.run_strobe_effect
+        }
+        if name not in effects:
+            return False
+        values = [int(value) for value in args[:4]]
+        keywords = dict(zip(('speed', 'intensity', 'start_channel', 'end_channel'), values))
+        keywords.setdefault('speed', 50)
+        self._queue_call(lambda: effects[name](**keywords))
+        return True
+    
+    def flush(self):
+        """
+        按顺序执行积累的操作，每个写入块用一次向量化写入完成
+        
+        Returns:
+            int: 执行的操作数
+        """
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            with self._lock:
+                operations, self._operations = self._operations, []
+            self._apply(operations)
+        return len(operations)
+    
+    def _apply(self, operations):
+        """执行操作（调用方持有 _flush_lock）"""
+        for operation in operations:
+            if isinstance(operation, dict):
+                keys = np.fromiter((key for pair in operation for key in pair), dtype=np.int64,
+                                   count=2 * len(operation)).reshape(-1, 2)
+                values = np.fromiter(operation.values(), dtype=np.uint8, count=len(operation))
+                indices = self.store_array.flat_indices(keys[:, 0], keys[:, 1])
+                self.store_array.flat()[indices] = values
+                self.dmx_controller.mark_updated()
+                self.writes_applied += 1
+            else:
+                function, args = operation
+                try:
+                    function(*args)
+                except Exception as e:
+                    print(f"执行OSC操作失败: {e}")
+    
+    def __call__(self, timestamp):
+        """
+        作为帧钩子使用: pipeline.add_frame_hook(osc_server)
+        """
+        if self._operations:
+            self.flush()
+        else:
+            self._last_flush = time.monotonic()
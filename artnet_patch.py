@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# ArtNet Patch - 灯具配接：灯具配置文件、已配接灯具和按属性预先计算的地址表
+
+import json
+
+import numpy as np
+
+from artnet_vector import StoreArray
+
+# FixtureProfile 类
+class FixtureProfile:
+    """灯具配置文件，描述灯具每个通道对应的属性"""
+    
+    FINE_SUFFIX = "_fine"
+    
+    def __init__(self, name, channels):
+        """
+        初始化灯具配置文件
+        
+        Args:
+            name (str): 配置文件名称
+            channels (list): 按通道顺序排列的属性名，例如
+                ['dimmer', 'red', 'green', 'blue', 'pan', 'pan_fine']；
+                以 _fine 结尾的属性是同名属性的低字节，二者组成16位属性
+        """
+        self.name = name
+        self.channels = list(channels)
+        self.attributes = {}  # 属性名 -> (高字节偏移, 低字节偏移或None)
+        
+        for offset, channel in enumerate(self.channels):
+            if not channel.endswith(self.FINE_SUFFIX):
+                self.attributes[channel] = (offset, None)
+        for offset, channel in enumerate(self.channels):
+            if channel.endswith(self.FINE_SUFFIX):
+                coarse = channel[:-len(self.FINE_SUFFIX)]
+                if coarse in self.attributes:
+                    self.attributes[coarse] = (self.attributes[coarse][0], offset)
+    
+    def get_footprint(self):
+        """
+        获取灯具占用的通道数
+        
+        Returns:
+            int: 通道数
+        """
+        return len(self.channels)
+
+# PatchedFixture 类
+class PatchedFixture:
+    """已配接的灯具"""
+    
+    def __init__(self, fixture_id, profile, universe, address, groups=()):
+        """
+        初始化已配接灯具
+        
+        Args:
+            fixture_id (int): 灯具编号
+            profile (FixtureProfile): 灯具配置文件
+            universe (int): 宇宙号（15位端口地址）
+            address (int): 起始通道号 (1-512)
+            groups (iterable, optional): 所属编组名称
+        """
+        self.fixture_id = fixture_id
+        self.profile = profile
+        self.universe = universe
+        self.address = address
+        self.groups = set(groups)
+
+# AttributeTable 类
+class AttributeTable:
+    """一个属性在所有灯具上的地址表，索引指向宇宙缓冲区的一维视图"""
+    
+    def __init__(self, name, fixture_ids, coarse, fine):
+        """
+        初始化属性地址表
+        
+        Args:
+            name (str): 属性名
+            fixture_ids (list): 每行对应的灯具编号
+            coarse (numpy.ndarray): 高字节（8位属性即唯一字节）的索引
+            fine (numpy.ndarray): 低字节的索引，没有低字节的灯具为-1
+        """
+        self.name = name
+        self.fixture_ids = fixture_ids
+        self.rows = {fixture_id: row for row, fixture_id in enumerate(fixture_ids)}
+        self.coarse = coarse
+        self.fine = fine
+        self.is_16bit = bool((fine >= 0).any())
+        self.max_value = 0xFFFF if self.is_16bit else 0xFF
+
+# Patch 类
+class Patch:
+    """灯具配接，编译后可按属性和编组一次性批量写入宇宙缓冲区"""
+    
+    def __init__(self, dmx_controller):
+        """
+        初始化灯具配接
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+        """
+        self.dmx_controller = dmx_controller
+        self.store_array = StoreArray(dmx_controller.store)
+        self.profiles = {}
+        self.fixtures = {}  # 灯具编号 -> PatchedFixture
+        self.tables = None  # 属性名 -> AttributeTable，编译后有效
+        self._selections = {}  # (属性名, 编组) -> (高字节索引, 低字节索引)
+        self._layout_version = dmx_controller.store.layout_version
+    
+    def _sync_layout(self):
+        """宇宙号被修改后（例如移动默认宇宙）把灯具的宇宙号换算为新的宇宙号并重新编译"""
+        store = self.dmx_controller.store
+        if store.layout_version == self._layout_version:
+            return
+        for fixture in self.fixtures.values():
+            universe = store.current_universe(fixture.universe, self._layout_version)
+            if universe != fixture.universe:
+                fixture.universe = universe
+                self.tables = None
+        self._layout_version = store.layout_version
+    
+    def add_profile(self, profile):
+        """
+        添加灯具配置文件
+        
+        Args:
+            profile (FixtureProfile): 灯具配置文件
+        """
+        self.profiles[profile.name] = profile
+    
+    def patch_fixture(self, fixture_id, profile_name, universe, address, groups=()):
+        """
+        配接灯具
+        
+        Args:
+            fixture_id (int): 灯具编号
+            profile_name (str): 配置文件名称
+            universe (int): 宇宙号
+            address (int): 起始通道号 (1-512)
+            groups (iterable, optional): 所属编组名称
+            
+        Returns:
+            bool: 配接是否成功（配置文件不存在、编号重复、地址越界或与其他灯具重叠时失败）
+        """
+        profile = self.profiles.get(profile_name)
+        if profile is None or fixture_id in self.fixtures:
+            return False
+        
+        end = address + profile.get_footprint() - 1
+        if address < 1 or end > self.dmx_controller.get_channel_count():
+            return False
+        self._sync_layout()
+        for other in self.fixtures.values():
+            if other.universe == universe:
+                other_end = other.address + other.profile.get_footprint() - 1
+                if address <= other_end and other.address <= end:
+                    return False
+        
+        self.fixtures[fixture_id] = PatchedFixture(fixture_id, profile, universe, address, groups)
+        self.tables = None
+        return True
+    
+    def unpatch_fixture(self, fixture_id):
+        """
+        取消配接灯具
+        
+        Args:
+            fixture_id (int): 灯具编号
+            
+        Returns:
+            bool: 灯具是否存在
+        """
+        if self.fixtures.pop(fixture_id, None) is None:
+            return False
+        self.tables = None
+        return True
+    
+    def get_attributes(self):
+        """
+        获取已配接灯具拥有的所有属性名
+        
+        Returns:
+            list: 属性名列表
+        """
+        if self.tables is None:
+            self.compile()
+        return list(self.tables)
+    
+    def get_groups(self):
+        """
+        获取所有编组名称
+        
+        Returns:
+            list: 编组名称列表
+        """
+        groups = set()
+        for fixture in self.fixtures.values():
+            groups.update(fixture.groups)
+        return sorted(groups)
+    
+    def compile(self):
+        """
+        为每个属性生成地址表，配接变化后调用一次（写入时会自动编译）
+        """
+        self._sync_layout()
+        columns = {}  # 属性名 -> (灯具编号, 宇宙号, 高字节通道索引, 低字节通道索引)
+        for fixture in sorted(self.fixtures.values(), key=lambda f: f.fixture_id):
+            base = fixture.address - 1
+            for name, (coarse, fine) in fixture.profile.attributes.items():
+                column = columns.setdefault(name, ([], [], [], []))
+                column[0].append(fixture.fixture_id)
+                column[1].append(fixture.universe)
+                column[2].append(base + coarse)
+                column[3].append(-1 if fine is None else base + fine)
+        
+        tables = {}
+        for name, (fixture_ids, universes, coarse, fine) in columns.items():
+            coarse_index = self.store_array.flat_indices(universes, coarse)
+            fine_channels = np.asarray(fine, dtype=np.int64)
+            fine_index = self.store_array.flat_indices(universes, np.maximum(fine_channels, 0))
+            fine_index[fine_channels < 0] = -1
+            tables[name] = AttributeTable(name, fixture_ids, coarse_index, fine_index)
+        
+        self.tables = tables
+        self._selections = {}
+    
+    def _select(self, attribute, group):
+        """
+        获取编组内灯具该属性的高、低字节索引（结果按 (属性, 编组) 缓存）
+        
+        Returns:
+            tuple: (AttributeTable, 高字节索引, 低字节索引)；属性不存在时均为None
+        """
+        self._sync_layout()
+        if self.tables is None:
+            self.compile()
+        table = self.tables.get(attribute)
+        if table is None:
+            return None, None, None
+        if group is None:
+            return table, table.coarse, table.fine
+        
+        key = (attribute, group)
+        selection = self._selections.get(key)
+        if selection is None:
+            rows = np.asarray(
+                [row for row, fixture_id in enumerate(table.fixture_ids)
+                 if group in self.fixtures[fixture_id].groups],
+                dtype=np.int64
+            )
+            selection = (table.coarse[rows], table.fine[rows])
+            self._selections[key] = selection
+        return (table,) + selection
+    
+    def set_attribute(self, attribute, value, group=None):
+        """
+        设置编组内所有灯具的属性值（一次向量化写入）
+        
+        Args:
+            attribute (str): 属性名，例如 'dimmer'、'red'、'pan'
+            value (int|numpy.ndarray): 属性值；8位属性为0-255，16位属性为0-65535
+                （其中没有低字节的灯具只写入高字节）；也可以是编组内每个灯具一个值的数组
+            group (str, optional): 编组名称，默认为所有灯具
+            
+        Returns:
+            bool: 设置是否成功（属性不存在时失败）
+        """
+        table, coarse, fine = self._select(attribute, group)
+        if table is None:
+            return False
+        
+        values = np.clip(np.asarray(value, dtype=np.int64), 0, table.max_value)
+        flat = self.store_array.flat()
+        
+        if table.is_16bit:
+            values = np.broadcast_to(values, coarse.shape)
+            flat[coarse] = values >> 8
+            has_fine = fine >= 0
+            flat[fine[has_fine]] = values[has_fine] & 0xFF
+        else:
+            flat[coarse] = values
+        
+        self.dmx_controller.mark_updated()
+        return True
+    
+    def set_attribute_level(self, attribute, level, group=None):
+        """
+        按比例设置属性值
+        
+        Args:
+            attribute (str): 属性名
+            level (float): 0.0-1.0 之间的比例
+            group (str, optional): 编组名称，默认为所有灯具
+            
+        Returns:
+            bool: 设置是否成功
+        """
+        table = self._select(attribute, group)[0]
+        if table is None:
+            return False
+        return self.set_attribute(attribute, int(round(max(0.0, min(level, 1.0)) * table.max_value)), group)
+    
+    def get_highest_channels(self):
+        """
+        获取每个宇宙中已配接的最高通道
+        
+        Returns:
+            dict: 宇宙号 -> 最高通道号
+        """
+        self._sync_layout()
+        highest = {}
+        for fixture in self.fixtures.values():
+            end = fixture.address + fixture.profile.get_footprint() - 1
+            highest[fixture.universe] = max(highest.get(fixture.universe, 0), end)
+        return highest
+    
+    def apply_active_lengths(self):
+        """
+        把每个宇宙的有效通道数设置为已配接的最高通道，输出时只发送这部分通道
+        """
+        for universe, channel in self.get_highest_channels().items():
+            self.dmx_controller.set_active_length(channel, universe)
+    
+    def load(self, filename):
+        """
+        从JSON文件加载配接
+        
+        文件格式:
+            {"profiles": {"名称": ["dimmer", "red", ...]},
+             "fixtures": [{"id": 1, "profile": "名称", "universe": 0, "address": 1, "groups": ["front"]}]}
+             
+        Args:
+            filename (str): 文件路径
+            
+        Returns:
+            bool: 加载是否成功
+        """
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"加载配接失败: {e}")
+            return False
+        return self.load_dict(data)
+    
+    def load_dict(self, data):
+        """
+        从字典加载配接（格式与 load 的文件相同）
+        
+        Args:
+            data (dict): 配接数据
+            
+        Returns:
+            bool: 所有灯具是否都配接成功（无效的配置文件和灯具条目被跳过）
+        """
+        if not isinstance(data, dict):
+            print("加载配接失败: 格式无效")
+            return False
+        loaded = True
+        for name, channels in data.get('profiles', {}).items():
+            try:
+                self.add_profile(FixtureProfile(name, channels))
+            except (TypeError, ValueError, AttributeError) as e:
+                print(f"跳过无效的灯具配置文件 {name}: {e}")
+                loaded = False
+        for item in data.get('fixtures', []):
+            try:
+                patched = self.patch_fixture(item['id'], item['profile'], item.get('universe', 0),
+                                             item['address'], item.get('groups', ()))
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                print(f"跳过无效的灯具条目 {item}: {e}")
+                loaded = False
+                continue
+            if not patched:
+                print(f"配接灯具 {item['id']} 失败")
+                loaded = False
+        return loaded
+    
+    def to_dict(self):
+        """
+        把配接转换为字典（格式与 load 的文件相同）
+        
+        Returns:
+            dict: 配接数据
+        """
+        self._sync_layout()
+        return {
+            'profiles': {name: profile.channels for name, profile in self.profiles.items()},
+            'fixtures': [
+                {
+                    'id': fixture.fixture_id,
+                    'profile': fixture.profile.name,
+                    'universe': fixture.universe,
+                    'address': fixture.address,
+                    'groups': sorted(fixture.groups)
+                }
+                for fixture in sorted(self.fixtures.values(), key=lambda f: f.fixture_id)
+            ]
+        }
+    
+    def save(self, filename):
+        """
+        把配接保存为JSON文件
+        
+        Args:
+            filename (str): 文件路径
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            with open(filename, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            return True
+        except Exception as e:
+            print(f"保存配接失败: {e}")
+            return False
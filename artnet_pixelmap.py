@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# ArtNet Pixel Map - 把二维图像帧映射到跨宇宙的RGB/RGBW灯具
+
+import numpy as np
+
+from artnet_vector import StoreArray
+
+# 颜色顺序中每个字母对应的图像颜色分量，W由RGB最小值得到
+COLOR_COMPONENTS = {'R': 0, 'G': 1, 'B': 2, 'W': 3}
+
+# PixelFixture 类
+class PixelFixture:
+    """像素灯具，对应图像中的一个像素"""
+    
+    def __init__(self, x, y, universe, channel, order="RGB"):
+        """
+        初始化像素灯具
+        
+        Args:
+            x (int): 像素列
+            y (int): 像素行
+            universe (int): 宇宙号（15位端口地址）
+            channel (int): 起始通道号 (1-512)
+            order (str, optional): 颜色通道顺序，例如 RGB、GRB、RGBW
+        """
+        self.x = x
+        self.y = y
+        self.universe = universe
+        self.channel = channel
+        self.order = order.upper()
+
+# PixelMapper 类
+class PixelMapper:
+    """像素映射引擎：预先计算索引，每帧一次花式索引完成整幅图像到多个宇宙的映射"""
+    
+    def __init__(self, dmx_controller, width, height):
+        """
+        初始化像素映射引擎
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            width (int): 图像宽度（像素）
+            height (int): 图像高度（像素）
+        """
+        self.dmx_controller = dmx_controller
+        self.width = width
+        self.height = height
+        self.fixtures = []
+        self.store_array = StoreArray(dmx_controller.store)
+        self.source_index = None  # 图像一维数组中的索引
+        self.target_index = None  # 宇宙缓冲区一维视图中的索引
+        self.needs_white = False
+        self._layout_version = dmx_controller.store.layout_version
+    
+    def _sync_layout(self):
+        """宇宙号被修改后把像素灯具的宇宙号换算为新的宇宙号，并在下一帧重新编译"""
+        store = self.dmx_controller.store
+        if store.layout_version == self._layout_version:
+            return
+        for fixture in self.fixtures:
+            fixture.universe = store.current_universe(fixture.universe, self._layout_version)
+        self._layout_version = store.layout_version
+        self.source_index = None
+    
+    def add_fixture(self, x, y, universe, channel, order="RGB"):
+        """
+        添加像素灯具
+        
+        Args:
+            x (int): 像素列
+            y (int): 像素行
+            universe (int): 宇宙号
+            channel (int): 起始通道号 (1-512)
+            order (str, optional): 颜色通道顺序
+            
+        Returns:
+            bool: 添加是否成功（位置越界、通道超出宇宙或顺序无效时失败）
+        """
+        order = order.upper()
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        if not order or any(c not in COLOR_COMPONENTS for c in order):
+            return False
+        if not 1 <= channel <= self.dmx_controller.get_channel_count() - len(order) + 1:
+            return False
+        
+        self._sync_layout()
+        self.fixtures.append(PixelFixture(x, y, universe, channel, order))
+        self.source_index = None
+        return True
+    
+    def add_matrix(self, start_universe, start_channel=1, order="RGB", serpentine=False):
+        """
+        按行依次添加覆盖整幅图像的像素矩阵，一个宇宙放满后自动换到下一个宇宙
+        
+        Args:
+            start_universe (int): 起始宇宙号
+            start_channel (int, optional): 起始通道号
+            order (str, optional): 颜色通道顺序
+            serpentine (bool, optional): 是否蛇形走线（奇数行反向）
+            
+        Returns:
+            int: 使用的宇宙数量；有像素添加失败（起始通道或顺序无效）时返回0，本次添加的像素全部撤销
+        """
+        footprint = len(order)
+        universe = start_universe
+        channel = start_channel
+        channel_count = self.dmx_controller.get_channel_count()
+        added = len(self.fixtures)
+        
+        for y in range(self.height):
+            columns = range(self.width)
+            if serpentine and y % 2 == 1:
+                columns = reversed(columns)
+            for x in columns:
+                if channel + footprint - 1 > channel_count:
+                    universe += 1
+                    channel = 1
+                if not self.add_fixture(x, y, universe, channel, order):
+                    del self.fixtures[added:]
+                    self.source_index = None
+                    return 0
+                channel += footprint
+        return universe - start_universe + 1
+    
+    def compile(self):
+        """
+        预先计算源索引和目标索引，灯具布局变化后调用一次
+        
+        Returns:
+            int: 映射的通道数量
+        """
+        self._sync_layout()
+        sources = []
+        universes = []
+        channels = []
+        self.needs_white = False
+        
+        for fixture in self.fixtures:
+            pixel = (fixture.y * self.width + fixture.x) * 4
+            for offset, component in enumerate(fixture.order):
+                sources.append(pixel + COLOR_COMPONENTS[component])
+                universes.append(fixture.universe)
+                channels.append(fixture.channel - 1 + offset)
+                if component == 'W':
+                    self.needs_white = True
+        
+        source_index = np.asarray(sources, dtype=np.int64)
+        if not self.needs_white:
+            # 没有W通道时直接索引三通道图像，省去扩展为四通道的复制
+            source_index = source_index // 4 * 3 + source_index % 4
+        
+        self.target_index = self.store_array.flat_indices(universes, channels)
+        self.source_index = source_index
+        return len(sources)
+    
+    def map_frame(self, frame):
+        """
+        把一帧图像写入DMX缓冲区
+        
+        Args:
+            frame (numpy.ndarray): 形状为 (高, 宽, 3) 的uint8 RGB图像
+            
+        Returns:
+            bool: 映射是否成功（图像尺寸不符时失败）
+        """
+        if frame.ndim != 3 or frame.shape[:2] != (self.height, self.width) or frame.shape[2] < 3:
+            return False
+        self._sync_layout()
+        if self.source_index is None:
+            self.compile()
+        
+        pixels = frame[:, :, :3]
+        if self.needs_white:
+            extended = np.empty((self.height, self.width, 4), dtype=np.uint8)
+            extended[:, :, :3] = pixels
+            np.minimum.reduce(pixels, axis=2, out=extended[:, :, 3])
+            pixels = extended
+        
+        self.store_array.flat()[self.target_index] = pixels.reshape(-1)[self.source_index]
+        self.dmx_controller.mark_updated()
+        return True
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# ArtNet Playback - 在输出帧时钟上回放录制数据，可追踪时间码
+
+import bisect
+
+# RecordingPlayer 类
+class RecordingPlayer:
+    """录制回放器，作为输出流水线的帧钩子按帧时间定位录制帧，可随时跳转"""
+    
+    def __init__(self, dmx_controller, frames=None, universe=None, timecode=None, on_finished=None):
+        """
+        初始化录制回放器
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            frames (list, optional): 录制帧 [(时间, 通道数据), ...]，时间为秒
+            universe (int, optional): 回放到的宇宙，默认为默认宇宙
+            timecode (TimecodeChaser, optional): 时间码追踪器；设置后位置跟随时间码
+            on_finished (callable, optional): 自由回放到结尾时调用（在输出线程中）
+        """
+        self.dmx_controller = dmx_controller
+        self.universe = universe
+        self.timecode = timecode
+        self.timecode_offset = 0.0  # 录制起点对应的时间码位置（秒）
+        self.on_finished = on_finished
+        self.times = []
+        self.frames = []
+        self.playing = False
+        self.start_time = None  # 回放起点对应的帧时间，第一帧时确定
+        self._start_position = 0.0
+        self.index = -1  # 最近一次写入的录制帧
+        self.load(frames or [])
+    
+    def load(self, frames):
+        """
+        载入录制帧，时间换算为相对第一帧的秒数
+        
+        Args:
+            frames (list): 录制帧 [(时间, 通道数据), ...]
+        """
+        self.playing = False
+        self.index = -1
+        if not frames:
+            self.times = []
+            self.frames = []
+            return
+        start = frames[0][0]
+        self.times = [timestamp - start for timestamp, _ in frames]
+        self.frames = [bytes(channels) for _, channels in frames]
+    
+    def get_duration(self):
+        """
+        获取录制时长
+        
+        Returns:
+            float: 秒数
+        """
+        return self.times[-1] if self.times else 0.0
+    
+    def start(self, position=0.0, now=None):
+        """
+        从指定位置开始自由回放
+        
+        Args:
+            position (float, optional): 起始位置（秒）
+            now (float, optional): 起始时间，默认为下一帧的时间
+        """
+        self.index = -1
+        self.start_time = None if now is None else now - position
+        self._start_position = position
+        self.playing = True
+    
+    def stop(self):
+        """
+        停止回放
+        """
+        self.playing = False
+    
+    def seek(self, position):
+        """
+        跳转到指定位置（自由回放时有效，下一帧生效）
+        
+        Args:
+            position (float): 位置（秒）
+        """
+        self.start(position)
+    
+    def get_position(self, timestamp):
+        """
+        获取帧时间对应的回放位置
+        
+        Args:
+            timestamp (float): 帧时间
+            
+        Returns:
+            float: 回放位置（秒）；既未回放也没有时间码时返回None
+        """
+        if self.timecode is not None:
+            position = self.timecode.get_position(timestamp)
+            if position is not None:
+                return position - self.timecode_offset
+        if not self.playing:
+            return None
+        if self.start_time is None:
+            self.start_time = timestamp - self._start_position
+        return timestamp - self.start_time
+    
+    def __call__(self, timestamp):
+        """
+        作为帧钩子使用: pipeline.add_frame_hook(player)
+        """
+        if not self.times:
+            return
+        position = self.get_position(timestamp)
+        if position is None:
+            return
+        
+        index = bisect.bisect_right(self.times, position) - 1
+        if index >= 0 and index != self.index:
+            self.index = index
+            universe = self.dmx_controller.default_universe if self.universe is None else self.universe
+            self.dmx_controller.set_universe_data(universe, self.frames[index])
+        
+        if self.timecode is None and self.playing and position > self.get_duration():
+            self.playing = False
+            if self.on_finished:
+                self.on_finished()
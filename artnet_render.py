@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# ArtNet Render - 在虚拟时钟上逐帧离线渲染整场演出，速度只受CPU限制
+#
+# 用法:
+#     python artnet_render.py --cues cues.jsonl --recording recording.json --duration 7200 --output show.npz
+#
+#     renderer = OfflineRenderer(controller, frame_rate=50)
+#     fade_engine = FadeEngine(controller, clock=renderer.clock)
+#     effect_engine = EffectEngine(controller, fade_engine, clock=renderer.clock, threaded=False)
+#     renderer.pipeline.add_frame_hook(effect_engine)
+#     renderer.pipeline.add_frame_hook(fade_engine)
+#     renderer.schedule(10.0, effect_engine.run_strobe_effect, 80)
+#     buffer = renderer.render(60.0, "preview.npz")
+#
+# 渲染使用与实时输出相同的帧钩子、处理阶段和帧监听，只是帧时间戳来自虚拟时钟、
+# 不发送数据包；同样的输入总是得到同样的输出，也可用于效果的确定性测试。
+# 输出文件与 ReplayBuffer.export 的格式相同，可用 artnet_capture.load_replay 读取。
+
+import argparse
+import heapq
+import itertools
+import json
+import time
+
+from artnet_core import DMXController, OutputPipeline, EffectEngine, VirtualClock
+from artnet_fade import FadeEngine
+from artnet_cue import CueList, CueEngine
+from artnet_playback import RecordingPlayer
+from artnet_capture import ReplayBuffer
+
+# TimelinePosition 类
+class TimelinePosition:
+    """渲染时间线上的位置，可代替 TimecodeChaser 交给场景回放引擎和录制回放器"""
+    
+    def __init__(self, start_time=0.0):
+        """
+        初始化时间线位置
+        
+        Args:
+            start_time (float, optional): 时间线起点对应的时钟时间
+        """
+        self.start_time = start_time
+    
+    def get_position(self, now):
+        """
+        获取时钟时间对应的时间线位置
+        
+        Args:
+            now (float): 时钟时间
+            
+        Returns:
+            float: 位置（秒）
+        """
+        return now - self.start_time
+
+# OfflineRenderer 类
+class OfflineRenderer:
+    """离线渲染器：用虚拟时钟驱动输出流水线，按帧生成整条时间线"""
+    
+    def __init__(self, dmx_controller, frame_rate=50, start_time=0.0):
+        """
+        初始化离线渲染器
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            frame_rate (float, optional): 渲染帧率
+            start_time (float, optional): 时间线起点的虚拟时间
+        """
+        self.dmx_controller = dmx_controller
+        self.frame_rate = frame_rate
+        self.start_time = start_time
+        self.clock = VirtualClock(start_time)
+        self.pipeline = OutputPipeline(dmx_controller, frame_rate, clock=self.clock)
+        self.position = TimelinePosition(start_time)
+        self.events = []  # (时间, 序号, 函数, 位置参数, 关键字参数)
+        self._sequence = itertools.count()
+        self.frames_rendered = 0
+    
+    def schedule(self, offset, function, *args, **kwargs):
+        """
+        在时间线上安排一次调用，例如 GO、开始效果
+        
+        Args:
+            offset (float): 相对时间线起点的秒数
+            function (callable): 要调用的函数，调用时虚拟时钟正好是安排的时间
+            *args, **kwargs: 调用参数
+        """
+        heapq.heappush(self.events, (self.start_time + offset, next(self._sequence), function, args, kwargs))
+    
+    def _run_events(self, until):
+        """执行到指定时间为止的所有安排"""
+        while self.events and self.events[0][0] <= until:
+            event_time, _, function, args, kwargs = heapq.heappop(self.events)
+            self.clock.set(event_time)
+            try:
+                function(*args, **kwargs)
+            except Exception as e:
+                print(f"执行时间线事件失败: {e}")
+    
+    def render(self, duration, filename=None, universes=None):
+        """
+        渲染一段时间线
+        
+        Args:
+            duration (float): 时长（秒），包含首尾两帧
+            filename (str, optional): 输出文件路径（.npz），不指定时只返回缓冲区
+            universes (iterable, optional): 录制的宇宙号，默认为第一帧的全部宇宙
+            
+        Returns:
+            ReplayBuffer: 保存所有渲染帧的缓冲区
+        """
+        frames = int(duration * self.frame_rate) + 1
+        buffer = ReplayBuffer(frames / self.frame_rate, self.frame_rate, universes,
+                              self.dmx_controller.store.stride)
+        self.pipeline.add_tap(buffer)
+        buffer.start()
+        try:
+            for index in range(frames):
+                timestamp = self.start_time + index / self.frame_rate
+                self._run_events(timestamp)
+                self.clock.set(timestamp)
+                self.pipeline.run_frame(timestamp)
+                self.frames_rendered += 1
+        finally:
+            buffer.stop()
+            self.pipeline.remove_tap(buffer)
+        
+        if filename:
+            buffer.export(filename)
+        return buffer
+
+def load_recording(filename):
+    """
+    读取录制文件（artnet_capture.save_recording 的格式）
+    
+    Args:
+        filename (str): 文件路径
+        
+    Returns:
+        list: [(时间, 通道数据), ...]；失败时返回空列表
+    """
+    try:
+        with open(filename, 'r') as f:
+            return [(item['time'], bytes(item['channels'])) for item in json.load(f)]
+    except Exception as e:
+        print(f"读取录制文件失败: {e}")
+        return []
+
+def main():
+    parser = argparse.ArgumentParser(description="离线渲染场景列表、效果和录制回放")
+    parser.add_argument('--cues', help="场景列表文件 (cues.jsonl)；有时间码的场景按时间码触发，否则从0秒开始GO")
+    parser.add_argument('--recording', help="录制文件，从0秒开始回放到默认宇宙")
+    parser.add_argument('--effect', choices=('chase', 'pulse', 'strobe'), help="从0秒开始运行的效果")
+    parser.add_argument('--speed', type=int, default=50, help="效果速度 (1-100)")
+    parser.add_argument('--duration', type=float, required=True, help="渲染时长（秒）")
+    parser.add_argument('--rate', type=float, default=50, help="帧率")
+    parser.add_argument('--output', default="render.npz", help="输出文件")
+    args = parser.parse_args()
+    
+    controller = DMXController()
+    renderer = OfflineRenderer(controller, args.rate)
+    fade_engine = FadeEngine(controller, clock=renderer.clock)
+    effect_engine = EffectEngine(controller, fade_engine, clock=renderer.clock, threaded=False)
+    cue_engine = None
+    
+    # 帧钩子顺序与实时输出一致: 场景 -> 效果 -> 渐变 -> 录制回放
+    if args.cues:
+        cue_list = CueList.load(args.cues)
+        cue_engine = CueEngine(controller, fade_engine, cue_list)
+        renderer.pipeline.add_frame_hook(cue_engine)
+        if cue_list.get_timecodes():
+            cue_engine.set_timecode(renderer.position)
+        else:
+            renderer.schedule(0.0, cue_engine.go)
+    renderer.pipeline.add_frame_hook(effect_engine)
+    renderer.pipeline.add_frame_hook(fade_engine)
+    if args.recording:
+        player = RecordingPlayer(controller, load_recording(args.recording))
+        player.start(0.0, renderer.start_time)
+        renderer.pipeline.add_frame_hook(player)
+    if args.effect:
+        effects = {
+            'chase': effect_engine.run_chase_effect,
+            'pulse': effect_engine.run_pulse_effect,
+            'strobe': effect_engine.run_strobe_effect
+        }
+        renderer.schedule(0.0, effects[args.effect], args.speed)
+    
+    started = time.perf_counter()
+    try:
+        buffer = renderer.render(args.duration, args.output)
+    finally:
+        if cue_engine:
+            cue_engine.close()
+    elapsed = time.perf_counter() - started
+    print(f"渲染了 {renderer.frames_rendered} 帧 ({len(buffer.universes or ())} 个宇宙) 到 {args.output}，"
+          f"用时 {elapsed:.2f} 秒，{args.duration / elapsed if elapsed else 0:.0f} 倍实时速度")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# sACN (E1.31) - 组播输出后端
+
+import socket
+import uuid
+
+# E131Protocol 类
+class E131Protocol:
+    """sACN (ANSI E1.31) 协议实现类"""
+    
+    # E1.31 常量
+    ACN_PACKET_IDENTIFIER = b'ASC-E1.17\x00\x00\x00'
+    VECTOR_ROOT_E131_DATA = 0x00000004
+    VECTOR_E131_DATA_PACKET = 0x00000002
+    VECTOR_DMP_SET_PROPERTY = 0x02
+    SACN_PORT = 5568
+    DEFAULT_PRIORITY = 100
+    OPTION_STREAM_TERMINATED = 0x40
+    
+    # 帧层中各字段的偏移量
+    PRIORITY_OFFSET = 108
+    SEQUENCE_OFFSET = 111
+    OPTIONS_OFFSET = 112
+    HEADER_SIZE = 126  # 不含DMX数据的头部长度（已含起始码）
+    
+    def __init__(self, source_name="ArtNet Controller", cid=None):
+        """
+        初始化E1.31协议实例
+        
+        Args:
+            source_name (str, optional): 源名称，最长63字节
+            cid (bytes, optional): 16字节组件标识，默认随机生成
+        """
+        self.source_name = source_name
+        self.cid = cid or uuid.uuid4().bytes
+    
+    def get_multicast_address(self, universe):
+        """
+        计算宇宙对应的组播地址
+        
+        Args:
+            universe (int): sACN宇宙号 (1-63999)
+            
+        Returns:
+            str: 组播地址 239.255.高字节.低字节
+        """
+        return f"239.255.{(universe >> 8) & 0xFF}.{universe & 0xFF}"
+    
+    def validate_universe(self, universe):
+        """
+        验证sACN宇宙号是否有效
+        
+        Args:
+            universe (int): sACN宇宙号
+            
+        Returns:
+            bool: 宇宙号是否有效
+        """
+        return 1 <= universe <= 63999
+    
+    def build_header(self, universe, slot_count, priority=DEFAULT_PRIORITY):
+        """
+        构建数据包头部（序列号为0，发送时再填写）
+        
+        Args:
+            universe (int): sACN宇宙号 (1-63999)
+            slot_count (int): DMX通道数量 (0-512)
+            priority (int, optional): 优先级 (0-200)，默认为100
+            
+        Returns:
+            bytearray: 包含起始码在内的头部
+        """
+        total = self.HEADER_SIZE + slot_count
+        name = self.source_name.encode('utf-8')[:63]
+        
+        header = bytearray()
+        
+        # 根层
+        header.extend((0x0010).to_bytes(2, byteorder='big'))  # 前导长度
+        header.extend((0x0000).to_bytes(2, byteorder='big'))  # 后导长度
+        header.extend(self.ACN_PACKET_IDENTIFIER)
+        header.extend((0x7000 | (total - 16)).to_bytes(2, byteorder='big'))
+        header.extend(self.VECTOR_ROOT_E131_DATA.to_bytes(4, byteorder='big'))
+        header.extend(self.cid)
+        
+        # 帧层
+        header.extend((0x7000 | (total - 38)).to_bytes(2, byteorder='big'))
+        header.extend(self.VECTOR_E131_DATA_PACKET.to_bytes(4, byteorder='big'))
+        header.extend(name + bytes(64 - len(name)))
+        header.append(max(0, min(priority, 200)))
+        header.extend((0).to_bytes(2, byteorder='big'))  # 同步地址
+        header.append(0)  # 序列号
+        header.append(0)  # 选项
+        header.extend(universe.to_bytes(2, byteorder='big'))
+        
+        # DMP层
+        header.extend((0x7000 | (total - 115)).to_bytes(2, byteorder='big'))
+        header.append(self.VECTOR_DMP_SET_PROPERTY)
+        header.append(0xA1)  # 地址类型和数据类型
+        header.extend((0x0000).to_bytes(2, byteorder='big'))  # 首个属性地址
+        header.extend((0x0001).to_bytes(2, byteorder='big'))  # 地址增量
+        header.extend((slot_count + 1).to_bytes(2, byteorder='big'))  # 属性值数量（含起始码）
+        header.append(0)  # DMX起始码
+        
+        return header
+    
+    def build_dmx_packet(self, universe, dmx_data, sequence=0, priority=DEFAULT_PRIORITY, options=0):
+        """
+        构建sACN数据包
+        
+        Args:
+            universe (int): sACN宇宙号 (1-63999)
+            dmx_data (bytes): DMX通道数据，最多512个
+            sequence (int, optional): 序列号 (0-255)
+            priority (int, optional): 优先级 (0-200)
+            options (int, optional): 选项位
+            
+        Returns:
+            bytes: 完整的sACN数据包
+        """
+        data = bytes(dmx_data[:512])
+        packet = self.build_header(universe, len(data), priority)
+        packet[self.SEQUENCE_OFFSET] = sequence & 0xFF
+        packet[self.OPTIONS_OFFSET] = options
+        packet.extend(data)
+        return bytes(packet)
+
+# SACNTransport 类
+class SACNTransport:
+    """sACN组播输出后端，可与Art-Net共用输出帧流水线"""
+    
+    def __init__(self, protocol=None, universe_offset=1, interface_ip=None, ttl=1):
+        """
+        初始化sACN输出后端
+        
+        Args:
+            protocol (E131Protocol, optional): 协议实例，默认新建
+            universe_offset (int, optional): Art-Net端口地址到sACN宇宙号的偏移，默认为1
+                （端口地址0对应sACN宇宙1）
+            interface_ip (str, optional): 发送组播使用的本地接口地址
+            ttl (int, optional): 组播TTL，默认为1（不跨路由）
+        """
+        self.protocol = protocol or E131Protocol()
+        self.universe_offset = universe_offset
+        self.interface_ip = interface_ip
+        self.ttl = ttl
+        self.socket = None
+        self.priorities = {}  # sACN宇宙号 -> 优先级
+        self.sequences = {}  # sACN宇宙号 -> 下一个序列号
+        self.headers = {}  # (sACN宇宙号, 通道数) -> 缓存的头部
+        self.tracer = None  # 追踪器，由输出流水线设置
+    
+    def initialize(self):
+        """
+        初始化组播socket
+        
+        Returns:
+            bool: 初始化是否成功
+        """
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
+            if self.interface_ip:
+                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                                       socket.inet_aton(self.interface_ip))
+            return True
+        except Exception as e:
+            print(f"sACN初始化失败: {e}")
+            self.socket = None
+            return False
+    
+    def get_sacn_universe(self, universe):
+        """
+        将Art-Net端口地址换算为sACN宇宙号
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            
+        Returns:
+            int: sACN宇宙号
+        """
+        return universe + self.universe_offset
+    
+    def set_priority(self, universe, priority):
+        """
+        设置宇宙的发送优先级
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            priority (int): 优先级 (0-200)
+        """
+        sacn_universe = self.get_sacn_universe(universe)
+        self.priorities[sacn_universe] = max(0, min(priority, 200))
+        # 优先级写在头部中，清除该宇宙缓存的头部
+        for key in [key for key in self.headers if key[0] == sacn_universe]:
+            del self.headers[key]
+    
+    def send_universe(self, universe, data):
+        """
+        发送一个宇宙的数据到其组播组
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            data (bytes): 通道数据
+            
+        Returns:
+            bool: 发送是否成功
+        """
+        sacn_universe = self.get_sacn_universe(universe)
+        if not self.protocol.validate_universe(sacn_universe):
+            return False
+        return self._send(sacn_universe, data, 0)
+    
+    def _send(self, sacn_universe, data, options):
+        """
+        填写序列号并发送数据包
+        """
+        if not self.socket:
+            if not self.initialize():
+                return False
+        
+        tracer = self.tracer
+        start = tracer.now() if tracer else 0
+        slot_count = min(len(data), 512)
+        key = (sacn_universe, slot_count)
+        header = self.headers.get(key)
+        if header is None:
+            priority = self.priorities.get(sacn_universe, self.protocol.DEFAULT_PRIORITY)
+            header = self.protocol.build_header(sacn_universe, slot_count, priority)
+            self.headers[key] = header
+        
+        sequence = self.sequences.get(sacn_universe, 0)
+        self.sequences[sacn_universe] = (sequence + 1) & 0xFF
+        
+        packet = bytearray(header)
+        packet[self.protocol.SEQUENCE_OFFSET] = sequence
+        packet[self.protocol.OPTIONS_OFFSET] = options
+        packet.extend(data[:slot_count])
+        
+        try:
+            address = self.protocol.get_multicast_address(sacn_universe)
+            if tracer:
+                built = tracer.now()
+                tracer.record('build', start, 'sacn', None, built)
+            self.socket.sendto(packet, (address, self.protocol.SACN_PORT))
+            if tracer:
+                tracer.record('sendto', built, 'sacn', {'universe': sacn_universe})
+            return True
+        except Exception as e:
+            print(f"发送sACN数据包失败: {e}")
+            return False
+    
+    def close(self):
+        """
+        发送流终止标记并关闭socket
+        """
+        if self.socket:
+            # 按规范发送三次终止包，接收端可立即释放该源
+            for sacn_universe in list(self.sequences):
+                for _ in range(3):
+                    self._send(sacn_universe, b'', self.protocol.OPTION_STREAM_TERMINATED)
+            try:
+                self.socket.close()
+            except Exception as e:
+                print(f"关闭socket失败: {e}")
+            self.socket = None
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# ArtNet Shard - 基于共享内存的多进程宇宙分片输出
+#
+# 用法（Linux输出服务器）:
+#     store = SharedUniverseStore(capacity=512)
+#     controller = DMXController(store=store)
+#     output = ShardedOutput(controller, workers=4, target_ip="2.255.255.255")
+#     output.start()
+#
+# 控制器的宇宙缓冲区位于共享内存中，主进程照常写入通道；
+# 协调器按帧率向各工作进程发送帧时钟，每个工作进程只处理槽位号
+# 对进程数取模等于自身编号的宇宙，在自己的进程内完成处理阶段、
+# 数据包构建和发送，从而绕开GIL按CPU核数扩展吞吐量。
+
+import struct
+import threading
+import time
+import multiprocessing
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # 部分平台（如Android）没有共享内存支持
+    shared_memory = None
+
+from artnet_core import UniverseStore, DMXController, OutputPipeline, NetworkManager, ArtNetTransport
+
+# SharedUniverseStore 类
+class SharedUniverseStore(UniverseStore):
+    """位于共享内存中的宇宙缓冲区存储，容量固定，可被多个进程同时映射"""
+    
+    # 共享内存头部: 标识、版本、每宇宙通道数、容量、已用槽位数
+    HEADER = struct.Struct('<4sHHII')
+    MAGIC = b'DMXS'
+    VERSION = 1
+    
+    def __init__(self, channels_per_universe=512, capacity=64, name=None, lock=None):
+        """
+        创建或连接共享内存宇宙存储
+        
+        Args:
+            channels_per_universe (int, optional): 每个宇宙的通道数，默认为512
+            capacity (int, optional): 可容纳的宇宙数量（创建时有效）
+            name (str, optional): 已有共享内存的名称；指定时连接而不是创建
+            lock (multiprocessing.Lock, optional): 创建者的槽位表锁（store.lock），连接时传入；
+                不传入时连接方只能读取已有宇宙，不能添加宇宙
+        """
+        if shared_memory is None:
+            raise RuntimeError("当前平台不支持 multiprocessing.shared_memory")
+        
+        self.owner = name is None
+        self.lock = multiprocessing.Lock() if self.owner else lock
+        if self.owner:
+            table_offset = self.HEADER.size
+            data_offset = self._align(table_offset + 4 * capacity)
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=data_offset + capacity * channels_per_universe)
+            self.HEADER.pack_into(self.shm.buf, 0, self.MAGIC, self.VERSION,
+                                  channels_per_universe, capacity, 0)
+        else:
+            self.shm = self._attach(name)
+            magic, version, channels_per_universe, capacity, _ = self.HEADER.unpack_from(self.shm.buf, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                self.shm.close()
+                raise ValueError(f"共享内存 {name} 不是有效的宇宙存储")
+        
+        self.name = self.shm.name
+        self.stride = channels_per_universe
+        self.capacity = capacity
+        self.table_offset = self.HEADER.size
+        self.data_offset = self._align(self.table_offset + 4 * capacity)
+        self.table = self.shm.buf[self.table_offset:self.data_offset].cast('i')
+        self.buffer = self.shm.buf[self.data_offset:self.data_offset + capacity * self.stride]
+        self.slots = {}
+        self.universes = []
+        self.layout_version = 0
+        self.renames = []
+        self.sync()
+    
+    def _align(self, offset):
+        """数据区按64字节对齐"""
+        return (offset + 63) & ~63
+    
+    def _attach(self, name):
+        """
+        连接已有共享内存（只有创建者负责释放）
+        """
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python 3.13之前没有track参数；工作进程与创建者共用同一个资源跟踪器，
+            # 重复注册同名共享内存不会产生额外影响
+            return shared_memory.SharedMemory(name=name)
+    
+    def sync(self):
+        """
+        从共享内存的槽位表同步宇宙列表（其他进程可能添加了宇宙）
+        """
+        count = self.HEADER.unpack_from(self.shm.buf, 0)[4]
+        for slot in range(len(self.universes), count):
+            universe = self.table[slot]
+            self.slots[universe] = slot
+            self.universes.append(universe)
+    
+    def add_universe(self, universe):
+        """
+        添加宇宙并写入共享槽位表
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            
+        Returns:
+            int: 宇宙所在的槽位
+        """
+        slot = self.slots.get(universe)
+        if slot is not None:
+            return slot
+        
+        if self.lock is None:
+            self.sync()
+            slot = self.slots.get(universe)
+            if slot is None:
+                raise RuntimeError(f"只读连接的共享内存宇宙存储不能添加宇宙 {universe}")
+            return slot
+        
+        # 多个进程可能同时追加，同步和写入都在锁内完成
+        with self.lock:
+            self.sync()
+            slot = self.slots.get(universe)
+            if slot is not None:
+                return slot
+            
+            slot = len(self.universes)
+            if slot >= self.capacity:
+                raise RuntimeError(f"共享内存宇宙存储已满 (容量 {self.capacity})")
+            # 先写槽位表再更新计数，读取方不会看到未填写的槽位
+            self.table[slot] = universe
+            self.slots[universe] = slot
+            self.universes.append(universe)
+            struct.pack_into('<I', self.shm.buf, 12, slot + 1)
+        return slot
+    
+    def rename_universe(self, universe, new_universe):
+        """
+        共享槽位表只能追加，其他进程看不到改名，因此不支持修改宇宙号
+        
+        Returns:
+            bool: 总是False（移动默认宇宙时改为添加新宇宙）
+        """
+        return False
+    
+    def _grow(self, capacity):
+        raise RuntimeError("共享内存宇宙存储不能扩容")
+    
+    def close(self):
+        """
+        解除映射；创建者同时释放共享内存
+        """
+        self.table.release()
+        self.buffer.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def default_transport_factory(target_ip=None):
+    """
+    工作进程中默认使用的传输后端：每个进程一个Art-Net socket
+    
+    Args:
+        target_ip (str, optional): 目标IP地址
+        
+    Returns:
+        dict: 名称 -> 传输后端
+    """
+    return {'artnet': ArtNetTransport(NetworkManager(), target_ip=target_ip)}
+
+def _shard_worker(name, lock, index, count, conn, transport_factory, stages, routes,
+                  default_route, active_lengths):
+    """
+    工作进程主函数：等待协调器的帧时钟，处理并发送自己分片内的宇宙
+    """
+    store = SharedUniverseStore(name=name, lock=lock)
+    controller = DMXController(store.stride, store=store)
+    controller.active_lengths.update(active_lengths)
+    pipeline = OutputPipeline(controller)
+    for transport_name, transport in transport_factory().items():
+        pipeline.add_transport(transport_name, transport)
+    for stage in stages:
+        pipeline.add_stage(stage)
+    pipeline.routes.update(routes)
+    pipeline.set_default_route(default_route)
+    
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            frame_number, timestamp = message
+            store.sync()
+            universes = store.universes[index::count]
+            pipeline.frame_number = frame_number
+            try:
+                sent = pipeline.run_frame(timestamp, universes)
+            except Exception as e:
+                # 一帧出错不结束工作进程，仍然回复协调器以保持收发一一对应
+                print(f"分片 {index} 输出帧失败: {e}")
+                sent = 0
+            conn.send((frame_number, sent))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        pipeline.close()
+        store.close()
+
+# ShardedOutput 类
+class ShardedOutput:
+    """多进程分片输出协调器，驱动共享帧时钟"""
+    
+    def __init__(self, dmx_controller, workers=None, frame_rate=50, target_ip=None,
+                 transport_factory=None, stages=None, routes=None, default_route=('artnet',)):
+        """
+        初始化分片输出
+        
+        Args:
+            dmx_controller (DMXController): 使用 SharedUniverseStore 的DMX控制器
+            workers (int, optional): 工作进程数量，默认为CPU核数
+            frame_rate (float, optional): 输出帧率，默认为50Hz
+            target_ip (str, optional): 默认传输后端的目标IP地址
+            transport_factory (callable, optional): 在工作进程中创建传输后端的函数，
+                返回 {名称: 传输后端}，需可被pickle
+            stages (list, optional): 工作进程中对分片帧应用的处理阶段，需可被pickle
+            routes (dict, optional): 宇宙号 -> 传输后端名称元组
+            default_route (tuple, optional): 默认路由
+        """
+        if not isinstance(dmx_controller.store, SharedUniverseStore):
+            raise ValueError("分片输出需要使用 SharedUniverseStore 的DMX控制器")
+        
+        self.dmx_controller = dmx_controller
+        self.workers = workers or multiprocessing.cpu_count()
+        self.frame_rate = frame_rate
+        self.target_ip = target_ip
+        self.transport_factory = transport_factory
+        self.stages = list(stages or [])
+        self.routes = dict(routes or {})
+        self.default_route = tuple(default_route)
+        self.processes = []
+        self.connections = []
+        self.pending = {}  # 工作进程连接 -> 已发送帧号但尚未收到结果的帧数
+        self.running = False
+        self.clock_thread = None
+        self.frame_number = 0
+        self.packets_sent = 0
+        self.late_frames = 0  # 工作进程未能在一帧内完成的次数
+    
+    def start(self):
+        """
+        启动工作进程和帧时钟
+        """
+        if self.running:
+            return
+        
+        factory = self.transport_factory
+        if factory is None:
+            factory = _TargetTransportFactory(self.target_ip)
+        
+        for index in range(self.workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_worker,
+                args=(self.dmx_controller.store.name, self.dmx_controller.store.lock,
+                      index, self.workers, child_conn, factory,
+                      self.stages, self.routes, self.default_route,
+                      dict(self.dmx_controller.active_lengths)),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self.processes.append(process)
+            self.connections.append(parent_conn)
+            self.pending[parent_conn] = 0
+        
+        self.running = True
+        self.clock_thread = threading.Thread(target=self._run_clock, daemon=True)
+        self.clock_thread.start()
+    
+    def stop(self):
+        """
+        停止帧时钟并结束工作进程
+        """
+        self.running = False
+        if self.clock_thread:
+            self.clock_thread.join(timeout=1.0)
+            self.clock_thread = None
+        
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except Exception:
+                pass
+        for process in self.processes:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.connections:
+            conn.close()
+        self.processes = []
+        self.connections = []
+        self.pending = {}
+    
+    def _run_clock(self):
+        """
+        帧时钟线程：向所有工作进程广播帧号，并在一帧时间内收集完成情况
+        """
+        period = 1.0 / self.frame_rate
+        max_pending = max(2, int(self.frame_rate))
+        next_time = time.monotonic()
+        while self.running:
+            timestamp = time.time()
+            for conn in list(self.connections):
+                if self.pending[conn] >= max_pending:
+                    self._drop_connection(conn, "超过1秒没有完成帧")
+                    continue
+                try:
+                    conn.send((self.frame_number, timestamp))
+                    self.pending[conn] += 1
+                except (EOFError, OSError) as e:
+                    self._drop_connection(conn, e)
+            
+            # 迟到的结果在之后的帧中收取，时钟不会被某个工作进程阻塞
+            deadline = next_time + period
+            for conn in list(self.connections):
+                try:
+                    while self.pending[conn] and conn.poll(max(0.0, deadline - time.monotonic())):
+                        _, sent = conn.recv()
+                        self.pending[conn] -= 1
+                        self.packets_sent += sent
+                except (EOFError, OSError) as e:
+                    self._drop_connection(conn, e)
+                    continue
+                if self.pending[conn]:
+                    self.late_frames += 1
+            self.frame_number += 1
+            if not self.connections:
+                print("所有分片工作进程都已退出，停止输出")
+                self.running = False
+                break
+            
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -period:
+                next_time = time.monotonic()
+    
+    def _drop_connection(self, conn, error):
+        """
+        移除已退出或无响应的工作进程连接，其余工作进程继续输出
+        
+        Args:
+            conn (Connection): 工作进程连接
+            error (Exception|str): 移除的原因
+        """
+        index = self.connections.index(conn)
+        print(f"分片工作进程 {index} 已移除: {error}")
+        self.connections.pop(index)
+        self.pending.pop(conn, None)
+        process = self.processes.pop(index)
+        if process.is_alive():
+            process.terminate()
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+# _TargetTransportFactory 类
+class _TargetTransportFactory:
+    """可被pickle的默认传输后端工厂"""
+    
+    def __init__(self, target_ip):
+        self.target_ip = target_ip
+    
+    def __call__(self):
+        return default_transport_factory(self.target_ip)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# ArtNet SHM Input - 供本机外部进程写入整宇宙DMX数据的共享内存接口
+#
+# 媒体服务器、像素映射软件等本机程序可以直接把整宇宙数据写入共享内存，
+# 控制器在下一帧读取，省去向localhost发送Art-Net再解析的开销。
+#
+# 共享内存布局（小端序，名称默认为 "artnet_input"，Linux下位于 /dev/shm/）:
+#
+#   头部 16 字节:
+#     0   4s   标识 b'DMXI'
+#     4   u16  版本 (1)
+#     6   u16  每宇宙通道数 stride (通常为512)
+#     8   u32  槽位数量
+#     12  4x   保留
+#
+#   随后是连续的槽位，每个槽位 16 + 2 * (4 + stride) 字节:
+#     0   u32  generation 代数，每写入一次加1
+#     4   i32  宇宙号（15位端口地址），-1表示未分配；由控制器分配，写入方只读
+#     8   8x   保留
+#     16  缓冲区0: u16 有效长度, 2x 保留, stride 字节通道数据
+#     ... 缓冲区1: 同上
+#
+# 写入协议（每个槽位只能有一个写入方）:
+#   1. new = generation + 1
+#   2. 把数据和长度写入缓冲区 (new & 1)
+#   3. 最后写入 generation = new，发布这一帧
+#
+# 读取方在每帧开始时比较generation，变化后复制缓冲区 (generation & 1)，
+# 复制完成后再读一次generation：只要期间发生了变化就放弃本次读取并在下一帧重试。
+# （写入方发布 G+1 之后，下一次写入 G+2 的目标正是读取方在复制的缓冲区 G&1，
+# 而改写过程中generation仍是 G+1，所以变化一次就可能读到不完整的数据。）
+# 写入方因此永远不需要等待读取方。
+
+import struct
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # 部分平台（如Android）没有共享内存支持
+    shared_memory = None
+
+HEADER = struct.Struct('<4sHHI4x')
+SLOT_HEADER = struct.Struct('<Ii8x')
+BUFFER_HEADER = struct.Struct('<H2x')
+GENERATION = struct.Struct('<I')
+MAGIC = b'DMXI'
+VERSION = 1
+DEFAULT_NAME = "artnet_input"
+
+def _slot_size(stride):
+    """计算一个槽位占用的字节数"""
+    return SLOT_HEADER.size + 2 * (BUFFER_HEADER.size + stride)
+
+def _attach_shared_memory(name):
+    """
+    连接已有共享内存，且不交给本进程的资源跟踪器管理，
+    避免写入方进程退出时共享内存被一并删除
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13之前没有track参数，连接后手动取消跟踪
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+# SharedMemoryInput 类
+class SharedMemoryInput:
+    """共享内存输入（控制器端），作为输出流水线的帧钩子把外部写入的宇宙合并进DMX控制器"""
+    
+    def __init__(self, dmx_controller, universes=(), slot_count=64, name=DEFAULT_NAME):
+        """
+        创建共享内存输入区
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            universes (iterable, optional): 预先分配槽位的宇宙号
+            slot_count (int, optional): 槽位数量，默认为64
+            name (str, optional): 共享内存名称，外部进程按此名称连接
+        """
+        if shared_memory is None:
+            raise RuntimeError("当前平台不支持 multiprocessing.shared_memory")
+        
+        self.dmx_controller = dmx_controller
+        self.stride = dmx_controller.get_channel_count()
+        self.slot_count = slot_count
+        self.slot_size = _slot_size(self.stride)
+        size = HEADER.size + slot_count * self.slot_size
+        
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 上次异常退出遗留的共享内存，删除后重新创建
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        
+        self.name = self.shm.name
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, self.stride, slot_count)
+        self.slot_universes = [None] * slot_count
+        self.generations = [0] * slot_count
+        for slot in range(slot_count):
+            SLOT_HEADER.pack_into(self.shm.buf, self._slot_offset(slot), 0, -1)
+        
+        self.frames_received = 0
+        self.torn_reads = 0  # 因写入过快放弃的读取次数
+        
+        for universe in universes:
+            self.assign(universe)
+    
+    def _slot_offset(self, slot):
+        """计算槽位在共享内存中的偏移量"""
+        return HEADER.size + slot * self.slot_size
+    
+    def assign(self, universe):
+        """
+        为宇宙分配槽位，外部进程随后即可写入该宇宙
+        
+        Args:
+            universe (int): 宇宙号（15位端口地址）
+            
+        Returns:
+            int: 槽位；没有空闲槽位时返回-1
+        """
+        if universe in self.slot_universes:
+            return self.slot_universes.index(universe)
+        if None not in self.slot_universes:
+            return -1
+        
+        slot = self.slot_universes.index(None)
+        self.dmx_controller.add_universe(universe)
+        self.slot_universes[slot] = universe
+        SLOT_HEADER.pack_into(self.shm.buf, self._slot_offset(slot), self.generations[slot], universe)
+        return slot
+    
+    def release(self, universe):
+        """
+        释放宇宙占用的槽位
+        
+        Args:
+            universe (int): 宇宙号
+        """
+        if universe in self.slot_universes:
+            slot = self.slot_universes.index(universe)
+            self.slot_universes[slot] = None
+            SLOT_HEADER.pack_into(self.shm.buf, self._slot_offset(slot), self.generations[slot], -1)
+    
+    def poll(self):
+        """
+        把generation发生变化的槽位复制进DMX控制器
+        
+        Returns:
+            int: 本次更新的宇宙数量
+        """
+        buf = self.shm.buf
+        half = BUFFER_HEADER.size + self.stride
+        updated = 0
+        
+        for slot, universe in enumerate(self.slot_universes):
+            if universe is None:
+                continue
+            base = self._slot_offset(slot)
+            generation = GENERATION.unpack_from(buf, base)[0]
+            if generation == self.generations[slot]:
+                continue
+            
+            data_offset = base + SLOT_HEADER.size + (generation & 1) * half
+            length = min(BUFFER_HEADER.unpack_from(buf, data_offset)[0], self.stride)
+            start = data_offset + BUFFER_HEADER.size
+            data = bytes(buf[start:start + length])
+            
+            # 复制期间写入方发布了新的一帧，可能已经开始改写刚复制的缓冲区
+            if GENERATION.unpack_from(buf, base)[0] != generation:
+                self.torn_reads += 1
+                continue
+            
+            self.generations[slot] = generation
+            self.dmx_controller.set_universe_data(universe, data)
+            updated += 1
+        
+        self.frames_received += updated
+        return updated
+    
+    def __call__(self, timestamp):
+        """
+        作为帧钩子使用: pipeline.add_frame_hook(shm_input)
+        """
+        self.poll()
+    
+    def close(self):
+        """
+        关闭并删除共享内存
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+# SharedMemoryInputWriter 类
+class SharedMemoryInputWriter:
+    """共享内存输入（外部进程端），向控制器分配的槽位写入整宇宙数据"""
+    
+    def __init__(self, name=DEFAULT_NAME):
+        """
+        连接控制器创建的共享内存输入区
+        
+        Args:
+            name (str, optional): 共享内存名称
+        """
+        if shared_memory is None:
+            raise RuntimeError("当前平台不支持 multiprocessing.shared_memory")
+        
+        self.shm = _attach_shared_memory(name)
+        magic, version, self.stride, self.slot_count = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"共享内存 {name} 不是有效的DMX输入区")
+        self.slot_size = _slot_size(self.stride)
+    
+    def find_slot(self, universe):
+        """
+        查找控制器为宇宙分配的槽位
+        
+        Args:
+            universe (int): 宇宙号
+            
+        Returns:
+            int: 槽位；未分配时返回-1
+        """
+        for slot in range(self.slot_count):
+            _, assigned = SLOT_HEADER.unpack_from(self.shm.buf, HEADER.size + slot * self.slot_size)
+            if assigned == universe:
+                return slot
+        return -1
+    
+    def write(self, universe, data):
+        """
+        写入一个宇宙的数据，控制器在下一帧读取
+        
+        Args:
+            universe (int): 宇宙号
+            data (bytes): 通道数据，超出每宇宙通道数的部分被忽略
+            
+        Returns:
+            bool: 写入是否成功（宇宙未分配槽位时失败）
+        """
+        slot = self.find_slot(universe)
+        if slot < 0:
+            return False
+        
+        buf = self.shm.buf
+        base = HEADER.size + slot * self.slot_size
+        generation = (GENERATION.unpack_from(buf, base)[0] + 1) & 0xFFFFFFFF
+        length = min(len(data), self.stride)
+        data_offset = base + SLOT_HEADER.size + (generation & 1) * (BUFFER_HEADER.size + self.stride)
+        
+        BUFFER_HEADER.pack_into(buf, data_offset, length)
+        start = data_offset + BUFFER_HEADER.size
+        buf[start:start + length] = data[:length]
+        # 最后发布generation
+        GENERATION.pack_into(buf, base, generation)
+        return True
+    
+    def close(self):
+        """
+        断开共享内存（不删除，由控制器负责）
+        """
+        self.shm.close()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# ArtNet Snapshot - 二进制演出快照：宇宙缓冲区、预设、配接、场景和界面设置保存在一个带版本的文件中
+#
+# 用法:
+#     ShowSnapshot.save("show.snapshot", controller, presets=presets, patch=patch,
+#                       cue_list=cue_engine.cue_list, settings={'master': 100})
+#     snapshot = ShowSnapshot.open("show.snapshot")
+#     snapshot.restore_universes(controller)         # 一次复制即可输出
+#     cue_engine.set_cue_list(snapshot.get_cue_list())  # 场景在GO时才解析
+#
+# 文件格式（小端）:
+#   文件头   8字节标识 "ARTSHOW\0"、版本 (uint16)、段数 (uint16)、保留 (uint32)
+#   段表     每段 16字节名称、编码 (uint8, 0=原始 1=zlib)、3字节填充、偏移 (uint64)、长度 (uint64)
+#   段数据   meta (JSON)、universes (原始通道数据，按meta中的宇宙顺序连续存放)、
+#            presets / patch / settings (zlib压缩的JSON)、cues (JSON Lines，索引在meta中)
+# 打开时用mmap映射文件，只解析文件头、段表和meta；其余各段在第一次使用时才解码，
+# 读取器忽略不认识的段，版本号只在已有段的格式改变时增加。
+
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from artnet_cue import Cue, CueList
+
+# SnapshotCueFile 类
+class SnapshotCueFile:
+    """快照中的场景段，接口与 CueFile 相同，场景在读取时才解析"""
+    
+    def __init__(self, snapshot, offset, index):
+        """
+        初始化快照场景段
+        
+        Args:
+            snapshot (ShowSnapshot): 打开的快照
+            offset (int): 场景段在文件中的偏移
+            index (list): 每个场景 [行起始偏移, 行结束偏移, 编号, 时间码]，偏移相对场景段
+        """
+        self.snapshot = snapshot
+        self.base = offset
+        self.offsets = [entry[0] for entry in index]
+        self.ends = [entry[1] for entry in index]
+        self.numbers = [entry[2] for entry in index]
+        self.timecodes = [entry[3] for entry in index]
+    
+    def __len__(self):
+        return len(self.offsets)
+    
+    def get_cue(self, position):
+        """
+        读取并解析一个场景
+        
+        Args:
+            position (int): 场景在列表中的位置（从0开始）
+            
+        Returns:
+            Cue: 场景
+        """
+        line = self.snapshot.read(self.base + self.offsets[position], self.base + self.ends[position])
+        return Cue.from_dict(json.loads(line))
+    
+    def close(self):
+        """
+        场景段随快照关闭，这里不需要处理
+        """
+        pass
+
+# ShowSnapshot 类
+class ShowSnapshot:
+    """二进制演出快照，保存时一次写入，打开时按需解码各段"""
+    
+    MAGIC = b'ARTSHOW\x00'
+    VERSION = 1
+    HEADER = struct.Struct('<8sHHI')
+    ENTRY = struct.Struct('<16sB3xQQ')
+    CODEC_RAW = 0
+    CODEC_ZLIB = 1
+    
+    def __init__(self, filename, data, sections, version):
+        """
+        初始化快照（请使用 ShowSnapshot.open）
+        
+        Args:
+            filename (str): 文件路径
+            data (mmap.mmap|bytes): 文件内容
+            sections (dict): 段名称 -> (编码, 偏移, 长度)
+            version (int): 文件格式版本
+        """
+        self.filename = filename
+        self.data = data
+        self.sections = sections
+        self.version = version
+        self._decoded = {}  # 已解码的段
+        self.meta = self._get_json('meta') or {}
+    
+    @classmethod
+    def open(cls, filename):
+        """
+        打开快照文件（用mmap映射，不读入整个文件）
+        
+        Args:
+            filename (str): 文件路径
+            
+        Returns:
+            ShowSnapshot: 快照；文件无效时返回None
+        """
+        try:
+            with open(filename, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception as e:
+            print(f"打开快照失败: {e}")
+            return None
+        
+        try:
+            magic, version, count, _ = cls.HEADER.unpack_from(data, 0)
+            if magic != cls.MAGIC:
+                raise ValueError("不是演出快照文件")
+            if version > cls.VERSION:
+                raise ValueError(f"不支持的快照版本 {version}")
+            sections = {}
+            for index in range(count):
+                name, codec, offset, length = cls.ENTRY.unpack_from(data, cls.HEADER.size + index * cls.ENTRY.size)
+                if offset + length > len(data):
+                    raise ValueError("快照文件不完整")
+                sections[name.rstrip(b'\x00').decode('ascii')] = (codec, offset, length)
+            return cls(filename, data, sections, version)
+        except Exception as e:
+            print(f"打开快照失败: {e}")
+            data.close()
+            return None
+    
+    def read(self, start, end):
+        """
+        读取文件中的一段字节
+        
+        Args:
+            start (int): 起始偏移
+            end (int): 结束偏移
+            
+        Returns:
+            bytes: 数据
+        """
+        return self.data[start:end]
+    
+    def has_section(self, name):
+        """
+        检查快照是否包含某个段
+        
+        Args:
+            name (str): 段名称
+            
+        Returns:
+            bool: 是否包含
+        """
+        return name in self.sections
+    
+    def get_section(self, name):
+        """
+        获取解码后的段数据（第一次调用时解码）
+        
+        Args:
+            name (str): 段名称
+            
+        Returns:
+            bytes: 段数据；段不存在时返回None
+        """
+        section = self.sections.get(name)
+        if section is None:
+            return None
+        codec, offset, length = section
+        if codec == self.CODEC_RAW:
+            return self.data[offset:offset + length]
+        decoded = self._decoded.get(name)
+        if decoded is None:
+            decoded = zlib.decompress(self.data[offset:offset + length])
+            self._decoded[name] = decoded
+        return decoded
+    
+    def _get_json(self, name):
+        """解析JSON段"""
+        data = self.get_section(name)
+        return None if data is None else json.loads(data)
+    
+    def get_presets(self):
+        """
+        获取预设
+        
+        Returns:
+            dict: 预设名称 -> 预设字典；没有时为空字典
+        """
+        return self._get_json('presets') or {}
+    
+    def get_settings(self):
+        """
+        获取保存时的界面和效果设置
+        
+        Returns:
+            dict: 设置；没有时为空字典
+        """
+        return self._get_json('settings') or {}
+    
+    def restore_patch(self, patch):
+        """
+        把配接恢复到配接表
+        
+        Args:
+            patch (Patch): 配接表
+            
+        Returns:
+            bool: 快照中有配接且全部配接成功
+        """
+        data = self._get_json('patch')
+        if data is None:
+            return False
+        return patch.load_dict(data)
+    
+    def get_cue_list(self):
+        """
+        获取场景列表（场景在使用时才从快照中解析，快照关闭后不能再读取）
+        
+        Returns:
+            CueList: 场景列表；快照中没有场景时返回空列表
+        """
+        section = self.sections.get('cues')
+        if section is None:
+            return CueList()
+        return CueList(cue_file=SnapshotCueFile(self, section[1], self.meta.get('cue_index', [])))
+    
+    def restore_universes(self, dmx_controller):
+        """
+        把宇宙缓冲区和有效通道数恢复到DMX控制器
+        
+        Args:
+            dmx_controller (DMXController): DMX控制器实例
+            
+        Returns:
+            int: 恢复的宇宙数量
+        """
+        section = self.sections.get('universes')
+        universes = self.meta.get('universes', [])
+        if section is None or not universes:
+            return 0
+        store = dmx_controller.store
+        saved_stride = self.meta.get('stride', store.stride)
+        _, offset, length = section
+        for universe in universes:
+            dmx_controller.add_universe(universe)
+        
+        if saved_stride == store.stride and store.universes[:len(universes)] == universes:
+            # 槽位顺序一致时整段一次复制
+            store.buffer[:length] = self.data[offset:offset + length]
+        else:
+            count = min(saved_stride, store.stride)
+            for index, universe in enumerate(universes):
+                start = offset + index * saved_stride
+                store.get_view(universe)[:count] = self.data[start:start + count]
+        
+        for universe, active_length in self.meta.get('active_lengths', {}).items():
+            dmx_controller.set_active_length(active_length, int(universe))
+        if 'default_universe' in self.meta:
+            dmx_controller.set_default_universe(self.meta['default_universe'])
+        dmx_controller.mark_updated()
+        return len(universes)
+    
+    def close(self):
+        """
+        关闭快照文件
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._decoded = {}
+    
+    @classmethod
+    def save(cls, filename, dmx_controller, presets=None, patch=None, cue_list=None, settings=None):
+        """
+        保存快照（先写入临时文件再替换，写入中断不会损坏原有快照）
+        
+        Args:
+            filename (str): 文件路径
+            dmx_controller (DMXController): DMX控制器实例
+            presets (dict, optional): 预设
+            patch (Patch, optional): 配接表
+            cue_list (CueList, optional): 场景列表
+            settings (dict, optional): 界面和效果设置，需可转换为JSON
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            store = dmx_controller.store
+            universes = list(store.universes)
+            meta = {
+                'created': time.time(),
+                'stride': store.stride,
+                'universes': universes,
+                'default_universe': dmx_controller.default_universe,
+                'active_lengths': {str(universe): length for universe, length in dmx_controller.active_lengths.items()}
+            }
+            sections = [('universes', cls.CODEC_RAW, bytes(store.snapshot()))]
+            if presets is not None:
+                sections.append(('presets', cls.CODEC_ZLIB, zlib.compress(json.dumps(presets).encode('utf-8'), 1)))
+            if patch is not None:
+                sections.append(('patch', cls.CODEC_ZLIB, zlib.compress(json.dumps(patch.to_dict()).encode('utf-8'), 1)))
+            if settings is not None:
+                sections.append(('settings', cls.CODEC_ZLIB, zlib.compress(json.dumps(settings).encode('utf-8'), 1)))
+            if cue_list is not None and len(cue_list):
+                # 场景不压缩，每个场景可以单独读取；编号和时间码放在meta中，打开时不需要扫描
+                lines = []
+                index = []
+                offset = 0
+                for position in range(len(cue_list)):
+                    cue = cue_list.get_cue(position)
+                    line = (json.dumps(cue.to_dict()) + '\n').encode('utf-8')
+                    index.append([offset, offset + len(line), cue.number, cue.timecode])
+                    lines.append(line)
+                    offset += len(line)
+                meta['cue_index'] = index
+                sections.append(('cues', cls.CODEC_RAW, b''.join(lines)))
+            sections.insert(0, ('meta', cls.CODEC_RAW, json.dumps(meta).encode('utf-8')))
+            
+            offset = cls.HEADER.size + len(sections) * cls.ENTRY.size
+            header = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(sections), 0)]
+            for name, codec, data in sections:
+                header.append(cls.ENTRY.pack(name.encode('ascii'), codec, offset, len(data)))
+                offset += len(data)
+            
+            temporary = filename + '.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(b''.join(header))
+                for _, _, data in sections:
+                    f.write(data)
+            os.replace(temporary, filename)
+            return True
+        except Exception as e:
+            print(f"保存快照失败: {e}")
+            return False
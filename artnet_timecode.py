@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# ArtNet TimeCode - ArtTimeCode 时间码的换算、追踪和生成
+
+import threading
+import time
+
+from artnet_core import ArtNetProtocol
+
+# 时间码类型 -> 实际帧率
+FRAME_RATES = {
+    ArtNetProtocol.TIMECODE_FILM: 24.0,
+    ArtNetProtocol.TIMECODE_EBU: 25.0,
+    ArtNetProtocol.TIMECODE_DF: 30000 / 1001,
+    ArtNetProtocol.TIMECODE_SMPTE: 30.0
+}
+
+# 丢帧格式: 每分钟丢弃帧号0和1，逢10分钟不丢
+DF_FRAMES_PER_MINUTE = 30 * 60 - 2
+DF_FRAMES_PER_10_MINUTES = DF_FRAMES_PER_MINUTE * 10 + 2
+
+def timecode_to_seconds(hours, minutes, seconds, frames, timecode_type=ArtNetProtocol.TIMECODE_EBU):
+    """
+    把时间码换算为秒
+    
+    Args:
+        hours (int): 时
+        minutes (int): 分
+        seconds (int): 秒
+        frames (int): 帧
+        timecode_type (int, optional): 时间码类型 (0-3)
+        
+    Returns:
+        float: 从 00:00:00:00 起的秒数
+    """
+    if timecode_type == ArtNetProtocol.TIMECODE_DF:
+        total_minutes = hours * 60 + minutes
+        frame_number = ((hours * 3600 + minutes * 60 + seconds) * 30 + frames
+                        - 2 * (total_minutes - total_minutes // 10))
+        return frame_number / FRAME_RATES[timecode_type]
+    return hours * 3600 + minutes * 60 + seconds + frames / FRAME_RATES.get(timecode_type, 25.0)
+
+def seconds_to_timecode(position, timecode_type=ArtNetProtocol.TIMECODE_EBU):
+    """
+    把秒换算为时间码
+    
+    Args:
+        position (float): 秒数
+        timecode_type (int, optional): 时间码类型 (0-3)
+        
+    Returns:
+        tuple: (时, 分, 秒, 帧)
+    """
+    rate = FRAME_RATES.get(timecode_type, 25.0)
+    # 加上极小量，避免浮点误差把整帧时刻算成上一帧
+    frame_number = int(max(position, 0.0) * rate + 1e-6)
+    if timecode_type == ArtNetProtocol.TIMECODE_DF:
+        tens, remainder = divmod(frame_number, DF_FRAMES_PER_10_MINUTES)
+        frame_number += 18 * tens
+        if remainder >= 2:
+            frame_number += 2 * ((remainder - 2) // DF_FRAMES_PER_MINUTE)
+        labels = 30
+    else:
+        labels = int(rate)
+    return ((frame_number // (labels * 3600)) % 24, (frame_number // (labels * 60)) % 60,
+            (frame_number // labels) % 60, frame_number % labels)
+
+# TimecodeChaser 类
+class TimecodeChaser:
+    """时间码追踪器：把收到的时间码换算为本地时钟上的平滑位置"""
+    
+    def __init__(self, smoothing=0.2, seek_threshold=0.5, timeout=1.0, stream_id=0):
+        """
+        初始化时间码追踪器
+        
+        Args:
+            smoothing (float, optional): 抖动平滑系数 (0-1]，每收到一帧只修正该比例的偏差；
+                1表示不平滑，直接跟随每个数据包
+            seek_threshold (float, optional): 偏差超过该秒数时视为跳转，立即对齐
+            timeout (float, optional): 超过该秒数未收到时间码视为停止
+            stream_id (int, optional): 只追踪该流编号的时间码
+        """
+        self.smoothing = smoothing
+        self.seek_threshold = seek_threshold
+        self.timeout = timeout
+        self.stream_id = stream_id
+        self.offset = None  # 时间码位置 - 本地时间
+        self.last_received = None
+        self.last_position = 0.0
+        self.timecode_type = ArtNetProtocol.TIMECODE_EBU
+        self.packets_received = 0
+        self.seek_count = 0  # 跳转次数，使用方可据此判断是否发生了跳转
+        self._lock = threading.Lock()
+    
+    def receive(self, packet_info, now=None):
+        """
+        处理解析后的ArtTimeCode数据包（可在监听线程中调用）
+        
+        Args:
+            packet_info (dict): ArtNetProtocol.parse_packet 的结果
+            now (float, optional): 接收时间，默认为当前时间
+            
+        Returns:
+            bool: 数据包是否被采用
+        """
+        if packet_info.get('opcode') != ArtNetProtocol.OPCODE_TIMECODE:
+            return False
+        if packet_info['stream_id'] != self.stream_id:
+            return False
+        self.timecode_type = packet_info['type']
+        position = timecode_to_seconds(packet_info['hours'], packet_info['minutes'],
+                                       packet_info['seconds'], packet_info['frames'],
+                                       packet_info['type'])
+        self.update(position, now)
+        return True
+    
+    def update(self, position, now=None):
+        """
+        输入一个时间码位置
+        
+        Args:
+            position (float): 时间码位置（秒）
+            now (float, optional): 接收时间，默认为当前时间
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if (self.offset is None or not self._is_running(now)
+                    or abs(position - (now + self.offset)) > self.seek_threshold):
+                self.offset = position - now
+                self.seek_count += 1
+            else:
+                self.offset += (position - now - self.offset) * self.smoothing
+            self.last_received = now
+            self.last_position = position
+            self.packets_received += 1
+    
+    def _is_running(self, now):
+        return self.last_received is not None and now - self.last_received <= self.timeout
+    
+    def is_running(self, now=None):
+        """
+        时间码是否正在走动
+        
+        Returns:
+            bool: 最近 timeout 秒内是否收到过时间码
+        """
+        return self._is_running(time.time() if now is None else now)
+    
+    def get_position(self, now=None):
+        """
+        获取当前时间码位置
+        
+        Args:
+            now (float, optional): 本地时间，默认为当前时间
+            
+        Returns:
+            float: 时间码位置（秒）；时间码停止时返回最后收到的位置，从未收到时返回None
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.offset is None:
+                return None
+            if not self._is_running(now):
+                return self.last_position
+            return now + self.offset
+    
+    def reset(self):
+        """
+        清除追踪状态
+        """
+        with self._lock:
+            self.offset = None
+            self.last_received = None
+            self.last_position = 0.0
+
+# TimecodeGenerator 类
+class TimecodeGenerator:
+    """时间码发生器，作为输出流水线的帧钩子在每个新的时间码帧发送ArtTimeCode"""
+    
+    def __init__(self, network_manager, protocol=None, timecode_type=ArtNetProtocol.TIMECODE_EBU,
+                 target_ip=None, stream_id=0):
+        """
+        初始化时间码发生器
+        
+        Args:
+            network_manager (NetworkManager): 网络管理器
+            protocol (ArtNetProtocol, optional): 协议实例，默认新建
+            timecode_type (int, optional): 时间码类型 (0-3)
+            target_ip (str, optional): 目标IP地址，默认为广播地址
+            stream_id (int, optional): 时间码流编号
+        """
+        self.network_manager = network_manager
+        self.protocol = protocol or ArtNetProtocol()
+        self.timecode_type = timecode_type
+        self.target_ip = target_ip
+        self.stream_id = stream_id
+        self.start_time = None
+        self.last_frame = None
+    
+    def start(self, position=0.0, now=None):
+        """
+        从指定位置开始走时
+        
+        Args:
+            position (float, optional): 起始位置（秒）
+            now (float, optional): 起始时间，默认为当前时间
+        """
+        now = time.time() if now is None else now
+        self.start_time = now - position
+        self.last_frame = None
+    
+    def stop(self):
+        """
+        停止走时
+        """
+        self.start_time = None
+    
+    def send(self, position):
+        """
+        发送一个时间码数据包
+        
+        Args:
+            position (float): 时间码位置（秒）
+            
+        Returns:
+            bool: 发送是否成功
+        """
+        hours, minutes, seconds, frames = seconds_to_timecode(position, self.timecode_type)
+        packet = self.protocol.build_timecode_packet(hours, minutes, seconds, frames,
+                                                     self.timecode_type, self.stream_id)
+        return self.network_manager.send_packet(packet, self.target_ip)
+    
+    def __call__(self, timestamp):
+        """
+        作为帧钩子使用: pipeline.add_frame_hook(generator)；
+        每个时间码帧只发送一次，输出帧率低于时间码帧率时会跳过部分帧
+        """
+        if self.start_time is None:
+            return
+        position = timestamp - self.start_time
+        frame = int(position * FRAME_RATES[self.timecode_type] + 1e-6)
+        if frame != self.last_frame:
+            self.last_frame = frame
+            self.send(position)
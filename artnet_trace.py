@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# ArtNet Trace - 帧流水线的追踪区间，保存在固定大小的环形缓冲区中，可导出为Chrome追踪格式
+#
+# 用法:
+#     tracer = Tracer()
+#     pipeline.set_tracer(tracer)          # 帧钩子、快照、处理阶段、数据包构建和发送
+#     network_manager.tracer = tracer      # 接收路径
+#     ...
+#     tracer.export("trace.json")          # 用 chrome://tracing 或 ui.perfetto.dev 打开
+#
+# 未设置追踪器时各处只多一次None判断；记录一个区间只是向预先分配的列表写入几个值。
+
+import itertools
+import json
+import os
+import threading
+import time
+
+# Tracer 类
+class Tracer:
+    """追踪区间记录器，缓冲区满后覆盖最旧的区间"""
+    
+    def __init__(self, capacity=16384):
+        """
+        初始化追踪区间记录器
+        
+        Args:
+            capacity (int, optional): 环形缓冲区能保存的区间数量
+        """
+        self.capacity = capacity
+        self.enabled = True
+        self._names = [None] * capacity
+        self._categories = [None] * capacity
+        self._starts = [0] * capacity
+        self._ends = [0] * capacity
+        self._threads = [0] * capacity
+        self._args = [None] * capacity
+        self._counter = itertools.count()  # next() 在GIL下是原子的，多个线程可同时记录
+        self._written = 0
+        self.origin = time.perf_counter_ns()
+    
+    def now(self):
+        """
+        获取当前时间戳
+        
+        Returns:
+            int: 纳秒
+        """
+        return time.perf_counter_ns()
+    
+    def name_of(self, obj):
+        """
+        获取帧钩子或处理阶段在追踪中显示的名称
+        
+        Args:
+            obj (callable): 函数或可调用对象
+            
+        Returns:
+            str: 函数名或类名
+        """
+        return getattr(obj, '__name__', None) or type(obj).__name__
+    
+    def record(self, name, start, category='frame', args=None, end=None):
+        """
+        记录一个区间
+        
+        Args:
+            name (str): 区间名称
+            start (int): 开始时间，来自 now()
+            category (str, optional): 分类
+            args (dict, optional): 附加信息
+            end (int, optional): 结束时间，默认为现在
+        """
+        if not self.enabled:
+            return
+        end = time.perf_counter_ns() if end is None else end
+        count = next(self._counter)
+        index = count % self.capacity
+        self._names[index] = name
+        self._categories[index] = category
+        self._starts[index] = start
+        self._ends[index] = end
+        self._threads[index] = threading.get_ident()
+        self._args[index] = args
+        self._written = count + 1
+    
+    def instant(self, name, category='frame', args=None):
+        """
+        记录一个瞬时事件（例如帧超时）
+        
+        Args:
+            name (str): 事件名称
+            category (str, optional): 分类
+            args (dict, optional): 附加信息
+        """
+        now = time.perf_counter_ns()
+        self.record(name, now, category, args, now)
+    
+    def clear(self):
+        """
+        清空缓冲区
+        """
+        self._counter = itertools.count()
+        self._written = 0
+    
+    def get_spans(self):
+        """
+        按记录顺序获取缓冲区中的区间
+        
+        Returns:
+            list: [(名称, 分类, 开始, 结束, 线程, 附加信息), ...]，时间为纳秒
+        """
+        written = self._written
+        first = max(0, written - self.capacity)
+        spans = []
+        for count in range(first, written):
+            index = count % self.capacity
+            spans.append((self._names[index], self._categories[index], self._starts[index],
+                          self._ends[index], self._threads[index], self._args[index]))
+        return spans
+    
+    def to_chrome_trace(self):
+        """
+        转换为Chrome/Perfetto追踪格式
+        
+        Returns:
+            dict: {"traceEvents": [...]}，时间单位为微秒
+        """
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        pid = os.getpid()
+        events = []
+        threads = set()
+        for name, category, start, end, thread, args in self.get_spans():
+            threads.add(thread)
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X' if end > start else 'i',
+                'ts': (start - self.origin) / 1000.0,
+                'pid': pid,
+                'tid': thread
+            }
+            if end > start:
+                event['dur'] = (end - start) / 1000.0
+            else:
+                event['s'] = 't'
+            if args:
+                event['args'] = args
+            events.append(event)
+        for thread in threads:
+            events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': pid,
+                'tid': thread,
+                'args': {'name': thread_names.get(thread, str(thread))}
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+    
+    def export(self, filename):
+        """
+        把缓冲区中的区间导出为追踪文件（不影响继续记录）
+        
+        Args:
+            filename (str): 文件路径
+            
+        Returns:
+            bool: 导出是否成功
+        """
+        try:
+            with open(filename, 'w') as f:
+                json.dump(self.to_chrome_trace(), f)
+            return True
+        except Exception as e:
+            print(f"导出追踪失败: {e}")
+            return False
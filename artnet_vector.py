@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# ArtNet Vector - 宇宙缓冲区的NumPy视图工具
+
+import numpy as np
+
+# StoreArray 类
+class StoreArray:
+    """UniverseStore缓冲区的NumPy视图，缓冲区扩容后自动重建"""
+    
+    def __init__(self, store):
+        """
+        初始化缓冲区视图
+        
+        Args:
+            store (UniverseStore): 宇宙缓冲区存储
+        """
+        self.store = store
+        self._array = None
+        self._layout_version = None
+    
+    def flat(self):
+        """
+        获取整个缓冲区的一维视图（直接读写，不复制）
+        
+        Returns:
+            numpy.ndarray: uint8一维数组，宇宙u的通道c位于 slot(u) * stride + c
+        """
+        if self._layout_version != self.store.layout_version or self._array is None:
+            self._array = np.frombuffer(self.store.buffer, dtype=np.uint8)
+            self._layout_version = self.store.layout_version
+        return self._array
+    
+    def frame(self):
+        """
+        获取按槽位排列的二维视图
+        
+        Returns:
+            numpy.ndarray: 形状为 (容量, 每宇宙通道数) 的uint8数组
+        """
+        return self.flat().reshape(-1, self.store.stride)
+    
+    def flat_indices(self, universes, channel_indices):
+        """
+        把 (宇宙号, 通道索引) 换算为一维视图中的索引，不存在的宇宙会被创建
+        
+        槽位一旦分配便不再变化，所以换算结果可以预先计算并长期使用。
+        
+        Args:
+            universes (iterable): 宇宙号
+            channel_indices (iterable): 从0开始的通道索引
+            
+        Returns:
+            numpy.ndarray: int64索引数组
+        """
+        universes = np.asarray(list(universes), dtype=np.int64)
+        channel_indices = np.asarray(list(channel_indices), dtype=np.int64)
+        slot_of = {}
+        for universe in np.unique(universes).tolist():
+            slot_of[universe] = self.store.add_universe(universe)
+        slots = np.fromiter((slot_of[u] for u in universes.tolist()), dtype=np.int64, count=len(universes))
+        return slots * self.store.stride + channel_indices
+
+def frame_index(store, frame, flat_indices):
+    """
+    把宇宙缓冲区一维视图中的索引换算为输出帧数据中的索引
+    
+    Args:
+        store (UniverseStore): 宇宙缓冲区存储
+        frame (OutputFrame): 输出帧（可能只包含部分宇宙，顺序也可能不同）
+        flat_indices (numpy.ndarray): 缓冲区一维视图中的索引
+        
+    Returns:
+        tuple: (帧数据中的索引, 布尔掩码)，掩码为False的索引所在宇宙不在帧中
+    """
+    stride = store.stride
+    positions = np.full(len(store.universes), -1, dtype=np.int64)
+    for position, universe in enumerate(frame.universes):
+        slot = store.slots.get(universe)
+        if slot is not None:  # 建帧后宇宙号被修改时帧中是旧宇宙号
+            positions[slot] = position
+    
+    slots = flat_indices // stride
+    frame_slots = np.where(slots < len(positions), positions[np.minimum(slots, len(positions) - 1)], -1)
+    valid = frame_slots >= 0
+    return frame_slots * stride + flat_indices % stride, valid
@@ -11,14 +11,32 @@ from kivy.uix.slider import Slider
 from kivy.uix.spinner import Spinner
 from kivy.uix.togglebutton import ToggleButton
 from kivy.uix.screenmanager import ScreenManager, Screen
+from kivy.uix.widget import Widget
 from kivy.properties import NumericProperty, StringProperty, BooleanProperty
-from kivy.clock import Clock
+from kivy.clock import Clock, mainthread
+from kivy.graphics import Color, Rectangle
+from kivy.graphics.texture import Texture
 from kivy.lang import Builder
 
-from artnet_core import ArtNetProtocol, NetworkManager, DMXController, EffectEngine
+from artnet_core import (ArtNetProtocol, NetworkManager, DMXController, EffectEngine,
+                         OutputPipeline, ArtNetTransport, SequenceFilter)
+from artnet_sacn import SACNTransport
+from artnet_patch import Patch
+from artnet_curves import OutputCurves
+from artnet_fade import FadeEngine
+from artnet_cue import Cue, CueList, CueEngine
+from artnet_timecode import TimecodeChaser
+from artnet_playback import RecordingPlayer
+from artnet_capture import ReplayBuffer, save_recording
+from artnet_osc import OSCServer
+from artnet_trace import Tracer
+from artnet_expression import ExpressionEffect
+from artnet_netpool import SocketPool
+from artnet_snapshot import ShowSnapshot
 
-import threading
 import time
+import os
+import json
 
 # Kivy界面定义
 Builder.load_string('''
@@ -54,6 +72,7 @@ Builder.load_string('''
             font_size: '14sp'
         TextInput:
             id: net_input
+            on_text_validate: root.update_output_settings()
             text: '0'
             input_filter: 'int'
             multiline: False
@@ -64,6 +83,7 @@ Builder.load_string('''
             font_size: '14sp'
         TextInput:
             id: subnet_input
+            on_text_validate: root.update_output_settings()
             text: '0'
             input_filter: 'int'
             multiline: False
@@ -74,6 +94,7 @@ Builder.load_string('''
             font_size: '14sp'
         TextInput:
             id: universe_input
+            on_text_validate: root.update_output_settings()
             text: '0'
             input_filter: 'int'
             multiline: False
@@ -84,10 +105,44 @@ Builder.load_string('''
             font_size: '14sp'
         TextInput:
             id: target_ip_input
+            on_text_validate: root.update_output_settings()
             text: '255.255.255.255'
             multiline: False
             font_size: '14sp'
     
+    # 输出协议
+    GridLayout:
+        cols: 2
+        spacing: 5
+        size_hint_y: None
+        height: '40dp'
+        
+        Label:
+            text: '输出协议:'
+            font_size: '14sp'
+        Spinner:
+            id: transport_spinner
+            values: ('Art-Net', 'sACN', 'Art-Net + sACN')
+            text: 'Art-Net'
+            font_size: '14sp'
+            on_text: root.update_output_settings()
+    
+    # 总控
+    GridLayout:
+        cols: 2
+        spacing: 5
+        size_hint_y: None
+        height: '40dp'
+        
+        Label:
+            text: '总控: {:.0f}%'.format(root.master_value)
+            font_size: '14sp'
+        Slider:
+            min: 0
+            max: 100
+            value: root.master_value
+            on_value: root.update_master_value(self.value)
+    
     # 发送控制
     BoxLayout:
         spacing: 10
@@ -104,6 +159,12 @@ Builder.load_string('''
             text: '重置通道'
             on_release: root.reset_channels()
             font_size: '14sp'
+        
+        ToggleButton:
+            id: input_button
+            text: '接收输入' if self.state == 'normal' else '停止接收'
+            on_state: root.toggle_input(self.state)
+            font_size: '14sp'
     
     # 通道控制
     BoxLayout:
@@ -135,6 +196,29 @@ Builder.load_string('''
                 multiline: False
                 font_size: '14sp'
         
+        GridLayout:
+            cols: 4
+            spacing: 5
+            size_hint_y: None
+            height: '40dp'
+            
+            Label:
+                text: '属性:'
+                font_size: '14sp'
+            Spinner:
+                id: attribute_spinner
+                values: ('通道',)
+                text: '通道'
+                font_size: '14sp'
+            Label:
+                text: '编组:'
+                font_size: '14sp'
+            Spinner:
+                id: group_spinner
+                values: ('全部',)
+                text: '全部'
+                font_size: '14sp'
+        
         GridLayout:
             cols: 3
             spacing: 5
@@ -154,6 +238,22 @@ Builder.load_string('''
                 text: '应用'
                 on_release: root.apply_channel_values()
                 font_size: '14sp'
+        
+        GridLayout:
+            cols: 2
+            spacing: 5
+            size_hint_y: None
+            height: '40dp'
+            
+            Label:
+                text: '渐变时间(秒):'
+                font_size: '14sp'
+            TextInput:
+                id: fade_time_input
+                text: '0'
+                input_filter: 'float'
+                multiline: False
+                font_size: '14sp'
     
     # 效果控制
     BoxLayout:
@@ -171,10 +271,25 @@ Builder.load_string('''
                 font_size: '14sp'
             Spinner:
                 id: effect_spinner
-                values: ('chase', 'pulse', 'strobe')
+                values: ('chase', 'pulse', 'strobe', 'expression')
                 text: 'chase'
                 font_size: '14sp'
         
+        GridLayout:
+            cols: 2
+            spacing: 5
+            size_hint_y: None
+            height: '40dp'
+            
+            Label:
+                text: '表达式:'
+                font_size: '14sp'
+            TextInput:
+                id: expression_input
+                text: 'max(sin(t*speed/10 + i*0.5), 0)*intensity'
+                multiline: False
+                font_size: '14sp'
+        
         GridLayout:
             cols: 2
             spacing: 5
@@ -217,6 +332,32 @@ Builder.load_string('''
             size_hint_y: None
             height: '40dp'
     
+    # 通道监视
+    BoxLayout:
+        orientation: 'vertical'
+        spacing: 5
+        size_hint_y: None
+        height: '160dp'
+        
+        GridLayout:
+            cols: 2
+            spacing: 5
+            size_hint_y: None
+            height: '40dp'
+            
+            Label:
+                text: '监视宇宙:'
+                font_size: '14sp'
+            TextInput:
+                id: monitor_universes_input
+                hint_text: '全部 (如 0,1,2)'
+                multiline: False
+                font_size: '14sp'
+                on_text_validate: root.update_monitor_universes(self.text)
+        
+        ChannelMonitor:
+            id: channel_monitor
+    
     # 录制控制
     BoxLayout:
         spacing: 10
@@ -238,12 +379,134 @@ Builder.load_string('''
             text: '播放录制'
             on_release: root.play_recorded_data()
             font_size: '14sp'
+        
+        Button:
+            text: '导出追踪'
+            on_release: root.export_trace()
+            font_size: '14sp'
+        
+        Button:
+            text: '保存演出'
+            on_release: root.save_snapshot()
+            font_size: '14sp'
+    
+    # 场景回放
+    BoxLayout:
+        spacing: 10
+        size_hint_y: None
+        height: '50dp'
+        
+        Label:
+            id: cue_label
+            text: '场景: -'
+            font_size: '14sp'
+        
+        Button:
+            text: 'GO'
+            on_release: root.go_cue()
+            font_size: '14sp'
+        
+        Button:
+            text: '上一场景'
+            on_release: root.back_cue()
+            font_size: '14sp'
+        
+        Button:
+            text: '记录场景'
+            on_release: root.record_cue()
+            font_size: '14sp'
+        
+        ToggleButton:
+            id: timecode_button
+            text: '追踪时间码'
+            on_state: root.toggle_timecode(self.state)
+            font_size: '14sp'
 ''')
 
+class ChannelMonitor(Widget):
+    """通道监视器，把所选宇宙的全部通道绘制进同一张纹理，用一次绘制显示"""
+    
+    # 刷新频率上限 (Hz)
+    max_fps = NumericProperty(15)
+    # 每行像素数，512通道的宇宙显示为 32x16 的方块
+    columns = 32
+    
+    def __init__(self, **kwargs):
+        super(ChannelMonitor, self).__init__(**kwargs)
+        self.dmx_controller = None
+        self.universes = None  # None表示显示所有宇宙
+        self._texture = None
+        self._last_update_time = None
+        self._refresh_event = None
+        
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self._rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_rect, size=self._update_rect)
+    
+    def attach(self, dmx_controller):
+        """绑定DMX控制器并开始定时刷新"""
+        self.dmx_controller = dmx_controller
+        self.start()
+    
+    def set_universes(self, universes):
+        """设置要显示的宇宙列表，None表示全部"""
+        self.universes = universes
+        self._last_update_time = None  # 强制下次刷新
+    
+    def start(self):
+        """开始定时刷新"""
+        self.stop()
+        self._refresh_event = Clock.schedule_interval(self._refresh, 1.0 / self.max_fps)
+    
+    def stop(self):
+        """停止定时刷新"""
+        if self._refresh_event:
+            self._refresh_event.cancel()
+            self._refresh_event = None
+    
+    def _update_rect(self, *args):
+        self._rect.pos = self.pos
+        self._rect.size = self.size
+    
+    def _refresh(self, dt):
+        """从DMX缓冲区更新纹理，数据未变化时跳过"""
+        controller = self.dmx_controller
+        if controller is None:
+            return
+        
+        update_time = controller.get_last_update_time()
+        if update_time == self._last_update_time and self._texture is not None:
+            return
+        self._last_update_time = update_time
+        
+        universes = self.universes
+        if universes is None:
+            universes = controller.get_universe_ids()
+        if not universes:
+            return
+        
+        # 每个宇宙补齐为整行，所有宇宙自上而下拼接成一块连续像素
+        rows_per_universe = -(-controller.get_channel_count() // self.columns)
+        padding = bytes(rows_per_universe * self.columns - controller.get_channel_count())
+        pixels = b''.join(controller.get_universe_data(u) + padding for u in universes)
+        size = (self.columns, rows_per_universe * len(universes))
+        
+        if self._texture is None or self._texture.size != size:
+            self._texture = Texture.create(size=size, colorfmt='luminance')
+            self._texture.mag_filter = 'nearest'
+            self._texture.min_filter = 'nearest'
+            self._texture.flip_vertical()
+            self._rect.texture = self._texture
+        
+        self._texture.blit_buffer(pixels, colorfmt='luminance', bufferfmt='ubyte')
+        self.canvas.ask_update()
+
 class MainScreen(Screen):
     # 属性定义
     channel_value = NumericProperty(0)
     speed_value = NumericProperty(50)
+    master_value = NumericProperty(100)
     status_text = StringProperty('就绪')
     
     def __init__(self, **kwargs):
@@ -253,16 +516,96 @@ class MainScreen(Screen):
         self.artnet_protocol = ArtNetProtocol()
         self.network_manager = NetworkManager()
         self.dmx_controller = DMXController()
-        self.effect_engine = EffectEngine(self.dmx_controller)
+        self.fade_engine = FadeEngine(self.dmx_controller)
+        self.effect_engine = EffectEngine(self.dmx_controller, self.fade_engine)
+        
+        # 演出快照：存在 show.snapshot 时从中恢复配接、通道、预设、场景和设置，
+        # 否则分别从 patch.json、presets.json、cues.jsonl 加载
+        self.snapshot = ShowSnapshot.open('show.snapshot') if os.path.exists('show.snapshot') else None
+        
+        # 灯具配接
+        self.patch = Patch(self.dmx_controller)
+        if self.snapshot and self.snapshot.has_section('patch'):
+            self.snapshot.restore_patch(self.patch)
+        elif os.path.exists('patch.json'):
+            self.patch.load('patch.json')
+        # 有配接时每个宇宙只发送到已配接的最高通道；快照中保存的有效通道数随后覆盖
+        if self.patch.fixtures:
+            self.patch.apply_active_lengths()
+        if self.snapshot:
+            self.snapshot.restore_universes(self.dmx_controller)
         
-        # 发送线程控制
+        # 输出帧流水线
+        self.artnet_transport = ArtNetTransport(self.network_manager, self.artnet_protocol)
+        self.sacn_transport = SACNTransport()
+        self.output_pipeline = OutputPipeline(self.dmx_controller)
+        self.output_pipeline.add_transport('artnet', self.artnet_transport)
+        self.output_pipeline.add_transport('sacn', self.sacn_transport)
+        
+        # 多网卡输出（存在 interfaces.json 时配置）：每个接口一个传输后端，宇宙按配置分配到接口
+        self.socket_pool = SocketPool()
+        if os.path.exists('interfaces.json'):
+            self.load_interfaces('interfaces.json')
+        
+        # 场景列表（按需加载，快照中的场景在使用时才解析）
+        self.cue_engine = CueEngine(self.dmx_controller, self.fade_engine)
+        if self.snapshot and self.snapshot.has_section('cues'):
+            self.cue_engine.set_cue_list(self.snapshot.get_cue_list())
+        elif os.path.exists('cues.jsonl'):
+            self.cue_engine.set_cue_list(CueList.load('cues.jsonl'))
+        
+        # OSC远程控制（端口8000），可用 /preset/<名称> 调用预设
+        presets = {}
+        if self.snapshot and self.snapshot.has_section('presets'):
+            presets = self.snapshot.get_presets()
+        elif os.path.exists('presets.json'):
+            try:
+                with open('presets.json', 'r') as f:
+                    presets = json.load(f)
+            except Exception as e:
+                print(f"加载预设失败: {e}")
+        self.osc_server = OSCServer(self.dmx_controller, cue_engine=self.cue_engine,
+                                    effect_engine=self.effect_engine, presets=presets)
+        self.osc_server.start()
+        
+        # 帧钩子顺序: OSC操作 -> 自动GO -> 渐变，同一帧内的 /cue/go 立即开始渐变
+        self.output_pipeline.add_frame_hook(self.osc_server)
+        self.output_pipeline.add_frame_hook(self.cue_engine)
+        self.output_pipeline.add_frame_hook(self.fade_engine)
+        
+        # 录制回放在帧时钟上进行，可追踪接收到的ArtTimeCode
+        self.timecode_chaser = TimecodeChaser()
+        self.chasing_timecode = False
+        self.recording_player = RecordingPlayer(
+            self.dmx_controller, on_finished=lambda: self.post_status("播放完成"))
+        self.output_pipeline.add_frame_hook(self.recording_player)
+        
+        # 录制作为第一个处理阶段，按输出帧时钟记录输出曲线和总控之前的通道值：
+        # 回放时写回DMX控制器，再经过曲线和总控，输出与录制时一致而不会被处理两次；
+        # 环形缓冲区只保留最近5分钟，长时间录制内存也不会增长
+        self.replay_buffer = ReplayBuffer(seconds=300, frame_rate=self.output_pipeline.frame_rate,
+                                          store=self.dmx_controller.store)
+        self.output_pipeline.add_stage(self.replay_buffer)
+        
+        # 帧追踪：始终记录最近的区间，出现卡顿后可导出分析
+        self.tracer = Tracer()
+        self.output_pipeline.set_tracer(self.tracer)
+        self.network_manager.tracer = self.tracer
+        
+        # 输出曲线和总控
+        self.output_curves = OutputCurves(self.dmx_controller.store)
+        if self.patch.fixtures:
+            self.output_curves.apply_patch(self.patch)
+        self.output_pipeline.add_stage(self.output_curves)
         self.sending = False
-        self.send_thread = None
-        self.last_send_time = 0
         
-        # 录制数据
+        # 网络输入
+        self.receiving = False
+        self.sequence_filter = SequenceFilter()
+        self.local_ip = None
+        
+        # 录制数据 [(帧时间戳, 通道数据), ...]
         self.recorded_data = []
-        self.recording = False
         
         # 初始化网络
         try:
@@ -274,6 +617,77 @@ class MainScreen(Screen):
                 self.status_text = "网络: 初始化失败"
         except Exception as e:
             self.status_text = f"网络: 初始化错误 - {str(e)}"
+        
+        # kv规则中的ids在构建完成后才可用
+        Clock.schedule_once(self._attach_monitor)
+    
+    def _attach_monitor(self, dt):
+        """绑定通道监视器，并用配接中的属性和编组填充选择列表"""
+        self.ids.channel_monitor.attach(self.dmx_controller)
+        if self.patch.fixtures:
+            self.ids.attribute_spinner.values = ['通道'] + self.patch.get_attributes()
+            self.ids.group_spinner.values = ['全部'] + self.patch.get_groups()
+        if self.snapshot:
+            self.restore_settings(self.snapshot.get_settings())
+    
+    def get_settings(self):
+        """获取需要保存到演出快照的界面和效果设置"""
+        return {
+            'master': self.master_value,
+            'speed': self.speed_value,
+            'channel_value': self.channel_value,
+            'effect_type': self.ids.effect_spinner.text,
+            'direction': self.ids.direction_spinner.text,
+            'expression': self.ids.expression_input.text,
+            'start_channel': self.ids.start_channel_input.text,
+            'end_channel': self.ids.end_channel_input.text,
+            'effect_running': self.effect_engine.running,
+            'net': self.ids.net_input.text,
+            'subnet': self.ids.subnet_input.text,
+            'universe': self.ids.universe_input.text,
+            'target_ip': self.ids.target_ip_input.text,
+            'transport': self.ids.transport_spinner.text
+        }
+    
+    def restore_settings(self, settings):
+        """恢复演出快照中的界面和效果设置，保存时正在运行的效果重新开始"""
+        self.update_master_value(settings.get('master', self.master_value))
+        self.speed_value = settings.get('speed', self.speed_value)
+        self.channel_value = settings.get('channel_value', self.channel_value)
+        # 地址输入框与快照恢复的默认宇宙一致，开始发送时才不会把数据移回宇宙0；
+        # 协议选择框的on_text会应用地址，因此放在地址之后
+        for key, widget in (('effect_type', 'effect_spinner'), ('direction', 'direction_spinner'),
+                            ('expression', 'expression_input'), ('start_channel', 'start_channel_input'),
+                            ('end_channel', 'end_channel_input'), ('net', 'net_input'),
+                            ('subnet', 'subnet_input'), ('universe', 'universe_input'),
+                            ('target_ip', 'target_ip_input'), ('transport', 'transport_spinner')):
+            if key in settings:
+                self.ids[widget].text = settings[key]
+        if settings.get('effect_running'):
+            self.run_effect()
+    
+    def save_snapshot(self):
+        """把当前通道、配接、预设、场景和设置保存为演出快照"""
+        if ShowSnapshot.save('show.snapshot', self.dmx_controller, presets=self.osc_server.presets,
+                             patch=self.patch, cue_list=self.cue_engine.cue_list, settings=self.get_settings()):
+            self.status_text = "已保存演出快照"
+        else:
+            self.status_text = "保存演出快照失败"
+    
+    @mainthread
+    def post_status(self, text):
+        """在UI线程中更新状态文本，供工作线程调用"""
+        self.status_text = text
+    
+    def update_monitor_universes(self, text):
+        """更新监视的宇宙列表"""
+        try:
+            universes = [int(u) for u in text.replace(' ', '').split(',') if u]
+            self.ids.channel_monitor.set_universes(universes or None)
+            for universe in universes:
+                self.dmx_controller.add_universe(universe)
+        except ValueError:
+            self.status_text = "错误: 宇宙列表格式无效"
     
     def toggle_sending(self, state):
         """切换发送状态"""
@@ -286,44 +700,72 @@ class MainScreen(Screen):
         """开始发送ArtNet数据包"""
         if not self.sending:
             self.sending = True
-            self.send_thread = threading.Thread(target=self._send_loop, daemon=True)
-            self.send_thread.start()
+            self.update_output_settings()
+            self.output_pipeline.start()
             self.status_text = "发送中..."
     
     def stop_sending(self):
         """停止发送ArtNet数据包"""
         self.sending = False
-        if self.send_thread:
-            self.send_thread.join(timeout=1.0)
-            self.send_thread = None
-        self.status_text = "就绪"
-    
-    def _send_loop(self):
-        """发送数据包的循环"""
-        while self.sending:
+        self.output_pipeline.stop()
+        dropped = self.socket_pool.get_dropped()
+        self.status_text = f"就绪，多网卡输出丢弃 {dropped} 个数据包" if dropped else "就绪"
+    
+    def load_interfaces(self, filename):
+        """
+        加载多网卡输出配置
+        
+        格式: [{"name": "wired", "source_ip": "192.168.1.10", "broadcast_ip": "192.168.1.255",
+                "universes": [0, 1, 2]}, ...]，broadcast_ip 可省略
+        """
+        try:
+            with open(filename, 'r') as f:
+                interfaces = json.load(f)
+        except Exception as e:
+            print(f"加载网络接口配置失败: {e}")
+            return
+        
+        if not isinstance(interfaces, list):
+            print("加载网络接口配置失败: 格式无效")
+            return
+        for config in interfaces:
             try:
-                # 获取设置值（只在需要时获取，减少UI访问）
-                net = int(self.ids.net_input.text) if self.ids.net_input.text else 0
-                subnet = int(self.ids.subnet_input.text) if self.ids.subnet_input.text else 0
-                universe = int(self.ids.universe_input.text) if self.ids.universe_input.text else 0
-                target_ip = self.ids.target_ip_input.text or "255.255.255.255"
-                
-                # 构建数据包
-                dmx_data = self.dmx_controller.get_channel_data_for_artnet()
-                packet = self.artnet_protocol.build_dmx_packet(net, subnet, universe, dmx_data)
-                
-                # 发送数据包
-                start_time = time.time()
-                if self.network_manager.send_packet(packet, target_ip):
-                    # 限制发送频率，确保稳定的50Hz
-                    elapsed = time.time() - start_time
-                    sleep_time = max(0.02 - elapsed, 0.001)  # 最小0.001秒
-                    time.sleep(sleep_time)
-                else:
-                    time.sleep(0.1)
-            except Exception as e:
-                print(f"发送错误: {e}")
-                time.sleep(0.1)
+                name = config['name']
+                interface = self.socket_pool.add_interface(name, config['source_ip'], config.get('broadcast_ip'))
+            except (KeyError, TypeError, AttributeError) as e:
+                print(f"跳过无效的网络接口配置 {config}: {e}")
+                continue
+            if interface is None:
+                continue
+            self.output_pipeline.add_transport(name, ArtNetTransport(interface, self.artnet_protocol))
+            for universe in config.get('universes', ()):
+                self.output_pipeline.set_route(universe, (name,))
+    
+    def update_output_settings(self):
+        """将界面上的地址和协议设置应用到输出流水线（在UI线程中调用，地址在确认输入或开始发送时生效）"""
+        # kv规则构建过程中也会触发on_text，此时核心组件和ids尚未就绪
+        if not hasattr(self, 'output_pipeline') or 'transport_spinner' not in self.ids:
+            return
+        try:
+            net = int(self.ids.net_input.text) if self.ids.net_input.text else 0
+            subnet = int(self.ids.subnet_input.text) if self.ids.subnet_input.text else 0
+            universe = int(self.ids.universe_input.text) if self.ids.universe_input.text else 0
+        except ValueError:
+            return
+        if not self.artnet_protocol.validate_address(net, subnet, universe):
+            return
+        
+        # 已写入的通道数据随地址一起移动，不会留在旧地址上继续发送
+        self.dmx_controller.move_default_universe(
+            self.artnet_protocol.get_port_address(net, subnet, universe))
+        self.artnet_transport.target_ip = self.ids.target_ip_input.text or "255.255.255.255"
+        
+        routes = {
+            'Art-Net': ('artnet',),
+            'sACN': ('sacn',),
+            'Art-Net + sACN': ('artnet', 'sacn'),
+        }
+        self.output_pipeline.set_default_route(routes.get(self.ids.transport_spinner.text, ('artnet',)))
     
     def update_channel_value(self, value):
         """更新通道值"""
@@ -333,12 +775,34 @@ class MainScreen(Screen):
         """更新速度值"""
         self.speed_value = value
     
+    def update_master_value(self, value):
+        """更新总控"""
+        self.master_value = value
+        self.output_curves.set_master(value / 100.0)
+    
     def apply_channel_values(self):
         """应用通道值"""
         try:
             start_channel = int(self.ids.start_channel_input.text) if self.ids.start_channel_input.text else 1
             end_channel = int(self.ids.end_channel_input.text) if self.ids.end_channel_input.text else 512
             value = int(self.channel_value)
+            attribute = self.ids.attribute_spinner.text
+            
+            if attribute != '通道':
+                # 按属性写入：只影响编组内灯具的该属性通道
+                group = self.ids.group_spinner.text
+                group = None if group == '全部' else group
+                self.patch.set_attribute_level(attribute, value / 255.0, group)
+                self.status_text = f"已应用 {attribute} = {value} 到编组 {group or '全部'}"
+                return
+            
+            fade_time = float(self.ids.fade_time_input.text) if self.ids.fade_time_input.text else 0.0
+            if fade_time > 0:
+                if self.fade_engine.fade_channels(None, start_channel, end_channel, value, fade_time) < 0:
+                    self.status_text = "错误: 通道范围无效"
+                    return
+                self.status_text = f"通道 {start_channel}-{end_channel} 在 {fade_time:g} 秒内渐变到 {value}"
+                return
             
             self.dmx_controller.set_channel_range(start_channel, end_channel, value)
             self.status_text = f"已应用通道值 {value} 到通道 {start_channel}-{end_channel}"
@@ -383,6 +847,16 @@ class MainScreen(Screen):
                     start_channel=start_channel,
                     end_channel=end_channel
                 )
+            elif effect_type == 'expression':
+                # 表达式按文本缓存编译结果，可用变量见 artnet_expression
+                effect = ExpressionEffect(
+                    self.dmx_controller,
+                    self.ids.expression_input.text,
+                    start_channel=start_channel,
+                    end_channel=end_channel,
+                    params={'speed': speed, 'intensity': intensity}
+                )
+                self.effect_engine.run_custom_effect(effect)
             
             self.status_text = f"运行效果: {effect_type}"
         except Exception as e:
@@ -401,113 +875,160 @@ class MainScreen(Screen):
             self.stop_recording()
     
     def start_recording(self):
-        """开始录制"""
-        self.recorded_data = []
-        self.recording = True
-        self.status_text = "录制中..."
-        
-        # 开始录制线程
-        self.record_thread = threading.Thread(target=self._record_loop, daemon=True)
-        self.record_thread.start()
+        """开始录制（录制发送出去的输出帧）"""
+        self.replay_buffer.start()
+        self.status_text = "录制中..." if self.sending else "录制中，开始发送后记录输出帧..."
     
     def stop_recording(self):
         """停止录制"""
-        self.recording = False
-        if hasattr(self, 'record_thread'):
-            self.record_thread.join(timeout=1.0)
-        self.status_text = f"已停止录制，记录了 {len(self.recorded_data)} 帧"
-    
-    def _record_loop(self):
-        """录制循环"""
-        while self.recording:
-            timestamp = time.time()
-            channels = self.dmx_controller.get_all_channels()
-            self.recorded_data.append((timestamp, channels))
-            time.sleep(0.05)  # 20Hz
+        count = self.replay_buffer.stop()
+        self.recorded_data = self.replay_buffer.get_recording(self.dmx_controller.default_universe)
+        self.status_text = f"已停止录制，记录了 {count} 帧"
     
     def save_recorded_data(self):
-        """保存录制数据"""
-        if not self.recorded_data:
+        """保存录制数据（录制中保存缓冲区中已有的帧，录制继续进行）"""
+        if self.replay_buffer.capturing:
+            recorded_data = self.replay_buffer.get_recording(self.dmx_controller.default_universe)
+        else:
+            recorded_data = self.recorded_data
+        if not recorded_data:
             self.status_text = "没有录制数据"
             return
         
         try:
-            import json
-            import os
-            
             # 创建保存目录
             os.makedirs('recordings', exist_ok=True)
             
             # 生成文件名
             filename = f"recordings/recording_{int(time.time())}.json"
             
-            # 转换数据格式
-            data_to_save = []
-            start_time = self.recorded_data[0][0]
-            for timestamp, channels in self.recorded_data:
-                data_to_save.append({
-                    'time': timestamp - start_time,
-                    'channels': channels
-                })
-            
-            # 保存文件
-            with open(filename, 'w') as f:
-                json.dump(data_to_save, f)
-            
-            self.status_text = f"已保存录制数据到 {filename}"
+            if save_recording(filename, recorded_data):
+                self.status_text = f"已保存录制数据到 {filename}"
+            else:
+                self.status_text = "保存录制数据失败"
         except Exception as e:
             self.status_text = f"保存错误: {str(e)}"
     
     def play_recorded_data(self):
-        """播放录制数据"""
+        """播放录制数据（在输出帧上回放，需要正在发送）"""
         if not self.recorded_data:
             self.status_text = "没有录制数据"
             return
+        if not self.sending:
+            self.status_text = "请先开始发送"
+            return
         
+        self.recording_player.load(self.recorded_data)
+        self.recording_player.start()
         self.status_text = "播放中..."
-        
-        # 开始播放线程
-        play_thread = threading.Thread(target=self._playback_loop, daemon=True)
-        play_thread.start()
     
-    def _playback_loop(self):
-        """播放循环"""
-        if not self.recorded_data:
+    def toggle_timecode(self, state):
+        """切换时间码追踪：场景列表和录制回放跟随接收到的ArtTimeCode"""
+        if state == 'down':
+            self.timecode_chaser.reset()
+            if self.recorded_data:
+                self.recording_player.load(self.recorded_data)
+            self.recording_player.timecode = self.timecode_chaser
+            self.cue_engine.set_timecode(self.timecode_chaser)
+            self.chasing_timecode = True
+            self.status_text = "追踪时间码中..."
+        else:
+            self.chasing_timecode = False
+            self.recording_player.timecode = None
+            self.cue_engine.set_timecode(None)
+            self.status_text = f"已停止追踪时间码，跳转 {self.timecode_chaser.seek_count} 次"
+    
+    def go_cue(self):
+        """触发下一个场景"""
+        if not self.cue_engine.go():
+            self.status_text = "没有下一个场景"
             return
-        
-        start_time = time.time()
-        for i, (timestamp, channels) in enumerate(self.recorded_data):
-            # 计算延迟
-            target_time = start_time + (timestamp - self.recorded_data[0][0])
-            current_time = time.time()
-            if current_time < target_time:
-                time.sleep(target_time - current_time)
-            
-            # 设置通道值
-            for j, value in enumerate(channels):
-                self.dmx_controller.set_channel(j + 1, value)
-            
-            # 检查是否要停止
-            if not self.sending:
-                break
-        
-        self.status_text = "播放完成"
+        self._show_current_cue()
+    
+    def back_cue(self):
+        """回到上一个场景"""
+        if not self.cue_engine.back():
+            self.status_text = "没有上一个场景"
+            return
+        self._show_current_cue()
+    
+    def _show_current_cue(self):
+        """显示当前场景"""
+        cue = self.cue_engine.get_current_cue()
+        self.ids.cue_label.text = f"场景: {cue.number:g} {cue.name}"
+        self.status_text = f"GO 场景 {cue.number:g}，渐变 {cue.fade:g} 秒"
+    
+    def record_cue(self):
+        """把所有宇宙的当前状态记录为新场景，渐变时间取自渐变输入框"""
+        try:
+            fade_time = float(self.ids.fade_time_input.text) if self.ids.fade_time_input.text else 0.0
+            cue_list = self.cue_engine.cue_list
+            number = float(len(cue_list) + 1)
+            universes = {
+                universe: self.dmx_controller.get_universe_data(universe)
+                for universe in self.dmx_controller.get_universe_ids()
+            }
+            cue_list.append(Cue(number, universes, fade=fade_time))
+            cue_list.save('cues.jsonl')
+            self.status_text = f"已记录场景 {number:g}"
+        except Exception as e:
+            self.status_text = f"记录场景错误: {str(e)}"
+    
+    def export_trace(self):
+        """把最近的帧追踪导出为Chrome追踪格式"""
+        os.makedirs('traces', exist_ok=True)
+        filename = f"traces/trace_{int(time.time())}.json"
+        if self.tracer.export(filename):
+            self.status_text = f"已导出追踪到 {filename}"
+        else:
+            self.status_text = "导出追踪失败"
+    
+    def toggle_input(self, state):
+        """切换网络输入状态"""
+        if state == 'down':
+            self.sequence_filter.reset()
+            self.local_ip = self.network_manager.get_local_ip()
+            self.receiving = True
+            self.status_text = "接收输入中..."
+        else:
+            self.receiving = False
+            self.status_text = f"已停止接收，丢弃过期/乱序数据包 {self.sequence_filter.dropped} 个"
     
     def on_artnet_packet_received(self, data, addr):
-        """处理接收到的ArtNet数据包"""
+        """处理接收到的ArtNet数据包（在监听线程中调用）"""
         try:
             packet_info = self.artnet_protocol.parse_packet(data)
-            if packet_info:
-                # 可以在这里处理接收到的数据包
-                pass
+            if not packet_info:
+                return
+            if packet_info['opcode'] == ArtNetProtocol.OPCODE_TIMECODE:
+                if self.chasing_timecode:
+                    self.timecode_chaser.receive(packet_info)
+                return
+            if packet_info['opcode'] != ArtNetProtocol.OPCODE_DMX:
+                return
+            if not self.receiving or addr[0] in (self.local_ip, '127.0.0.1'):
+                # 忽略本机广播回环的输出，避免输出被再次写回控制器
+                return
+            
+            universe = packet_info['port_address']
+            if self.sequence_filter.accept(addr[0], universe, packet_info['sequence']):
+                self.dmx_controller.set_universe_data(universe, bytes(packet_info['dmx_data']))
         except Exception as e:
             print(f"解析数据包错误: {e}")
     
     def on_stop(self):
-        """应用停止时的清理"""
+        """应用停止时的清理（先保存演出快照，下次启动时恢复）"""
+        self.save_snapshot()
         self.stop_sending()
         self.effect_engine.stop_effect()
+        self.ids.channel_monitor.stop()
+        self.output_pipeline.close()
+        self.socket_pool.close()
+        self.cue_engine.close()
+        self.osc_server.stop()
         self.network_manager.close()
+        if self.snapshot:
+            self.snapshot.close()
 
 class ArtNetControllerApp(App):
     """ArtNet控制器应用"""
@@ -515,6 +1036,15 @@ class ArtNetControllerApp(App):
     def build(self):
         """构建应用"""
         return MainScreen()
+    
+    def on_pause(self):
+        """进入后台时保存演出快照（Android可能不再恢复而直接结束进程）"""
+        self.root.save_snapshot()
+        return True
+    
+    def on_stop(self):
+        """退出时保存演出快照并释放资源（Kivy只向App分发on_stop）"""
+        self.root.on_stop()
 
 if __name__ == '__main__':
     ArtNetControllerApp().run()